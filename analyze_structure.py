@@ -1,6 +1,7 @@
 import asyncio
 from playwright.async_api import async_playwright
 from bs4 import BeautifulSoup
+from selector_plan import learn_plan, layout_fingerprint
 
 async def analyze_page_structure():
     async with async_playwright() as pw:
@@ -17,6 +18,11 @@ async def analyze_page_structure():
     
     soup = BeautifulSoup(html, "html.parser")
     
+    # 監視で使うセレクタ計画（車名・価格のセレクタとカードの段数）
+    print("=== セレクタ計画 ===")
+    print(f"レイアウト指紋: {layout_fingerprint(html)}")
+    print(f"計画: {learn_plan(soup)}")
+    
     # 車両リスト要素を探す
     print("=== 車両リスト構造の分析 ===")
     
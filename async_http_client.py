@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+"""
+非同期HTTPクライアント
+httpxがあれば接続プール付きAsyncClient（HTTP/2対応）を使い、無ければrequestsのセッションをスレッドで実行する
+"""
+
+import asyncio
+import codecs
+from typing import AsyncIterator, Dict, Optional
+import requests
+from requests.adapters import HTTPAdapter
+from rate_limiter import DEFAULT_RATE_LIMITER
+
+try:
+    import httpx
+    HTTPX_AVAILABLE = True
+except ImportError:
+    HTTPX_AVAILABLE = False
+
+try:
+    import h2  # noqa: F401  HTTP/2はh2パッケージが必要
+    HTTP2_AVAILABLE = HTTPX_AVAILABLE
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+# 逐次受信の1回あたりのバイト数
+STREAM_CHUNK_SIZE = 16 * 1024
+
+
+def stream_encoding(encoding: Optional[str]) -> str:
+    """逐次デコードに使う文字コード（未指定・requestsの既定値ISO-8859-1はUTF-8とみなす）"""
+    if not encoding or encoding.lower() == "iso-8859-1":
+        return "utf-8"
+    return encoding
+
+
+class HttpClientError(Exception):
+    """通信エラー・HTTPエラー"""
+
+
+class HttpResponse:
+    __slots__ = ("status_code", "text", "url", "headers")
+
+    def __init__(self, status_code: int, text: str, url: str, headers: Dict):
+        self.status_code = status_code
+        self.text = text
+        self.url = url
+        self.headers = headers
+
+
+class AsyncHttpClient:
+    def __init__(self,
+                 headers: Optional[Dict] = None,
+                 max_connections: int = 10,
+                 http2: bool = False,
+                 timeout: float = 30,
+                 rate_limiter=DEFAULT_RATE_LIMITER,
+                 session: Optional[requests.Session] = None):
+        self.headers = headers or {}
+        self.max_connections = max_connections
+        self.http2 = http2 and HTTP2_AVAILABLE
+        self.timeout = timeout
+        self.rate_limiter = rate_limiter
+        self._session = session
+        self._client = None
+        self._semaphore = None
+
+    @property
+    def backend(self) -> str:
+        if HTTPX_AVAILABLE:
+            return "httpx (HTTP/2)" if self.http2 else "httpx"
+        return "requests"
+
+    async def open(self):
+        if HTTPX_AVAILABLE:
+            self._client = httpx.AsyncClient(
+                headers=self.headers,
+                http2=self.http2,
+                timeout=self.timeout,
+                limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_connections
+                )
+            )
+        else:
+            # requestsの接続プールを同時実行数に合わせて広げる
+            if self._session is None:
+                self._session = requests.Session()
+            self._session.headers.update(self.headers)
+            adapter = HTTPAdapter(pool_connections=self.max_connections, pool_maxsize=self.max_connections)
+            self._session.mount("https://", adapter)
+            self._session.mount("http://", adapter)
+            self._semaphore = asyncio.Semaphore(self.max_connections)
+        return self
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def __aenter__(self):
+        return await self.open()
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    async def get(self, url: str, params: Optional[Dict] = None) -> HttpResponse:
+        """GETリクエスト（送信前にホストごとのレート制限を待つ）"""
+        if self.rate_limiter is not None:
+            await self.rate_limiter.acquire(url)
+
+        if HTTPX_AVAILABLE:
+            try:
+                response = await self._client.get(url, params=params)
+                response.raise_for_status()
+            except httpx.HTTPError as e:
+                raise HttpClientError(str(e)) from e
+            return HttpResponse(response.status_code, response.text, str(response.url), response.headers)
+
+        async with self._semaphore:
+            try:
+                response = await asyncio.to_thread(self._session.get, url, params=params, timeout=self.timeout)
+                response.raise_for_status()
+            except requests.exceptions.RequestException as e:
+                raise HttpClientError(str(e)) from e
+        return HttpResponse(response.status_code, response.text, response.url, response.headers)
+
+    async def stream_text(self, url: str, params: Optional[Dict] = None,
+                          chunk_size: int = STREAM_CHUNK_SIZE) -> AsyncIterator[str]:
+        """GETのレスポンス本文を受信した順にテキストで返す（本文全体はメモリに保持しない）"""
+        if self.rate_limiter is not None:
+            await self.rate_limiter.acquire(url)
+
+        if HTTPX_AVAILABLE:
+            try:
+                async with self._client.stream("GET", url, params=params) as response:
+                    response.raise_for_status()
+                    decoder = codecs.getincrementaldecoder(stream_encoding(response.charset_encoding))(errors="replace")
+                    async for chunk in response.aiter_bytes(chunk_size):
+                        text = decoder.decode(chunk)
+                        if text:
+                            yield text
+                    tail = decoder.decode(b"", final=True)
+                    if tail:
+                        yield tail
+            except httpx.HTTPError as e:
+                raise HttpClientError(str(e)) from e
+            return
+
+        async with self._semaphore:
+            try:
+                response = await asyncio.to_thread(
+                    self._session.get, url, params=params, timeout=self.timeout, stream=True
+                )
+            except requests.exceptions.RequestException as e:
+                raise HttpClientError(str(e)) from e
+            try:
+                response.raise_for_status()
+                decoder = codecs.getincrementaldecoder(stream_encoding(response.encoding))(errors="replace")
+                chunks = response.iter_content(chunk_size)
+                while True:
+                    chunk = await asyncio.to_thread(next, chunks, None)
+                    if chunk is None:
+                        break
+                    text = decoder.decode(chunk)
+                    if text:
+                        yield text
+                tail = decoder.decode(b"", final=True)
+                if tail:
+                    yield tail
+            except requests.exceptions.RequestException as e:
+                raise HttpClientError(str(e)) from e
+            finally:
+                response.close()
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+カード項目抽出のマイクロベンチマーク
+解析済みのカードに対して、年式・走行距離・販売店・新着の抽出だけを測る（HTMLの解析時間は含めない）
+  gazoo:   debug_response.html のメイン一覧の detail_area
+  toyota:  一覧ページ相当のHTML（benchmark_parsers.carlist_html）のカード
+旧実装（要素ごとの get_text と都度の正規表現）と field_extractor を比べる
+
+使い方:
+    python benchmark_fields.py [繰り返し回数]
+"""
+
+import re
+import sys
+import time
+from pathlib import Path
+from html_parser_backend import available_backends, make_soup
+from field_extractor import card_text, extract_fields
+from benchmark_parsers import carlist_html
+from card_extractor import iter_cards
+
+FIXTURE = Path(__file__).parent / "debug_response.html"
+
+
+def legacy_gazoo_fields(detail_area):
+    """変更前の _parse_result_card の抽出（比較用）"""
+    detail_text = detail_area.get_text()
+    result = {}
+    year_match = re.search(r'(\d{4})年', detail_text)
+    if year_match:
+        result['year'] = year_match.group(1)
+    for pattern in (r'(\d{1,2}(?:,\d{3})*)\s*km', r'(\d+(?:\.\d+)?)\s*万km'):
+        mileage_match = re.search(pattern, detail_text)
+        if mileage_match:
+            result['mileage'] = mileage_match.group(1)
+            break
+    dealer_match = re.search(r'トヨタモビリティ[^\n\r]+', detail_text)
+    if dealer_match:
+        result['dealer'] = dealer_match.group(0).strip()
+    return result
+
+
+def legacy_toyota_fields(card):
+    """変更前の card_fields の年式・新着の抽出（比較用）"""
+    context = card.get_text()
+    is_new = "NEW" in context or "新着" in context
+    year = "年式不明"
+    if "年" in context:
+        for elem in card.select("p, span"):
+            text = elem.get_text()
+            if "年" in text:
+                year = text.strip()
+                break
+    return year, is_new
+
+
+def current_fields(elem):
+    return extract_fields(card_text(elem))
+
+
+def time_per_card(extract, elems, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for elem in elems:
+            extract(elem)
+    return (time.perf_counter() - start) / (repeat * len(elems))
+
+
+def run(repeat=20):
+    gazoo_html = FIXTURE.read_text(encoding="utf-8")
+    toyota_html = carlist_html()
+    results = []
+    for backend in available_backends():
+        detail_areas = make_soup(gazoo_html, backend).select("#car-list-wrap div.detail_area")
+        cards = [card for _, card, _ in iter_cards(make_soup(toyota_html, backend)) if card is not None]
+        print(f"\n{backend}（gazoo {len(detail_areas)}件・toyota {len(cards)}件）")
+        for name, elems, legacy in (("gazoo", detail_areas, legacy_gazoo_fields),
+                                    ("toyota", cards, legacy_toyota_fields)):
+            before = time_per_card(legacy, elems, repeat)
+            after = time_per_card(current_fields, elems, repeat)
+            results.append((backend, name, before, after))
+            print(f"  {name:7s} 旧 {before * 1e6:8.1f} µs/件  →  field_extractor {after * 1e6:8.1f} µs/件  "
+                  f"×{before / after:.1f}")
+    return results
+
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 20)
@@ -0,0 +1,252 @@
+#!/usr/bin/env python3
+"""
+HTML解析のベンチマーク
+保存済みのページ（debug_response.html など）と、カード数を数千件に増やした合成ページで
+parse_vehicles・_parse_search_results・parse_new_listings をバックエンドごとに測り、
+1ページあたりの時間・カード/秒・ピークメモリを出力する
+
+使い方:
+    python benchmark_parsers.py                           # 表で表示
+    python benchmark_parsers.py --json results.json       # 結果をJSONで保存
+    python benchmark_parsers.py --compare before.json     # 以前の結果と比較
+    python benchmark_parsers.py --pages data/pages        # 保存したHTMLも測る
+    python benchmark_parsers.py --quick                   # 合成ページを小さくして短時間で
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import platform
+import re
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+import html_parser_backend
+from html_parser_backend import available_backends
+from result_stream import ResultCardStream
+from toyota_used_car_search import ToyotaUsedCarSearch, RESULT_REGION_END
+from prius_monitor import PriusMonitor
+from prius_scraper import parse_new_listings
+
+FIXTURE = Path(__file__).parent / "debug_response.html"
+CARLIST_CARDS = 200  # 一覧ページ相当のHTMLに並べる車両カード数
+
+# 合成ページのカード数
+CARLIST_SIZES = (200, 2000, 5000)
+GAZOO_SIZES = (500, 2000)
+QUICK_CARLIST_SIZES = (200,)
+QUICK_GAZOO_SIZES = (200,)
+
+# 保存済みページの種類を本文から判定
+PAGE_KINDS = {
+    "gazoo": 'id="car-list-wrap"',
+    "carlist": "detais-name2",
+}
+
+CARD_TEMPLATE = """
+<div class="car-card">
+  <div class="name-box">{badge}<p class="detais-name2">プリウス グレード{i}</p></div>
+  <div class="spec"><span>{year}年</span><span>{km}km</span><span>修復歴なし</span></div>
+  <p class="car-price-sub">{price}万円</p>
+  <ul class="links"><li><a href="/ucar/detail/{i}">詳細</a></li><li><a href="/ucar/shop/{i}">販売店</a></li></ul>
+</div>
+"""
+
+DETAIL_ID = re.compile(r'(detail\?Id=)(\w+)')
+
+
+def carlist_html(cards=CARLIST_CARDS):
+    """toyota.jp の一覧ページを模したHTML"""
+    body = "".join(
+        CARD_TEMPLATE.format(
+            i=i, badge='<span class="badge">NEW</span>' if i % 7 == 0 else "",
+            year=2018 + i % 5, km=10000 + i * 37, price=120 + i % 40
+        )
+        for i in range(cards)
+    )
+    return f"<html><head><script>var x = 1;</script></head><body><div class='result'>{body}</div></body></html>"
+
+
+def enlarge_gazoo(html, cards):
+    """gazooの検索結果ページのメイン一覧を cards 件に増やしたHTML（複製分は車両IDを変える）"""
+    wrap = html.find('id="car-list-wrap"')
+    if wrap < 0:
+        raise ValueError("メイン一覧（car-list-wrap）が見つかりません")
+    content_start = html.find(">", wrap) + 1
+    content_end = html.rfind("</dl>", wrap, html.find(RESULT_REGION_END, wrap)) + len("</dl>")
+
+    stream = ResultCardStream(regions={"car-list-wrap": "dl"})
+    originals = stream.push(html[html.rfind("<", 0, wrap):content_end]) + stream.finish()
+    copies = []
+    for i in range(cards):
+        card = originals[i % len(originals)]
+        copy = i // len(originals)
+        if copy:
+            card = DETAIL_ID.sub(lambda m: f"{m.group(1)}{m.group(2)}X{copy}", card)
+        copies.append(card)
+    return html[:content_start] + "".join(copies) + html[content_end:]
+
+
+def load_pages(pages_dir=None, quick=False):
+    """[(ページ名, 種類, HTML)] 保存済みページと合成ページ"""
+    gazoo_html = FIXTURE.read_text(encoding="utf-8")
+    pages = [("debug_response.html", "gazoo", gazoo_html)]
+
+    if pages_dir:
+        for path in sorted(Path(pages_dir).glob("*.html")):
+            html = path.read_text(encoding="utf-8", errors="replace")
+            kind = next((kind for kind, marker in PAGE_KINDS.items() if marker in html), None)
+            if kind:
+                pages.append((path.name, kind, html))
+
+    for cards in QUICK_GAZOO_SIZES if quick else GAZOO_SIZES:
+        pages.append((f"gazoo×{cards}", "gazoo", enlarge_gazoo(gazoo_html, cards)))
+    for cards in QUICK_CARLIST_SIZES if quick else CARLIST_SIZES:
+        pages.append((f"carlist×{cards}", "carlist", carlist_html(cards)))
+    return pages
+
+
+def _quiet_monitor():
+    monitor = PriusMonitor.__new__(PriusMonitor)
+    monitor.search_url = "https://toyota.jp/ucar/carlist/"
+    monitor.log = lambda message: None
+    return monitor
+
+
+def parsers_for(kind, backend):
+    """ページの種類に対応する [(ケース名, 解析関数)]"""
+    if kind == "gazoo":
+        return [
+            ("_parse_search_results (region)",
+             ToyotaUsedCarSearch(html_parser=backend, parse_mode="region")._parse_search_results),
+            ("_parse_search_results (full)",
+             ToyotaUsedCarSearch(html_parser=backend, parse_mode="full")._parse_search_results),
+        ]
+    return [
+        ("parse_vehicles", _quiet_monitor().parse_vehicles),
+        ("parse_new_listings", parse_new_listings),
+    ]
+
+
+def measure(parse, html, repeat):
+    """1回あたりの平均秒数と結果件数（解析中の表示は抑える）"""
+    with contextlib.redirect_stdout(io.StringIO()):
+        result = parse(html)
+        start = time.perf_counter()
+        for _ in range(repeat):
+            parse(html)
+        elapsed = time.perf_counter() - start
+    return elapsed / repeat, len(result)
+
+
+def measure_peak_memory(parse, html):
+    """1回の解析中に増えたPythonヒープのピーク（バイト）
+
+    tracemalloc はPythonのメモリ確保のみを数える（selectolaxの解析木など拡張モジュール内の確保は含まない）
+    """
+    with contextlib.redirect_stdout(io.StringIO()):
+        tracemalloc.start()
+        try:
+            baseline = tracemalloc.get_traced_memory()[0]
+            parse(html)
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+    return peak - baseline
+
+
+def run(repeat=5, pages_dir=None, quick=False, backends=None):
+    """全ページ・全ケース・全バックエンドを測って結果のリストを返す"""
+    original = html_parser_backend.HTML_PARSER
+    results = []
+    try:
+        for page, kind, html in load_pages(pages_dir, quick):
+            size = len(html.encode("utf-8"))
+            print(f"\n{page}（{size // 1024}KB）")
+            for backend in backends or available_backends():
+                html_parser_backend.HTML_PARSER = backend
+                for case, parse in parsers_for(kind, backend):
+                    seconds, cards = measure(parse, html, repeat)
+                    peak = measure_peak_memory(parse, html)
+                    result = {
+                        "page": page,
+                        "case": case,
+                        "backend": backend,
+                        "bytes": size,
+                        "cards": cards,
+                        "seconds_per_page": seconds,
+                        "cards_per_second": cards / seconds if seconds else 0.0,
+                        "peak_memory_bytes": peak,
+                    }
+                    results.append(result)
+                    print(f"  {backend:12s} {case:32s} {seconds * 1000:9.1f} ms/ページ  "
+                          f"{cards:5d}台  {result['cards_per_second']:9.0f} 台/秒  "
+                          f"ピーク {peak / 1024 / 1024:6.1f} MB")
+    finally:
+        html_parser_backend.HTML_PARSER = original
+    return results
+
+
+def report(results, repeat):
+    """JSON出力用（実行環境を含める）"""
+    return {
+        "created_at": datetime.now().isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "backends": available_backends(),
+        "repeat": repeat,
+        "results": results,
+    }
+
+
+def compare(results, previous):
+    """以前のJSON結果と同じページ・ケース・バックエンド同士で速度を比較"""
+    before = {(r["page"], r["case"], r["backend"]): r for r in previous["results"]}
+    print(f"\n比較（{previous.get('created_at', '?')} の結果に対する速度比）")
+    for result in results:
+        old = before.get((result["page"], result["case"], result["backend"]))
+        if not old or not result["seconds_per_page"]:
+            continue
+        ratio = old["seconds_per_page"] / result["seconds_per_page"]
+        cards_note = "" if old["cards"] == result["cards"] else f"  件数 {old['cards']}→{result['cards']}"
+        print(f"  {result['page']:20s} {result['case']:32s} {result['backend']:12s} "
+              f"×{ratio:5.2f}{cards_note}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="HTML解析のベンチマーク")
+    parser.add_argument("repeat", nargs="?", type=int, default=5, help="1ケースあたりの繰り返し回数")
+    parser.add_argument("--json", help="結果をJSONで保存するパス（- で標準出力）")
+    parser.add_argument("--compare", help="比較する以前のJSON結果")
+    parser.add_argument("--pages", help="追加で測る保存済みHTMLのディレクトリ")
+    parser.add_argument("--backend", action="append", help="測るバックエンド（複数指定可、既定: 全て）")
+    parser.add_argument("--quick", action="store_true", help="合成ページを小さくして短時間で測る")
+    args = parser.parse_args(argv)
+
+    if args.json == "-":
+        # 表は標準エラーへ（標準出力はJSONのみ）
+        with contextlib.redirect_stdout(sys.stderr):
+            results = run(args.repeat, args.pages, args.quick, args.backend)
+    else:
+        results = run(args.repeat, args.pages, args.quick, args.backend)
+    output = report(results, args.repeat)
+
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            with contextlib.redirect_stdout(sys.stderr if args.json == "-" else sys.stdout):
+                compare(results, json.load(f))
+
+    if args.json == "-":
+        json.dump(output, sys.stdout, ensure_ascii=False, indent=2)
+    elif args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(output, f, ensure_ascii=False, indent=2)
+        print(f"\n結果を保存: {args.json}")
+    return output
+
+
+if __name__ == "__main__":
+    main()
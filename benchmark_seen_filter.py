@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+既知の車両IDのフィルタのベンチマーク
+100万台分の車両IDを登録し、フィルタ（SeenFilter）と Python の set のメモリ、1件あたりの判定時間、
+実測の誤判定率を比べる。あわせて SQLite の車両ストアを直接調べる場合と、フィルタで絞り込む場合の
+新着判定（未知の車両ID）の時間を測る
+
+使い方:
+    python benchmark_seen_filter.py                      # 100万台
+    python benchmark_seen_filter.py --listings 200000    # 台数を指定
+    python benchmark_seen_filter.py --error-rate 0.01    # 誤判定率を指定
+    python benchmark_seen_filter.py --no-store           # 車両ストアとの比較を省略
+"""
+
+import argparse
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+from seen_filter import SeenFilter, DEFAULT_ERROR_RATE
+from vehicle_store import VehicleStore, UPSERT
+
+LISTINGS = 1000000
+PROBES = 100000  # 判定時間・誤判定率を測る件数
+
+
+def listing_ids(count, source="toyota.jp"):
+    return [f"{source}:{i:013X}" for i in range(count)]
+
+
+def per_call(func, keys):
+    start = time.perf_counter()
+    for key in keys:
+        func(key)
+    return (time.perf_counter() - start) / len(keys)
+
+
+def measure_set(keys):
+    """set に載せた場合のメモリ（バイト）"""
+    tracemalloc.start()
+    try:
+        baseline = tracemalloc.get_traced_memory()[0]
+        ids = set(keys)
+        size = tracemalloc.get_traced_memory()[0] - baseline
+    finally:
+        tracemalloc.stop()
+    return ids, size
+
+
+def build_store(path, keys):
+    """keys の車両を保存した SQLite の車両ストア"""
+    store = VehicleStore(path)
+    now = datetime.now().isoformat()
+    with store.conn:
+        store.conn.executemany(UPSERT, (
+            (key, "プリウス", "プリウス S", 1400000 + i % 500000, 2019, 10000 + i % 90000, None,
+             key.split(":", 1)[1], "toyota.jp", 0, None, now, now, now)
+            for i, key in enumerate(keys)
+        ))
+    return store
+
+
+def run(listings=LISTINGS, error_rate=DEFAULT_ERROR_RATE, with_store=True):
+    known = listing_ids(listings)
+    unknown = listing_ids(PROBES, source="gazoo")
+    probes = known[::max(1, listings // PROBES)][:PROBES]
+    results = {"listings": listings, "error_rate": error_rate}
+
+    with tempfile.TemporaryDirectory() as tmp:
+        print(f"{listings:,}台の車両IDを登録（誤判定率 {error_rate}）")
+        seen = SeenFilter(Path(tmp) / "seen_filter", error_rate=error_rate)
+        start = time.perf_counter()
+        for key in known:
+            seen.add(key)
+        results["filter_build_seconds"] = time.perf_counter() - start
+        results["filter_bytes"] = seen.memory_bytes
+        results["filter_slices"] = len(seen.slices)
+
+        ids, results["set_bytes"] = measure_set(known)
+        print(f"  メモリ      フィルタ {results['filter_bytes'] / 1024 / 1024:7.1f} MB"
+              f"（スライス {results['filter_slices']}個、mmap）  set {results['set_bytes'] / 1024 / 1024:7.1f} MB")
+        print(f"  登録        {results['filter_build_seconds']:.1f} 秒"
+              f"（{results['filter_build_seconds'] / listings * 1e6:.1f} µs/件）")
+
+        results["filter_hit_us"] = per_call(seen.__contains__, probes) * 1e6
+        results["filter_miss_us"] = per_call(seen.__contains__, unknown) * 1e6
+        results["set_us"] = per_call(ids.__contains__, unknown) * 1e6
+        results["false_positive_rate"] = sum(key in seen for key in unknown) / len(unknown)
+        print(f"  判定        フィルタ 既知 {results['filter_hit_us']:.2f} µs/件・未知 {results['filter_miss_us']:.2f} µs/件"
+              f"  set {results['set_us']:.2f} µs/件")
+        print(f"  誤判定率    {results['false_positive_rate']:.5f}（指定 {error_rate}）")
+        del ids
+
+        if with_store:
+            store = build_store(Path(tmp) / "vehicles.db", known)
+            lookup = lambda key: store.get(key) if key in seen else None
+            for label, name, keys in (("新着判定", "new", unknown), ("既知の確認", "known", probes)):
+                direct = per_call(store.get, keys)
+                filtered = per_call(lookup, keys)
+                results[f"store_{name}_us"] = direct * 1e6
+                results[f"filtered_{name}_us"] = filtered * 1e6
+                print(f"  {label:8s}  車両ストアを直接 {direct * 1e6:.1f} µs/件  →  フィルタで絞り込み "
+                      f"{filtered * 1e6:.1f} µs/件  ×{direct / filtered:.2f}")
+            store.close()
+        seen.close()
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="既知の車両IDのフィルタのベンチマーク")
+    parser.add_argument("--listings", type=int, default=LISTINGS, help="登録する車両IDの数")
+    parser.add_argument("--error-rate", type=float, default=DEFAULT_ERROR_RATE, help="フィルタの誤判定率")
+    parser.add_argument("--no-store", action="store_true", help="SQLiteの車両ストアとの比較を省略")
+    args = parser.parse_args(argv)
+    return run(args.listings, args.error_rate, with_store=not args.no_store)
+
+
+if __name__ == "__main__":
+    main()
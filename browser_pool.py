@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+"""
+常駐ブラウザプール
+Chromiumを起動したまま保持し、チェックごとにコンテキスト/ページを使い回す
+"""
+
+import asyncio
+from contextlib import asynccontextmanager
+from playwright.async_api import async_playwright
+
+# クラウド環境向けの起動オプション
+CLOUD_LAUNCH_ARGS = [
+    '--no-sandbox',
+    '--disable-dev-shm-usage',
+    '--disable-gpu',
+    '--disable-background-timer-throttling',
+    '--disable-backgrounding-occluded-windows',
+    '--disable-renderer-backgrounding'
+]
+
+# 1つのページを使い回す最大回数（メモリ肥大化対策）
+MAX_PAGE_USES = 20
+
+# ブラウザ起動の再試行回数
+LAUNCH_RETRIES = 3
+
+
+class BrowserPool:
+    def __init__(self, launch_args=None, context_options=None, headless=True,
+                 max_idle_pages=4, max_page_uses=MAX_PAGE_USES, log=print):
+        self.launch_args = launch_args or []
+        self.context_options = context_options or {}
+        self.headless = headless
+        self.max_idle_pages = max_idle_pages
+        self.max_page_uses = max_page_uses
+        self.log = log
+
+        self._playwright = None
+        self._browser = None
+        self._idle = []  # [(context, page, 使用回数)]
+        self._lock = asyncio.Lock()
+        self.launch_count = 0
+
+    async def _launch(self):
+        """Chromiumを起動（既存のブラウザは破棄）"""
+        await self._discard_browser()
+
+        if self._playwright is None:
+            self._playwright = await async_playwright().start()
+
+        last_error = None
+        for attempt in range(1, LAUNCH_RETRIES + 1):
+            try:
+                self._browser = await self._playwright.chromium.launch(
+                    headless=self.headless,
+                    args=self.launch_args
+                )
+                self.launch_count += 1
+                if self.launch_count > 1:
+                    self.log(f"ブラウザを再起動しました（起動回数: {self.launch_count}）")
+                return self._browser
+            except Exception as e:
+                last_error = e
+                self.log(f"ブラウザ起動エラー（{attempt}/{LAUNCH_RETRIES}）: {e}")
+                await asyncio.sleep(attempt)
+
+        raise RuntimeError(f"ブラウザを起動できませんでした: {last_error}")
+
+    async def _discard_browser(self):
+        """ブラウザと待機中のページを破棄"""
+        self._idle.clear()
+        if self._browser is not None:
+            try:
+                await self._browser.close()
+            except Exception:
+                pass
+            self._browser = None
+
+    def is_healthy(self):
+        """ブラウザが応答可能な状態か"""
+        return self._browser is not None and self._browser.is_connected()
+
+    async def health_check(self):
+        """ヘルスチェック（異常時は再起動）
+
+        まだ一度も起動していなければ何もしない（HTTP取得だけで済むチェックでは
+        ブラウザを起動せず、必要になった時点で _acquire が起動する）
+        """
+        async with self._lock:
+            if self._browser is None and self.launch_count == 0:
+                return True
+            if not self.is_healthy():
+                await self._launch()
+                return False
+
+            try:
+                await asyncio.wait_for(self._probe(), timeout=10)
+                return True
+            except Exception as e:
+                self.log(f"ブラウザ応答なし: {e}")
+                await self._launch()
+                return False
+
+    async def _probe(self):
+        """空ページを開いて閉じられるか確認"""
+        page = await self._browser.new_page()
+        await page.close()
+
+    async def _acquire(self, context_options):
+        """ページを取得（プールに空きがあれば再利用）"""
+        async with self._lock:
+            if not self.is_healthy():
+                await self._launch()
+
+            # 個別オプション指定時は専用コンテキストを作成
+            if not context_options:
+                while self._idle:
+                    context, page, uses = self._idle.pop()
+                    if not page.is_closed():
+                        return context, page, uses
+                    await self._close_context(context)
+
+            options = dict(self.context_options)
+            options.update(context_options or {})
+            context = await self._browser.new_context(**options)
+            page = await context.new_page()
+            return context, page, 0
+
+    async def _release(self, context, page, uses, reusable):
+        """ページをプールに戻す"""
+        if (reusable and not page.is_closed() and self.is_healthy()
+                and uses < self.max_page_uses
+                and len(self._idle) < self.max_idle_pages):
+            try:
+                # 前回のDOMを破棄してメモリを解放
+                await page.goto("about:blank")
+                self._idle.append((context, page, uses))
+                return
+            except Exception:
+                pass
+        await self._close_context(context)
+
+    async def _close_context(self, context):
+        try:
+            await context.close()
+        except Exception:
+            pass
+
+    @asynccontextmanager
+    async def page(self, **context_options):
+        """プールからページを借りる
+
+        context_optionsを指定した場合（位置情報など）は
+        使い捨てのコンテキストを作成し、終了時に破棄する
+        """
+        context, page, uses = await self._acquire(context_options)
+        crashed = []
+
+        def on_crash(_):
+            crashed.append(True)
+
+        page.on("crash", on_crash)
+
+        reusable = not context_options
+        try:
+            yield page
+        except BaseException:
+            # 異常終了・キャンセルされたページは再利用しない
+            reusable = False
+            raise
+        finally:
+            page.remove_listener("crash", on_crash)
+            if crashed:
+                self.log("ページがクラッシュしました。次回はブラウザを再確認します")
+                reusable = False
+            await self._release(context, page, uses + 1, reusable)
+
+    async def close(self):
+        """ブラウザとPlaywrightを終了"""
+        async with self._lock:
+            for context, _, _ in self._idle:
+                await self._close_context(context)
+            await self._discard_browser()
+            if self._playwright is not None:
+                await self._playwright.stop()
+                self._playwright = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+車両カードの抽出
+最初のカードで「車名要素から何段上がカード全体か」を求め、以降のカードはその段数だけ上がって
+カード内を1回走査するだけで車名・価格・年式・新着バッジを取り出す
+セレクタと段数はレイアウトごとに selector_plan で1回だけ求め、同じレイアウトのページでは使い回す
+"""
+
+from datetime import datetime
+from urllib.parse import urljoin
+from html_parser_backend import make_soup
+from field_extractor import card_text, extract_fields
+from selector_plan import DEFAULT_PLAN_CACHE, MAX_CARD_DEPTH, probe_card_depth
+
+NAME_SELECTOR = "p.detais-name2"
+PRICE_SELECTOR = "p.car-price-sub"
+# 詳細ページへのリンク（URLの車両IDで同じ車両を判定する）
+DETAIL_LINK_SELECTOR = "a[href*='detail']"
+
+
+def _ancestor(elem, depth):
+    """depth 段上の要素（body より上になる場合は None）"""
+    for _ in range(depth):
+        elem = elem.parent
+        if elem is None or elem.name == "body":
+            return None
+    return elem
+
+
+def find_card_depth(name_elem, name_selector=NAME_SELECTOR, price_selector=PRICE_SELECTOR):
+    """車名要素から、価格を含む最も近い祖先（カード）までの段数"""
+    return probe_card_depth(name_elem, name_selector, price_selector, MAX_CARD_DEPTH)
+
+
+def iter_cards(soup, keyword=None, plan=None):
+    """
+    (車名, カード要素, 価格要素) を順に返す
+
+    Args:
+        soup: make_soup() の戻り値
+        keyword: 車名に含まれる場合のみ返す（カードの特定も省略する）
+        plan: selector_plan.SelectorPlan（省略時は toyota.jp のセレクタで最初のカードから段数を求める）
+    """
+    name_selector = plan.name_selector if plan else NAME_SELECTOR
+    price_selector = plan.price_selector if plan else PRICE_SELECTOR
+    card_depth = plan.card_depth if plan else None
+    for name_elem in soup.select(name_selector):
+        name = name_elem.get_text(strip=True)
+        if keyword and keyword not in name:
+            continue
+
+        card = price_elem = None
+        if card_depth is not None:
+            card = _ancestor(name_elem, card_depth)
+            # 段数は最初のカードで求めたもの。構造の異なるカードで隣のカードまで含む祖先に
+            # なった場合は使わない（隣のカードの価格・詳細リンクを拾うため）
+            if card is not None and len(card.select(name_selector)) != 1:
+                card = None
+            if card is not None:
+                price_elem = card.select_one(price_selector)
+
+        if card is None:
+            # 最初のカード、または構造が異なるカードだけ祖先をたどって探す
+            depth = find_card_depth(name_elem, name_selector, price_selector)
+            if depth is not None:
+                card = _ancestor(name_elem, depth)
+                price_elem = card.select_one(price_selector)
+                if card_depth is None:
+                    card_depth = depth
+
+        yield name, card, price_elem
+
+
+def card_fields(card, price_elem=None):
+    """カードから (価格, 年式, 新着) を返す"""
+    if card is None:
+        return "価格不明", "年式不明", False
+
+    if price_elem is None:
+        price_elem = card.select_one(PRICE_SELECTOR)
+    price = price_elem.get_text(strip=True) if price_elem else "価格不明"
+
+    # カードのテキストは1回だけ取り出す
+    fields = extract_fields(card_text(card))
+    year = fields.year_text or "年式不明"
+    is_new = fields.is_new
+
+    return price, year, is_new
+
+
+def card_detail_url(card, base_url):
+    """カード内の詳細ページへのリンク（絶対URL。無ければ None）"""
+    if card is None:
+        return None
+    link = card.select_one(DETAIL_LINK_SELECTOR)
+    href = link.get("href") if link is not None else None
+    return urljoin(base_url, href) if href else None
+
+
+def parse_listing_page(html, search_url, keyword=None, backend=None):
+    """
+    一覧ページのHTMLから車両レコードのリストを返す
+
+    モジュール直下の関数で、引数・戻り値ともpickleできる（ParsePoolの別プロセスで実行できる）
+    解析木は返さず、車両ごとの小さな辞書だけを返す
+
+    Args:
+        html: 一覧ページのHTML
+        search_url: 車両レコードの url に入れる検索URL
+        keyword: 車名に含まれる車両のみ返す
+        backend: make_soup() のバックエンド（省略時は環境変数 HTML_PARSER）
+    """
+    soup = make_soup(html, backend)
+    plan = DEFAULT_PLAN_CACHE.plan_for(html, soup)
+    detected_at = datetime.now().isoformat()
+    vehicles = []
+    for name, card, price_elem in iter_cards(soup, keyword=keyword, plan=plan):
+        price, year, is_new = card_fields(card, price_elem)
+        vehicle = {
+            "name": name,
+            "price": price,
+            "year": year,
+            "is_new": is_new,
+            "detected_at": detected_at,
+            "url": search_url
+        }
+        detail_url = card_detail_url(card, search_url)
+        if detail_url:
+            vehicle["detail_url"] = detail_url
+        vehicles.append(vehicle)
+    return vehicles
@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+"""
+toyota.jp 検索結果ページの取得
+HTTP取得を先に試し、車両カードが無い場合のみブラウザ（DOM/JSON取得）に切り替える
+"""
+
+import asyncio
+from contextlib import asynccontextmanager
+from page_wait import DEFAULT_CEILING_MS, goto_listings
+from request_blocker import ResourceBlocker
+from carlist_json import ResponseCapture
+from page_extract import extract_cards, cards_fingerprint_source, vehicles_from_cards
+from http_fetcher import RESULT_CARD_PATTERN
+from fingerprint import result_fingerprint
+
+# 取得モード
+#   dom:    表示後のHTMLを解析
+#   json:   ページが読み込む一覧JSONを直接変換（見つからなければDOM解析）
+#   script: ページ内で車両カードの項目だけを抽出（HTMLを転送・解析しない）
+FETCH_MODES = ("dom", "json", "script")
+
+
+class FetchedPage:
+    """
+    取得したHTMLと取得方法
+
+    同じ CarlistFetcher で複数のページを同時に取得するため、取得方法・車名要素の数は
+    インスタンスに残さず結果ごとに返す
+    """
+    __slots__ = ("html", "source", "card_count")
+
+    def __init__(self, html, source, card_count=0):
+        self.html = html
+        self.source = source          # "http" / "dom"
+        self.card_count = card_count  # 表示を確認した車名要素の数
+
+
+class ListingPage(list):
+    """
+    1ページ分の車両レコードと変更検知の結果
+
+    key: 変更検知のキー（URL。地域別検索では URL#地域）
+    fingerprint: 今回の指紋。車両を差分・保存し終えたら ChangeDetector.commit(key, fingerprint) で確定する
+    unchanged: 確定済みの指紋と同じため解析を省略した（車両は空）
+    """
+    __slots__ = ("key", "fingerprint", "unchanged")
+
+    def __init__(self, vehicles=(), key=None, fingerprint=None, unchanged=False):
+        super().__init__(vehicles)
+        self.key = key
+        self.fingerprint = fingerprint
+        self.unchanged = unchanged
+
+
+class CarlistFetcher:
+    def __init__(self, browser_pool, wait_stats=None, ceiling_ms=DEFAULT_CEILING_MS,
+                 block_resources=False, fetch_mode="dom", record_dir=None,
+                 http_fetcher=None, change_detector=None, parse_pool=None, log=print):
+        if fetch_mode not in FETCH_MODES:
+            raise ValueError(f"不明な取得モード: {fetch_mode}")
+
+        self.browser_pool = browser_pool
+        self.wait_stats = wait_stats
+        self.ceiling_ms = ceiling_ms
+        self.block_resources = block_resources
+        self.fetch_mode = fetch_mode
+        self.record_dir = record_dir
+        self.http_fetcher = http_fetcher
+        self.change_detector = change_detector
+        # 指定時は解析をワーカーで実行（parse_html はpickleできる関数にする）
+        self.parse_pool = parse_pool
+        self.log = log
+
+        # 直近の取得結果
+        self.last_blocker = None
+
+    @asynccontextmanager
+    async def _open(self, url, capture=None, context_options=None):
+        """ページを開いて車両カードの表示まで待ち、(ページ, 車名要素の数) を返す"""
+        blocker = ResourceBlocker() if self.block_resources else None
+
+        async with self.browser_pool.page(**(context_options or {})) as page:
+            if blocker:
+                await blocker.install(page)
+            if capture:
+                capture.attach(page)
+            try:
+                card_count = await goto_listings(
+                    page, url, ceiling_ms=self.ceiling_ms, stats=self.wait_stats
+                )
+                yield page, card_count
+            finally:
+                if capture:
+                    capture.detach(page)
+                if blocker:
+                    await blocker.uninstall(page)
+
+        if self.wait_stats:
+            self.wait_stats.save()
+        if blocker:
+            self.last_blocker = blocker
+            self.log(blocker.report())
+
+    async def _fetch_http(self, url):
+        """HTTPのみで車両カードを含むHTMLが取れればそれを返す"""
+        if self.http_fetcher is None:
+            return None
+        html = await asyncio.to_thread(self.http_fetcher.fetch_listing_html, url)
+        if html is None:
+            return None
+        self.log("HTTP取得で車両カードを確認（ブラウザ不要）")
+        return FetchedPage(html, "http", len(RESULT_CARD_PATTERN.findall(html)))
+
+    async def fetch_html(self, url):
+        """検索結果ページのHTMLを取得し、FetchedPage を返す"""
+        fetched = await self._fetch_http(url)
+        if fetched is not None:
+            return fetched
+        return await self.fetch_browser_html(url)
+
+    async def fetch_browser_html(self, url, **context_options):
+        """ブラウザで表示してHTMLを取得し、FetchedPage を返す
+
+        context_options（位置情報など）を指定した場合は専用のコンテキストで表示する
+        """
+        async with self._open(url, context_options=context_options) as (page, card_count):
+            html = await page.content()
+        return FetchedPage(html, "dom", card_count)
+
+    async def fetch_browser_vehicles(self, url, parse_html, keyword=None, change_key=None, **context_options):
+        """ブラウザで表示し、ページ内で抽出した車両カードを車両レコードにして返す
+
+        ページに車名要素が無い場合のみHTMLを取得して parse_html で解析する
+        change_key: 変更検知のキー（省略時はURL）
+        """
+        change_key = change_key or url
+        html = None
+        async with self._open(url, context_options=context_options) as (page, _):
+            name_count, cards = await extract_cards(page, keyword=keyword)
+            if name_count == 0:
+                html = await page.content()
+
+        if html is not None:
+            self.log("ページ内に車両カードが見つからないためDOMを解析")
+            return await self.parse_if_changed(change_key, html, parse_html)
+
+        fingerprint, unchanged = self._check_unchanged(change_key, cards_fingerprint_source(cards))
+        if unchanged:
+            return ListingPage(key=change_key, fingerprint=fingerprint, unchanged=True)
+        return ListingPage(vehicles_from_cards(cards, url), change_key, fingerprint)
+
+    def _check_unchanged(self, key, html):
+        """(今回の指紋, 確定済みの指紋と同じか)（変更検知が無効なら (None, False)）"""
+        if not self.change_detector:
+            return None, False
+        fingerprint = result_fingerprint(html)
+        unchanged = self.change_detector.is_unchanged(key, html, fingerprint)
+        self.change_detector.record(unchanged)
+        return fingerprint, unchanged
+
+    async def parse_if_changed(self, url, html, parse_html):
+        """前回と同じ検索結果なら解析を省略して空の ListingPage を返す"""
+        fingerprint, unchanged = self._check_unchanged(url, html)
+        if unchanged:
+            return ListingPage(key=url, fingerprint=fingerprint, unchanged=True)
+        if self.parse_pool is not None:
+            vehicles = await self.parse_pool.run(parse_html, html)
+        else:
+            vehicles = parse_html(html)
+        return ListingPage(vehicles, url, fingerprint)
+
+    async def fetch_vehicles(self, url, parse_html, keyword=None):
+        """車両レコードを取得
+
+        HTTP取得で車両カードが得られればブラウザを使わない。
+        jsonモードでは一覧JSONを優先し、該当するレスポンスが無い場合のみ
+        HTMLを取得して parse_html で解析する。
+        scriptモードではページ内で抽出したカードを使い、HTMLは転送しない
+        """
+        fetched = await self._fetch_http(url)
+        if fetched is not None:
+            return await self.parse_if_changed(url, fetched.html, parse_html)
+
+        if self.fetch_mode == "dom":
+            fetched = await self.fetch_browser_html(url)
+            return await self.parse_if_changed(url, fetched.html, parse_html)
+
+        if self.fetch_mode == "script":
+            return await self.fetch_browser_vehicles(url, parse_html, keyword=keyword)
+
+        capture = ResponseCapture(record_dir=self.record_dir)
+        html = None
+        async with self._open(url, capture=capture) as (page, _):
+            vehicles = await capture.vehicles(url, keyword=keyword)
+            if vehicles is None:
+                html = await page.content()
+
+        if vehicles is not None:
+            self.log(f"一覧JSONから{len(vehicles)}台を取得")
+            return ListingPage(vehicles, url)
+
+        self.log("一覧JSONが見つからないためDOMを解析")
+        return await self.parse_if_changed(url, html, parse_html)
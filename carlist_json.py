@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+"""
+carlistのバックエンドJSONから車両情報を取得
+ページ自身が読み込む一覧データを page.on("response") で受け取り、DOMを解析せずに車両レコードへ変換する
+"""
+
+import json
+import re
+from datetime import datetime
+from pathlib import Path
+
+# 一覧データとみなすレスポンスのURLキーワード（部分一致）
+LISTING_URL_KEYWORDS = ("carlist", "search", "ucar", "stock", "list")
+
+# 各項目の候補キー（小文字で比較）
+NAME_KEYS = ("carname", "car_name", "carnm", "fullcarnm", "fullcarname", "name", "cn", "shamei")
+GRADE_KEYS = ("grade", "gradename", "grade_name", "gradenm")
+PRICE_KEYS = ("totalprice", "total_price", "paymenttotal", "shiharaisogaku", "price", "carprice", "car_price", "bodyprice")
+YEAR_KEYS = ("year", "modelyear", "model_year", "nenshiki", "shodotoroku", "firstregistration", "ym")
+NEW_KEYS = ("isnew", "is_new", "new", "newflg", "new_flag", "newarrival", "new_arrival")
+ID_KEYS = ("id", "ucarid", "ucar_id", "carid", "car_id", "stockid", "stock_id", "detailid")
+
+YEAR_PATTERN = re.compile(r'(19|20)\d{2}')
+
+
+def _lower_keys(record):
+    return {str(k).lower(): v for k, v in record.items()}
+
+
+def _pick(record, keys):
+    for key in keys:
+        value = record.get(key)
+        if value not in (None, ""):
+            return value
+    return None
+
+
+def _looks_like_vehicle(record):
+    if not isinstance(record, dict):
+        return False
+    lowered = _lower_keys(record)
+    return _pick(lowered, NAME_KEYS) is not None and _pick(lowered, PRICE_KEYS) is not None
+
+
+def find_vehicle_list(payload):
+    """JSON全体から車両らしいdictのリストを探す（最も件数の多いもの）"""
+    best = []
+    stack = [payload]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, dict):
+            stack.extend(node.values())
+        elif isinstance(node, list):
+            matches = [item for item in node if _looks_like_vehicle(item)]
+            if matches and len(matches) * 2 >= len(node) and len(matches) > len(best):
+                best = matches
+            stack.extend(item for item in node if isinstance(item, (dict, list)))
+    return best
+
+
+def format_price(value):
+    """価格を「143.8万円」形式に揃える（円単位の数値は万円に換算）"""
+    if isinstance(value, str):
+        if "万円" in value:
+            return value.strip()
+        digits = value.replace(",", "").replace("円", "").strip()
+        try:
+            value = float(digits)
+        except ValueError:
+            return value.strip()
+
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        return "価格不明"
+
+    man = value / 10000 if value >= 10000 else value
+    return f"{man:.1f}".rstrip("0").rstrip(".") + "万円"
+
+
+def format_year(value):
+    if value is None:
+        return "年式不明"
+    match = YEAR_PATTERN.search(str(value))
+    return f"{match.group(0)}年" if match else "年式不明"
+
+
+def _is_new(value):
+    if isinstance(value, str):
+        return value.strip().lower() in ("1", "true", "y", "yes", "new", "新着")
+    return bool(value)
+
+
+def parse_listing_json(payload, search_url, keyword=None):
+    """一覧JSONを parse_vehicles と同じ形式の車両レコードに変換"""
+    vehicles = []
+    for record in find_vehicle_list(payload):
+        lowered = _lower_keys(record)
+
+        name = str(_pick(lowered, NAME_KEYS)).strip()
+        grade = _pick(lowered, GRADE_KEYS)
+        if grade and str(grade) not in name:
+            name = f"{name} {grade}".strip()
+
+        if keyword and keyword not in name:
+            continue
+
+        vehicle = {
+            "name": name,
+            "price": format_price(_pick(lowered, PRICE_KEYS)),
+            "year": format_year(_pick(lowered, YEAR_KEYS)),
+            "is_new": _is_new(_pick(lowered, NEW_KEYS)),
+            "detected_at": datetime.now().isoformat(),
+            "url": search_url
+        }
+        listing_id = _pick(lowered, ID_KEYS)
+        if listing_id is not None:
+            vehicle["listing_id"] = str(listing_id)
+
+        vehicles.append(vehicle)
+    return vehicles
+
+
+def vehicles_from_payloads(payloads, search_url, keyword=None):
+    """[(url, payload)] のうち車両が最も多いものを変換（見つからなければNone）"""
+    best, best_count = None, 0
+    for _, payload in payloads:
+        count = len(find_vehicle_list(payload))
+        if count > best_count:
+            best, best_count = payload, count
+    if best is None:
+        return None
+    return parse_listing_json(best, search_url, keyword=keyword)
+
+
+class ResponseCapture:
+    """ページが受信したJSONレスポンスを保持"""
+
+    def __init__(self, record_dir=None):
+        self.record_dir = Path(record_dir) if record_dir else None
+        self._responses = []
+
+    def _on_response(self, response):
+        if response.request.resource_type not in ("xhr", "fetch"):
+            return
+        if "json" not in response.headers.get("content-type", ""):
+            return
+        if not any(keyword in response.url.lower() for keyword in LISTING_URL_KEYWORDS):
+            return
+        self._responses.append(response)
+
+    def attach(self, page):
+        page.on("response", self._on_response)
+
+    def detach(self, page):
+        page.remove_listener("response", self._on_response)
+
+    async def payloads(self):
+        """受信したJSONを読み込む（record_dir指定時は保存も行う）"""
+        results = []
+        for index, response in enumerate(self._responses):
+            try:
+                payload = await response.json()
+            except Exception:
+                continue
+            results.append((response.url, payload))
+
+            if self.record_dir:
+                self.record_dir.mkdir(parents=True, exist_ok=True)
+                name = datetime.now().strftime("%Y%m%d_%H%M%S") + f"_{index}.json"
+                with open(self.record_dir / name, 'w', encoding='utf-8') as f:
+                    json.dump({"url": response.url, "payload": payload}, f, ensure_ascii=False)
+        return results
+
+    async def vehicles(self, search_url, keyword=None):
+        """受信したJSONの中から車両一覧を探して変換（見つからなければNone）"""
+        return vehicles_from_payloads(await self.payloads(), search_url, keyword=keyword)
+
+
+def load_recorded_responses(record_dir):
+    """保存済みレスポンスを読み込む（テスト・再解析用）"""
+    recorded = []
+    for path in sorted(Path(record_dir).glob("*.json")):
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        recorded.append((data.get("url", path.name), data.get("payload", data)))
+    return recorded
@@ -5,65 +5,118 @@ GitHub Actions等のサーバーレス環境で動作
 """
 
 import os
-import json
 import asyncio
-import hashlib
+from functools import partial
 from datetime import datetime
 from pathlib import Path
-from playwright.async_api import async_playwright
-from bs4 import BeautifulSoup
 from dotenv import load_dotenv
 import requests
+from browser_pool import BrowserPool, CLOUD_LAUNCH_ARGS
+from page_wait import WaitStats
+from carlist_fetcher import CarlistFetcher
+from http_fetcher import HttpFetcher
+from pagination import PaginationCrawler
+from region_sweep import RegionSweep
+from fingerprint import ChangeDetector
+from parse_pool import ParsePool
+from card_extractor import parse_listing_page
+from vehicle_store import open_store, import_legacy
+from sighting_log import SightingLog
+from seen_filter import open_seen_filter
+from snapshot_diff import SnapshotDiff
+from listing_monitor import (
+    ListingMonitor, build_search_url, YEAR_FROM, MAX_PRICE,
+    BLOCK_RESOURCES, FETCH_MODE, RECORD_RESPONSES, HTTP_FIRST, CRAWL_ALL_PAGES, PAGE_CONCURRENCY,
+    REGION_SWEEP, CHANGE_DETECTION, PARSE_WORKERS, PARSE_POOL, LISTING_SOURCE, VEHICLE_STORE,
+    TRACK_LAST_SEEN, SEEN_FILTER, SEEN_FILTER_ERROR_RATE
+)
 
 # 環境変数読み込み
 load_dotenv()
 
 # 設定
-YEAR_FROM = "2019"
-MAX_PRICE = "160"
-DRIVE_TYPE = "2"  # 4WD/e-Four
+WAIT_CEILING_MS = 15000  # クラウド環境では表示待ち上限を長めに
+EXPORT_JSON = os.getenv("EXPORT_VEHICLES_JSON", "1") == "1"  # 新着があれば vehicles.json も書き出す（実行ごとに環境が消える場合）
 
 # ファイルパス（クラウド環境対応）
 DATA_DIR = Path("data")
-VEHICLES_DB = DATA_DIR / "vehicles.json"
+VEHICLES_DB = DATA_DIR / "vehicles.db"
+VEHICLES_JSON = DATA_DIR / "vehicles.json"  # GitHub Actions のバックアップ用（ワークフローが vehicles_backup.json と相互にコピー）
+BACKUP_FILE = Path("vehicles_backup.json")
+SIGHTINGS_DIR = DATA_DIR / "sightings"
+SEEN_FILTER_DIR = DATA_DIR / "seen_filter"
+LISTING_SNAPSHOT_FILE = DATA_DIR / "listing_snapshot.json"  # 前回のチェックの掲載（差分用）
 LOG_FILE = DATA_DIR / "monitor.log"
+WAIT_STATS_FILE = DATA_DIR / "wait_stats.json"
+RESPONSES_DIR = DATA_DIR / "responses"
+FINGERPRINTS_FILE = DATA_DIR / "fingerprints.json"
 
 # データディレクトリ作成
 DATA_DIR.mkdir(exist_ok=True)
 
-class CloudPriusMonitor:
+class CloudPriusMonitor(ListingMonitor):
     def __init__(self):
-        self.search_url = f"https://toyota.jp/ucar/carlist/?Tval=1&chk-detail-tvalue-sp-check=1&Cn=01_プリウス&Ymn={YEAR_FROM}&Drv={DRIVE_TYPE}&Pmx={MAX_PRICE}"
+        self.search_url = build_search_url()
         self.known_vehicles = self.load_known_vehicles()
+        # 目撃ログは全車両をメモリに持つので、フィルタを置いても車両ストアの照合は速くならない
+        self.seen_filter = open_seen_filter(
+            SEEN_FILTER_DIR, self.known_vehicles, error_rate=SEEN_FILTER_ERROR_RATE, log=self.log
+        ) if SEEN_FILTER and VEHICLE_STORE != "log" else None
+        self.listing_diff = SnapshotDiff(LISTING_SNAPSHOT_FILE)
+        if not self.known_vehicles:
+            # 車両データをリセットした場合は全ての掲載を新着として調べ直す
+            self.listing_diff.forget()
+        self.fetch_complete = False  # 直近の取得で全ページを確認できた
+        self.parsed_pages = {}  # このチェックで解析したページの指紋（保存できたら確定）: {変更検知のキー: 指紋}
+        # クラウド環境向けブラウザ設定（User-Agentを設定して検出回避）
+        self.browser_pool = BrowserPool(
+            launch_args=CLOUD_LAUNCH_ARGS,
+            context_options={
+                'extra_http_headers': {
+                    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
+                }
+            },
+            log=self.log
+        )
+        self.wait_stats = WaitStats(WAIT_STATS_FILE)
+        self.change_detector = ChangeDetector(FINGERPRINTS_FILE) if CHANGE_DETECTION else None
+        if self.change_detector and not self.known_vehicles:
+            # 車両データをリセットした場合は必ず解析し直す
+            self.change_detector.forget()
+        self.http_fetcher = HttpFetcher(conditional=True, log=self.log) if HTTP_FIRST else None
+        self.parse_pool = ParsePool(PARSE_WORKERS, kind=PARSE_POOL) if PARSE_WORKERS > 0 else None
+        # ワーカーに渡せるようにモジュール直下の関数で解析
+        self.parse_html = partial(parse_listing_page, search_url=self.search_url, keyword="プリウス")
+        self.fetcher = CarlistFetcher(
+            self.browser_pool, self.wait_stats,
+            ceiling_ms=WAIT_CEILING_MS, block_resources=BLOCK_RESOURCES,
+            fetch_mode=FETCH_MODE, record_dir=RESPONSES_DIR if RECORD_RESPONSES else None,
+            http_fetcher=self.http_fetcher, change_detector=self.change_detector,
+            parse_pool=self.parse_pool, log=self.log
+        )
+        self.crawler = PaginationCrawler(
+            self.fetcher, self.parse_html, concurrency=PAGE_CONCURRENCY, log=self.log
+        )
+        self.region_sweep = RegionSweep(self.fetcher, self.parse_html, keyword="プリウス", log=self.log)
         
     def load_known_vehicles(self):
-        """既知の車両リストを読み込み"""
-        # まずバックアップファイルをチェック
-        backup_file = Path("vehicles_backup.json")
-        if backup_file.exists():
-            try:
-                with open(backup_file, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-                    self.log(f"バックアップから{len(data)}台の車両データを復元")
-                    return data
-            except Exception as e:
-                self.log(f"バックアップ読み込みエラー: {e}")
-        
-        # 通常のファイルをチェック
-        if VEHICLES_DB.exists():
-            try:
-                with open(VEHICLES_DB, 'r', encoding='utf-8') as f:
-                    return json.load(f)
-            except Exception as e:
-                self.log(f"車両データ読み込みエラー: {e}")
-                return {}
-        return {}
+        """既知の車両ストアを開く（空のときはバックアップ・vehicles.json を取り込む）"""
+        if VEHICLE_STORE == "log":
+            store = SightingLog(SIGHTINGS_DIR)
+            import_legacy(store, [BACKUP_FILE, VEHICLES_JSON], source=LISTING_SOURCE, log=self.log)
+            return store
+        return open_store(VEHICLES_DB, [BACKUP_FILE, VEHICLES_JSON], source=LISTING_SOURCE, log=self.log,
+                          track_last_seen=TRACK_LAST_SEEN)
     
-    def save_known_vehicles(self):
-        """車両リストを保存"""
+    def save_known_vehicles(self, complete=False, export=False):
+        """
+        このチェックで追加・確認した車両をまとめて書き込み
+        complete: 全ページを確認した / export: vehicles.json も書き出す
+        """
+        if not super().save_known_vehicles(complete=complete) or not (export and EXPORT_JSON):
+            return
         try:
-            with open(VEHICLES_DB, 'w', encoding='utf-8') as f:
-                json.dump(self.known_vehicles, f, ensure_ascii=False, indent=2)
+            self.known_vehicles.export_json(VEHICLES_JSON)
         except Exception as e:
             self.log(f"車両データ保存エラー: {e}")
     
@@ -79,113 +132,40 @@ class CloudPriusMonitor:
         except Exception:
             pass
     
-    def generate_vehicle_id(self, vehicle_info):
-        """車両情報からユニークIDを生成"""
-        return hashlib.md5(vehicle_info.encode('utf-8')).hexdigest()[:8]
-    
-    async def fetch_current_vehicles(self):
-        """現在の車両リストを取得"""
+    async def iter_current_vehicles(self):
+        """現在の車両リストをページ単位で取得（全ページを取得できたら fetch_complete を True に）"""
+        self.fetch_complete = False
+        vehicle_count = 0
         try:
-            async with async_playwright() as pw:
-                # クラウド環境向けブラウザ設定
-                browser = await pw.chromium.launch(
-                    headless=True,
-                    args=[
-                        '--no-sandbox',
-                        '--disable-dev-shm-usage',
-                        '--disable-gpu',
-                        '--disable-background-timer-throttling',
-                        '--disable-backgrounding-occluded-windows',
-                        '--disable-renderer-backgrounding'
-                    ]
+            self.log(f"アクセス中: {self.search_url}")
+            if REGION_SWEEP:
+                # 地域別に検索（1ページ目のみ。地域間の重複は差分で除く）
+                async for page_vehicles in self.region_sweep.iter_regions(self.search_url):
+                    vehicle_count += len(page_vehicles)
+                    yield page_vehicles
+            elif CRAWL_ALL_PAGES:
+                # 全ページ巡回（HTMLを解析）
+                async for page_vehicles in self.crawler.iter_pages(self.search_url):
+                    vehicle_count += len(page_vehicles)
+                    yield page_vehicles
+                self.fetch_complete = self.crawler.complete
+            else:
+                page_vehicles = await self.fetcher.fetch_vehicles(
+                    self.search_url, self.parse_html, keyword="プリウス"
                 )
-                
-                page = await browser.new_page()
-                
-                # User-Agentを設定（検出回避）
-                await page.set_extra_http_headers({
-                    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
-                })
-                
-                self.log(f"アクセス中: {self.search_url}")
-                await page.goto(self.search_url)
-                await page.wait_for_timeout(8000)  # クラウド環境では長めに待機
-                
-                html = await page.content()
-                await browser.close()
-                
-            return self.parse_vehicles(html)
+                vehicle_count += len(page_vehicles)
+                yield page_vehicles
+            self.log(f"表示完了: 車両 {vehicle_count}台（{self.wait_stats.summary('toyota.jp')}）")
             
         except Exception as e:
             self.log(f"車両取得エラー: {e}")
-            return []
     
     def parse_vehicles(self, html):
         """HTMLから車両情報を解析"""
-        soup = BeautifulSoup(html, "html.parser")
-        vehicles = []
-        
-        car_names = soup.select("p.detais-name2")
-        self.log(f"検出された車名要素: {len(car_names)}個")
-        
-        for name_elem in car_names:
-            try:
-                car_name = name_elem.get_text(strip=True)
-                
-                # プリウス以外はスキップ
-                if "プリウス" not in car_name:
-                    continue
-                
-                # 価格を探す
-                parent = name_elem.parent
-                price = "価格不明"
-                attempts = 0
-                while parent and parent.name != 'body' and attempts < 10:
-                    price_elem = parent.select_one("p.car-price-sub")
-                    if price_elem:
-                        price = price_elem.get_text(strip=True)
-                        break
-                    parent = parent.parent
-                    attempts += 1
-                
-                # 新着バッジチェック
-                is_new = False
-                if parent:
-                    context = parent.get_text()
-                    is_new = "NEW" in context or "新着" in context
-                
-                vehicle_info = {
-                    "name": car_name,
-                    "price": price,
-                    "is_new": is_new,
-                    "detected_at": datetime.now().isoformat(),
-                    "search_url": self.search_url
-                }
-                
-                vehicles.append(vehicle_info)
-                
-            except Exception as e:
-                self.log(f"車両解析エラー: {e}")
-                continue
-        
+        vehicles = parse_listing_page(html, self.search_url, keyword="プリウス")
         self.log(f"プリウス車両数: {len(vehicles)}台")
         return vehicles
     
-    def find_new_vehicles(self, current_vehicles):
-        """新着車両を検出"""
-        new_vehicles = []
-        
-        for vehicle in current_vehicles:
-            vehicle_id = self.generate_vehicle_id(f"{vehicle['name']}_{vehicle['price']}")
-            
-            if vehicle_id not in self.known_vehicles:
-                # 新しい車両を発見
-                self.known_vehicles[vehicle_id] = vehicle
-                new_vehicles.append(vehicle)
-                self.log(f"🆕 新着車両発見: {vehicle['name']} - {vehicle['price']}")
-        
-        return new_vehicles
-    
     def send_slack_notification(self, new_vehicles, is_status=False):
         """Slack通知"""
         webhook_url = os.getenv("SLACK_WEBHOOK_URL")
@@ -223,16 +203,41 @@ class CloudPriusMonitor:
         self.log("=== プリウス監視システム開始 ===")
         self.log(f"監視条件: {YEAR_FROM}年以降, 4WD/e-Four, {MAX_PRICE}万円以下")
         
-        # 現在の車両を取得
-        current_vehicles = await self.fetch_current_vehicles()
-        self.log(f"現在の該当車両数: {len(current_vehicles)}台")
+        if self.change_detector:
+            self.change_detector.start_check()
+        self.listing_diff.start()
+        self.parsed_pages = {}
+        
+        # 現在の車両を取得（ページが届くたびに新着判定）
+        current_vehicles = []
+        kept_count = 0  # 解析を省略したページ（前回と同じ内容）の台数
+        new_vehicles = []
+        pages_known = True  # 解析を省略したページの前回の掲載が全て分かる
+        async for page_vehicles in self.iter_current_vehicles():
+            if page_vehicles.unchanged:
+                kept = self.keep_unchanged_page(page_vehicles)
+                if kept is None:
+                    pages_known = False
+                else:
+                    kept_count += kept
+                continue
+            current_vehicles.extend(page_vehicles)
+            new_vehicles.extend(self.find_new_vehicles(page_vehicles, page=page_vehicles.key))
+            if page_vehicles.fingerprint is not None:
+                self.parsed_pages[page_vehicles.key] = page_vehicles.fingerprint
+        self.log_change_detection()
+        
+        if self.change_detector and self.change_detector.all_unchanged:
+            self.log("📭 検索結果に変更なし（解析・新着判定を省略）")
+        self.log(f"現在の該当車両数: {len(current_vehicles) + kept_count}台")
         
-        if not current_vehicles:
+        if not current_vehicles and not kept_count and pages_known:
             self.log("⚠️ 車両が検出されませんでした。サイトの構造変更の可能性があります。")
             return
-        
-        # 新着車両をチェック
-        new_vehicles = self.find_new_vehicles(current_vehicles)
+        complete = self.fetch_complete and pages_known
+        removed = self.find_removed_vehicles(complete)
+        if removed:
+            self.log(f"📤 掲載終了 {len(removed)}台")
         
         if new_vehicles:
             self.log(f"🎉 新着車両 {len(new_vehicles)}台 を発見！")
@@ -242,13 +247,12 @@ class CloudPriusMonitor:
                 self.log("✅ Slack新着通知送信完了")
             else:
                 self.log("❌ Slack新着通知送信失敗")
-            
-            # データ保存
-            self.save_known_vehicles()
-            
         else:
             self.log("📭 新着車両なし")
         
+        # データ保存（このチェックの追加・確認分をまとめて書き込み）
+        self.save_known_vehicles(complete=complete, export=bool(new_vehicles))
+        
         # 現在の車両一覧をログ出力
         self.log("📋 現在監視中の車両:")
         for i, vehicle in enumerate(current_vehicles[:5], 1):  # 最大5台まで表示
@@ -270,7 +274,10 @@ class CloudPriusMonitor:
 async def main():
     """メイン関数"""
     monitor = CloudPriusMonitor()
-    await monitor.run_single_check()
+    try:
+        await monitor.run_single_check()
+    finally:
+        await monitor.close()
 
 if __name__ == "__main__":
     asyncio.run(main())
\ No newline at end of file
@@ -41,4 +41,15 @@ PREFERRED_REGIONS = [
     "神奈川", 
     "千葉",
     "埼玉"
-]
\ No newline at end of file
+]
+
+# 地域ごとの位置情報（地域別の在庫確認用）
+REGION_COORDINATES = {
+    "東京": {"latitude": 35.6762, "longitude": 139.6503},
+    "神奈川": {"latitude": 35.4478, "longitude": 139.6425},
+    "千葉": {"latitude": 35.6073, "longitude": 140.1063},
+    "埼玉": {"latitude": 35.8617, "longitude": 139.6455},
+    "大阪": {"latitude": 34.6937, "longitude": 135.5023},
+    "名古屋": {"latitude": 35.1815, "longitude": 136.9066},
+    "福岡": {"latitude": 33.5904, "longitude": 130.4017},
+}
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+複数URLの並列取得エンジン
+1つのブラウザで最大N枚のページを同時に使い、完了した順に結果を返す
+"""
+
+import asyncio
+import time
+from carlist_fetcher import CarlistFetcher
+from page_wait import DEFAULT_CEILING_MS
+
+# 同時に開くページ数
+DEFAULT_CONCURRENCY = 4
+
+# 1URLあたりのタイムアウト（秒）
+DEFAULT_URL_TIMEOUT = 30
+
+
+class FetchResult:
+    __slots__ = ("index", "url", "html", "error", "elapsed", "source")
+
+    def __init__(self, index, url, html=None, error=None, elapsed=0.0, source=None):
+        self.index = index
+        self.url = url
+        self.html = html
+        self.error = error
+        self.elapsed = elapsed
+        self.source = source
+
+    @property
+    def ok(self):
+        return self.error is None
+
+
+class FetchEngine:
+    def __init__(self, browser_pool, concurrency=DEFAULT_CONCURRENCY, timeout=DEFAULT_URL_TIMEOUT,
+                 wait_stats=None, ceiling_ms=DEFAULT_CEILING_MS, block_resources=False,
+                 http_fetcher=None, fetcher=None, log=print):
+        self.browser_pool = browser_pool
+        self.concurrency = concurrency
+        self.timeout = timeout
+        self.log = log
+        # 既存のCarlistFetcherを渡した場合はその設定（遮断・HTTP取得など）を共有
+        self.fetcher = fetcher or CarlistFetcher(
+            browser_pool, wait_stats, ceiling_ms=ceiling_ms,
+            block_resources=block_resources, http_fetcher=http_fetcher, log=log
+        )
+        # 同時に使うページ数だけプールに残しておく
+        browser_pool.max_idle_pages = max(browser_pool.max_idle_pages, concurrency)
+
+    async def _fetch_one(self, semaphore, index, url):
+        async with semaphore:
+            start = time.monotonic()
+            try:
+                # 取得方法は他のページの取得で上書きされないよう戻り値から取る
+                fetched = await asyncio.wait_for(self.fetcher.fetch_html(url), timeout=self.timeout)
+                return FetchResult(index, url, html=fetched.html, elapsed=time.monotonic() - start,
+                                   source=fetched.source)
+            except asyncio.TimeoutError:
+                return FetchResult(index, url, error=f"タイムアウト（{self.timeout}秒）",
+                                   elapsed=time.monotonic() - start)
+            except Exception as e:
+                return FetchResult(index, url, error=str(e), elapsed=time.monotonic() - start)
+
+    async def iter_fetch(self, urls):
+        """URLを並列に取得し、完了した順に FetchResult を返す非同期イテレータ"""
+        semaphore = asyncio.Semaphore(self.concurrency)
+        tasks = [
+            asyncio.create_task(self._fetch_one(semaphore, index, url))
+            for index, url in enumerate(urls)
+        ]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                yield await next_done
+        finally:
+            # 途中で打ち切られた場合は残りをキャンセル
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def fetch_all(self, urls):
+        """すべて取得してURLの順序で返す"""
+        results = [result async for result in self.iter_fetch(urls)]
+        return sorted(results, key=lambda result: result.index)
@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+車両カードの項目抽出
+カードのテキストを1回だけ取り出し、コンパイル済みのパターンで年式・走行距離・販売店・新着を一度に求める
+toyota.jp の一覧（card_extractor）と gazoo の検索結果（toyota_used_car_search）で共通に使う
+"""
+
+import re
+from vehicle import parse_mileage_km
+
+# 年式（西暦4桁＋年）。toyota.jp の表示用年式はこれを含む行全体（"2019年(R1年)"）
+YEAR_PATTERN = re.compile(r'((?:19|20)\d{2})年')
+# "km" の直前だけを調べる走行距離（"12,000km" / "3.2万km"）
+MILEAGE_TAIL_PATTERN = re.compile(r'(\d[\d,]*(?:\.\d+)?)\s*(?:万)?\s*km$')
+MILEAGE_WINDOW = 24
+DEALER_PATTERN = re.compile(r'トヨタモビリティ[^\n\r]+')
+DEALER_MARKER = "トヨタモビリティ"
+NEW_MARKERS = ("NEW", "新着")
+
+# カードのテキストを取り出すときの区切り（要素ごとのテキストを行に分ける）
+TEXT_SEPARATOR = "\n"
+
+
+class CardFields:
+    __slots__ = ("year", "year_text", "mileage", "dealer", "is_new")
+
+    def __init__(self, year=None, year_text=None, mileage=None, dealer=None, is_new=False):
+        self.year = year            # 西暦（"2019"）
+        self.year_text = year_text  # 年式を含む行（"2019年(R1年)"）
+        self.mileage = mileage      # km
+        self.dealer = dealer
+        self.is_new = is_new
+
+
+def card_text(elem):
+    """抽出に使うカードのテキスト（1回の走査で取得）"""
+    return elem.get_text(separator=TEXT_SEPARATOR)
+
+
+def extract_fields(text):
+    """card_text() のテキストから全項目を求める"""
+    fields = CardFields(is_new=any(marker in text for marker in NEW_MARKERS))
+
+    if "年" in text:
+        year_match = YEAR_PATTERN.search(text)
+        if year_match:
+            fields.year = year_match.group(1)
+            line_start = text.rfind(TEXT_SEPARATOR, 0, year_match.start()) + 1
+            line_end = text.find(TEXT_SEPARATOR, year_match.end())
+            fields.year_text = text[line_start:line_end if line_end >= 0 else len(text)].strip()
+
+    # 正規表現はテキスト全体ではなく各 "km" の直前にだけ適用する
+    km = text.find("km")
+    while km >= 0:
+        mileage_match = MILEAGE_TAIL_PATTERN.search(text, max(0, km - MILEAGE_WINDOW), km + 2)
+        if mileage_match:
+            fields.mileage = parse_mileage_km(mileage_match.group(0))
+            break
+        km = text.find("km", km + 2)
+
+    if DEALER_MARKER in text:
+        dealer_match = DEALER_PATTERN.search(text)
+        if dealer_match:
+            fields.dealer = dealer_match.group(0).strip()
+
+    return fields
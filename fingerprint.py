@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+検索結果の変更検知
+車両カードの項目（車名・価格・詳細リンク・年式・新着）だけを正規化してハッシュ化し、前回と同じページは解析を省略する
+指紋は判定では更新せず、そのページの車両を差分・保存し終えてから commit() で確定する
+（解析や保存に失敗したページを次回「変更なし」として飛ばさないため）
+"""
+
+import hashlib
+import json
+import re
+from pathlib import Path
+
+# 車両カードの車名要素（カードの位置）
+CARD_NAME_PATTERN = re.compile(r'<p[^>]*class="[^"]*\bdetais-name2\b[^"]*"[^>]*>')
+# 指紋に含めるカードの項目（車両の判定・差分に使うもの）: 車名・価格、詳細ページへのリンク、
+# 年式を含む行・新着バッジ（card_extractor・field_extractor と同じ規則）
+CARD_TOKEN_PATTERN = re.compile(
+    r'<p[^>]*class="[^"]*\b(?:detais-name2|car-price-sub)\b[^"]*"[^>]*>(.*?)</p>'
+    r'|<a\b[^>]*?\bhref="([^"]*detail[^"]*)"'
+    r'|>([^<>]*(?:(?:19|20)\d{2}年|NEW|新着)[^<>]*)<',
+    re.S
+)
+# 最初のカードの車名より前（詳細リンク）・最後のカードの車名より後（価格・年式等）に見る文字数
+CARD_WINDOW = 2000
+TAG_PATTERN = re.compile(r'<[^>]+>')
+SPACE_PATTERN = re.compile(r'\s+')
+
+# カードが見つからない場合にページ全体から除外するもの
+NOISE_PATTERNS = [
+    re.compile(r'<script\b.*?</script>', re.S | re.I),
+    re.compile(r'<style\b.*?</style>', re.S | re.I),
+    re.compile(r'<!--.*?-->', re.S),
+    re.compile(r'\d{4}[-/年]\d{1,2}[-/月]\d{1,2}日?'),  # 日付
+    re.compile(r'\d{1,2}:\d{2}(?::\d{2})?'),  # 時刻
+]
+
+
+def result_fingerprint(html):
+    """
+    検索結果部分の指紋（広告・タイムスタンプ等の変化は無視）
+
+    車名・価格だけでなく詳細リンク・年式・新着バッジも含める
+    （同じ車名・価格の別の車両に入れ替わったページを「変更なし」にしない）
+    """
+    names = [match.start() for match in CARD_NAME_PATTERN.finditer(html)]
+    if names:
+        begin = max(0, names[0] - CARD_WINDOW)
+        end = min(len(html), names[-1] + CARD_WINDOW)
+        tokens = ("".join(groups) for groups in CARD_TOKEN_PATTERN.findall(html, begin, end))
+        normalized = "\n".join(SPACE_PATTERN.sub(" ", TAG_PATTERN.sub("", token)).strip() for token in tokens)
+    else:
+        normalized = html
+        for pattern in NOISE_PATTERNS:
+            normalized = pattern.sub("", normalized)
+        normalized = SPACE_PATTERN.sub(" ", normalized)
+    return hashlib.sha1(normalized.encode('utf-8')).hexdigest()
+
+
+class ChangeDetector:
+    """URLごとに確定済みの指紋を保持し、変化の有無を判定"""
+
+    def __init__(self, path=None):
+        self.path = Path(path) if path else None
+        self.fingerprints = self._load()
+        self.changed = False  # 保存していない指紋の確定・破棄がある（無ければ save() は書き込まない）
+        self.hits = 0
+        self.misses = 0
+
+    def _load(self):
+        if self.path and self.path.exists():
+            try:
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    return json.load(f)
+            except Exception:
+                return {}
+        return {}
+
+    def save(self):
+        """指紋を書き込む（前回の保存から変わっていなければ何もしない）"""
+        if not self.path or not self.changed:
+            return
+        try:
+            with open(self.path, 'w', encoding='utf-8') as f:
+                json.dump(self.fingerprints, f, ensure_ascii=False)
+            self.changed = False
+        except Exception:
+            pass
+
+    def start_check(self):
+        """チェック1回分の集計をリセット"""
+        self.hits = 0
+        self.misses = 0
+
+    def is_unchanged(self, url, html, fingerprint=None):
+        """
+        確定済みの指紋と同じ内容ならTrue（指紋は更新しない）
+
+        fingerprint: 計算済みの result_fingerprint(html)（省略時は html から計算）
+        """
+        if fingerprint is None:
+            fingerprint = result_fingerprint(html)
+        return self.fingerprints.get(url) == fingerprint
+
+    def record(self, unchanged):
+        """判定結果をチェック1回分の集計に加える"""
+        if unchanged:
+            self.hits += 1
+        else:
+            self.misses += 1
+
+    def commit(self, url, fingerprint):
+        """ページの車両を差分・保存し終えた指紋を確定（次回からこの内容なら解析を省略）"""
+        if self.fingerprints.get(url) != fingerprint:
+            self.fingerprints[url] = fingerprint
+            self.changed = True
+
+    def forget(self, url=None):
+        """指紋を破棄（次回は必ず解析）"""
+        if url is None:
+            if self.fingerprints:
+                self.changed = True
+            self.fingerprints.clear()
+        elif self.fingerprints.pop(url, None) is not None:
+            self.changed = True
+
+    @property
+    def all_unchanged(self):
+        return self.hits > 0 and self.misses == 0
+
+    def report(self, not_modified=0):
+        message = f"内容ハッシュ: 一致 {self.hits}ページ / 変更 {self.misses}ページ"
+        if not_modified:
+            message += f"（HTTP 304: {not_modified}件）"
+        return message
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+HTML解析バックエンドの切り替え
+html.parser（標準・純Python）に加え、lxml（BeautifulSoupのCパーサー）・selectolax（lexbor）を選べる
+どのバックエンドでも select / select_one / get_text / get / parent / find_next_sibling だけで扱えるようにする
+"""
+
+import os
+from bs4 import BeautifulSoup, SoupStrainer
+
+try:
+    import lxml  # noqa: F401  BeautifulSoupの "lxml" ビルダーが使う
+    LXML_AVAILABLE = True
+except ImportError:
+    LXML_AVAILABLE = False
+
+try:
+    from selectolax.lexbor import LexborHTMLParser
+    SELECTOLAX_AVAILABLE = True
+except ImportError:
+    SELECTOLAX_AVAILABLE = False
+
+BACKENDS = ("html.parser", "lxml", "selectolax")
+
+# auto: 使える中で最速のもの（selectolax → lxml → html.parser）
+HTML_PARSER = os.getenv("HTML_PARSER", "auto")
+
+# BeautifulSoupの get_text() が含めない要素（スクリプト・スタイル等）
+NON_TEXT_TAGS = ("script", "style", "template", "rt", "rp")
+NON_TEXT_SELECTOR = ", ".join(NON_TEXT_TAGS)
+
+
+def available_backends():
+    """インストール済みで使えるバックエンド"""
+    backends = ["html.parser"]
+    if LXML_AVAILABLE:
+        backends.append("lxml")
+    if SELECTOLAX_AVAILABLE:
+        backends.append("selectolax")
+    return backends
+
+
+def resolve_backend(backend=None):
+    """設定値を実際に使うバックエンド名にする（未インストールなら html.parser）"""
+    backend = backend or HTML_PARSER
+    if backend == "auto":
+        return available_backends()[-1]
+    if backend not in BACKENDS:
+        raise ValueError(f"未対応のHTMLパーサー: {backend}（{', '.join(BACKENDS)} / auto）")
+    if backend not in available_backends():
+        return "html.parser"
+    return backend
+
+
+class LexborNode:
+    """selectolaxのノードをBeautifulSoupと同じ呼び方で扱うラッパー"""
+
+    __slots__ = ("node",)
+
+    def __init__(self, node):
+        self.node = node
+
+    @property
+    def name(self):
+        return self.node.tag
+
+    @property
+    def parent(self):
+        parent = self.node.parent
+        if parent is None or parent.is_document_node:
+            return None
+        return LexborNode(parent)
+
+    def get(self, key, default=None):
+        value = self.node.attributes.get(key, default)
+        if key == "class" and value is not None:
+            return value.split()
+        return value
+
+    def __getitem__(self, key):
+        return self.node.attributes[key]
+
+    def select(self, selector):
+        # lexborは自分自身も検索対象にするため除外（BeautifulSoupは子孫のみ）
+        nodes = self.node.css(selector)
+        if nodes and nodes[0] == self.node:
+            nodes = nodes[1:]
+        return [LexborNode(node) for node in nodes]
+
+    def select_one(self, selector):
+        node = self.node.css_first(selector)
+        if node is not None and node == self.node:
+            nodes = self.node.css(selector)
+            node = nodes[1] if len(nodes) > 1 else None
+        return LexborNode(node) if node is not None else None
+
+    def find_next_sibling(self, name):
+        sibling = self.node.next
+        while sibling is not None:
+            if sibling.tag == name:
+                return LexborNode(sibling)
+            sibling = sibling.next
+        return None
+
+    def get_text(self, separator="", strip=False):
+        if self.node.css_first(NON_TEXT_SELECTOR) is None:
+            return self.node.text(deep=True, separator=separator, strip=strip)
+
+        # スクリプト等を含む場合はテキストノードを個別に集める
+        texts = []
+        for node in self.node.traverse(include_text=True):
+            if not node.is_text_node:
+                continue
+            parent = node.parent
+            if parent is not None and parent.tag in NON_TEXT_TAGS:
+                continue
+            text = node.text_content or ""
+            if strip:
+                text = text.strip()
+                if not text:
+                    continue
+            texts.append(text)
+        return separator.join(texts)
+
+
+def make_soup(html, backend=None, only_ids=None):
+    """
+    HTMLを解析してルート要素を返す
+
+    Args:
+        html: HTML文字列
+        backend: "html.parser" / "lxml" / "selectolax" / "auto"（省略時は環境変数 HTML_PARSER）
+        only_ids: 指定したidの要素（とその子孫）だけを木にする
+                  BeautifulSoup系ではSoupStrainerで他の部分を組み立てない（selectolaxは全体を解析）
+    """
+    backend = resolve_backend(backend)
+    if backend == "selectolax":
+        return LexborNode(LexborHTMLParser(html).root)
+    parse_only = SoupStrainer(id=list(only_ids)) if only_ids else None
+    return BeautifulSoup(html, backend, parse_only=parse_only)
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+ブラウザを使わないHTTP取得
+サーバーが返したHTMLに車両カードが含まれていれば、Chromiumを起動せずに済ませる
+"""
+
+import re
+import zlib
+import requests
+
+USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
+
+# 車両カード（車名要素）の有無
+RESULT_CARD_PATTERN = re.compile(r'class="[^"]*\bdetais-name2\b')
+
+HTTP_TIMEOUT = 10
+
+
+def has_result_cards(html):
+    """HTMLに車両カードが含まれているか"""
+    return bool(html) and RESULT_CARD_PATTERN.search(html) is not None
+
+
+class HttpFetcher:
+    def __init__(self, timeout=HTTP_TIMEOUT, conditional=False, log=print):
+        self.timeout = timeout
+        self.conditional = conditional
+        self.log = log
+
+        # 条件付きリクエスト用（URL → (ETag, Last-Modified, 圧縮した本文)）
+        self._validators = {}
+        self.not_modified = 0
+        self.session = requests.Session()
+        self.session.headers.update({
+            'User-Agent': USER_AGENT,
+            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
+            'Accept-Language': 'ja,en;q=0.8',
+        })
+
+    def get(self, url):
+        """HTMLを取得（失敗時はNone）"""
+        headers = {}
+        cached = self._validators.get(url) if self.conditional else None
+        if cached:
+            etag, last_modified, _ = cached
+            if etag:
+                headers['If-None-Match'] = etag
+            if last_modified:
+                headers['If-Modified-Since'] = last_modified
+
+        try:
+            response = self.session.get(url, headers=headers, timeout=self.timeout)
+            if response.status_code == 304 and cached:
+                # 前回から変更なし（本文は前回分を使う）
+                self.not_modified += 1
+                return zlib.decompress(cached[2]).decode('utf-8')
+
+            response.raise_for_status()
+            # charset指定が無い場合、requestsはISO-8859-1とみなすためUTF-8に補正
+            if not response.encoding or response.encoding.lower() == 'iso-8859-1':
+                response.encoding = 'utf-8'
+            html = response.text
+
+            if self.conditional:
+                etag = response.headers.get('ETag')
+                last_modified = response.headers.get('Last-Modified')
+                if etag or last_modified:
+                    self._validators[url] = (etag, last_modified, zlib.compress(html.encode('utf-8')))
+            return html
+        except requests.exceptions.RequestException as e:
+            self.log(f"HTTP取得エラー: {e}")
+            return None
+
+    def fetch_listing_html(self, url):
+        """車両カードを含むHTMLが返ってきた場合のみ返す"""
+        html = self.get(url)
+        if has_result_cards(html):
+            return html
+        return None
@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+"""
+監視の共通部分（PriusMonitor / CloudPriusMonitor）
+検索条件・取得と保存の設定、掲載の差分から新着・掲載終了を判定して車両ストアに保存する処理
+"""
+
+import os
+import hashlib
+from dotenv import load_dotenv
+from vehicle import Vehicle, listing_key
+from snapshot_diff import EVENT_CHANGED
+
+# 下の設定を読む前に .env を反映
+load_dotenv()
+
+# 検索条件
+YEAR_FROM = "2019"
+MAX_PRICE = "160"
+DRIVE_TYPE = "2"  # 4WD/e-Four
+
+# 取得・保存の設定
+BLOCK_RESOURCES = os.getenv("BLOCK_RESOURCES", "0") == "1"  # 画像・計測タグ等を遮断
+FETCH_MODE = os.getenv("FETCH_MODE", "dom")  # dom: HTML解析 / json: 一覧JSONを直接取得 / script: ページ内で抽出
+RECORD_RESPONSES = os.getenv("RECORD_RESPONSES", "0") == "1"  # 一覧JSONを保存（テスト用）
+HTTP_FIRST = os.getenv("HTTP_FIRST", "1") == "1"  # まずブラウザなしのHTTP取得を試す
+CRAWL_ALL_PAGES = os.getenv("CRAWL_ALL_PAGES", "1") == "1"  # 2ページ目以降も巡回
+PAGE_CONCURRENCY = 4  # 同時に取得するページ数
+REGION_SWEEP = os.getenv("REGION_SWEEP", "0") == "1"  # config.PREFERRED_REGIONSの各地域から同時に検索
+CHANGE_DETECTION = os.getenv("CHANGE_DETECTION", "1") == "1"  # 前回と同じ検索結果は解析を省略
+PARSE_WORKERS = int(os.getenv("PARSE_WORKERS", "0"))  # HTML解析のワーカー数（0: イベントループ内で解析）
+PARSE_POOL = os.getenv("PARSE_POOL", "auto")  # auto / process / thread
+LISTING_SOURCE = "toyota.jp"  # 保存する車両レコード（Vehicle）の掲載元
+VEHICLE_STORE = os.getenv("VEHICLE_STORE", "sqlite")  # sqlite: SQLite / log: 追記型の目撃ログ
+TRACK_LAST_SEEN = os.getenv("TRACK_LAST_SEEN", "0") == "1"  # SQLite: 見かけた車両の last_seen をチェックごとに更新
+SEEN_FILTER = os.getenv("SEEN_FILTER", "1") == "1"  # 既知の車両IDをブルームフィルタで絞り込んでから車両ストアを調べる（SQLiteのみ）
+SEEN_FILTER_ERROR_RATE = float(os.getenv("SEEN_FILTER_ERROR_RATE", "0.001"))  # フィルタの誤判定率
+
+
+def build_search_url():
+    """検索条件からトヨタ認定中古車の一覧URLを作る"""
+    return f"https://toyota.jp/ucar/carlist/?Tval=1&chk-detail-tvalue-sp-check=1&Cn=01_プリウス&Ymn={YEAR_FROM}&Drv={DRIVE_TYPE}&Pmx={MAX_PRICE}"
+
+
+class ListingMonitor:
+    """
+    掲載の差分から新着・掲載終了を判定して車両ストアに保存する（各監視クラスの基底）
+
+    使う側が用意する属性: known_vehicles, seen_filter, listing_diff, change_detector,
+    http_fetcher, parse_pool, browser_pool, parsed_pages, log
+    """
+
+    def save_known_vehicles(self, complete=False):
+        """このチェックで追加・確認した車両をまとめて書き込み（complete: 全ページを確認した）"""
+        try:
+            self.known_vehicles.commit(complete=complete)
+            if self.seen_filter is not None:
+                self.seen_filter.flush(self.known_vehicles.generation)
+            # 掲載・指紋とも変わっていなければ書き込まない（全ページが前回と同じチェック等）
+            self.listing_diff.save()
+            self.commit_fingerprints()
+            return True
+        except Exception as e:
+            self.log(f"車両データ保存エラー: {e}")
+            return False
+
+    def generate_vehicle_id(self, vehicle_info):
+        """車両情報からIDを生成（以前の車両ID。保存済みデータの照合にのみ使う）"""
+        return hashlib.md5(vehicle_info.encode('utf-8')).hexdigest()[:8]
+
+    def log_change_detection(self):
+        """変更検知の結果を記録"""
+        if not self.change_detector:
+            return
+        not_modified = 0
+        if self.http_fetcher:
+            not_modified, self.http_fetcher.not_modified = self.http_fetcher.not_modified, 0
+        self.log(self.change_detector.report(not_modified))
+
+    def keep_unchanged_page(self, page_vehicles):
+        """
+        解析を省略したページ（前回と同じ内容）の前回の掲載を今回も見たものとし、その台数を返す
+        前回の掲載を記録していないページは次回解析し直すよう指紋を破棄して None を返す
+        """
+        kept = self.listing_diff.keep_page(page_vehicles.key)
+        if kept is None:
+            self.change_detector.forget(page_vehicles.key)
+            return None
+        for vehicle_id in kept:
+            self.known_vehicles.mark_seen(vehicle_id)
+        return len(kept)
+
+    def commit_fingerprints(self):
+        """車両を保存できたページの指紋を確定（保存に失敗したページは次回も解析する）"""
+        parsed_pages, self.parsed_pages = self.parsed_pages, {}
+        if not self.change_detector:
+            return
+        for key, fingerprint in parsed_pages.items():
+            self.change_detector.commit(key, fingerprint)
+        self.change_detector.save()
+
+    async def fetch_current_vehicles(self):
+        """現在の車両リストを取得"""
+        vehicles = []
+        async for page_vehicles in self.iter_current_vehicles():
+            vehicles.extend(page_vehicles)
+        return vehicles
+
+    def may_be_known(self, vehicle_id):
+        """既知の可能性がある車両IDか（フィルタで未登録と分かれば車両ストアを調べない）"""
+        return self.seen_filter is None or vehicle_id in self.seen_filter
+
+    def is_legacy_vehicle(self, vehicle_id, vehicle):
+        """
+        以前の車両ID（車名＋価格）で保存済みの車両か（該当すれば vehicle_id に付け替える）
+        以前の車両IDが残っている間だけ照合する
+        """
+        if not self.known_vehicles.legacy_count:
+            return False
+        legacy_id = self.generate_vehicle_id(f"{vehicle['name']}_{vehicle['price']}")
+        if not self.may_be_known(legacy_id) or legacy_id not in self.known_vehicles:
+            return False
+        self.known_vehicles.rekey(legacy_id, vehicle_id)
+        return True
+
+    def find_new_vehicles(self, current_vehicles, page=None):
+        """
+        新着車両を検出（前回のチェックから変わった掲載だけ車両ストアで確かめる）
+        page: ページのキー（次回そのページの解析を省略したときに掲載を引き継ぐ）
+        """
+        new_vehicles = []
+        listings = []
+        for vehicle in current_vehicles:
+            # 掲載元の車両IDで判定（値下げされても同じ車両）
+            current = Vehicle.from_dict(vehicle, source=LISTING_SOURCE)
+            listings.append((listing_key(current), current, vehicle))
+        events = {event.key: event for event in
+                  self.listing_diff.update(((vehicle_id, current) for vehicle_id, current, _ in listings),
+                                           page=page)}
+
+        for vehicle_id, current, vehicle in listings:
+            event = events.pop(vehicle_id, None)
+            if event is None:
+                # 前回のチェックと同じ掲載
+                self.known_vehicles.mark_seen(vehicle_id)
+                continue
+            known = self.known_vehicles.get(vehicle_id) if self.may_be_known(vehicle_id) else None
+
+            if known is None:
+                # 新しい車両を発見（保存は数値の Vehicle で）
+                self.known_vehicles[vehicle_id] = current
+                if self.seen_filter is not None:
+                    self.seen_filter.add(vehicle_id)
+                if self.is_legacy_vehicle(vehicle_id, vehicle):
+                    continue
+                new_vehicles.append(vehicle)
+                self.log(f"新着車両発見: {vehicle['name']} - {vehicle['price']}")
+            elif event.kind == EVENT_CHANGED:
+                self.known_vehicles[vehicle_id] = known.copy(
+                    **{field: after for field, (_, after) in event.changes.items()})
+                self.log(f"掲載内容の変更: {vehicle['name']} {event.describe()}")
+            elif known.price != current.price:
+                # 前回のチェックには無かった既知の車両（再掲載等）
+                self.known_vehicles[vehicle_id] = known.copy(price=current.price)
+                self.log(f"価格変更: {vehicle['name']} {known.price_text} → {current.price_text}")
+            else:
+                self.known_vehicles.mark_seen(vehicle_id)
+
+        return new_vehicles
+
+    def find_removed_vehicles(self, complete):
+        """前回のチェックにあって今回無かった掲載（全ページを確認した場合のみ）"""
+        removed = self.listing_diff.finish(complete=complete)
+        for event in removed:
+            self.log(f"掲載終了: {event.previous.name} - {event.previous.price_text}")
+        return removed
+
+    async def close(self):
+        """ブラウザと解析ワーカーを停止し、車両ストアを閉じる"""
+        await self.browser_pool.close()
+        if self.parse_pool:
+            self.parse_pool.close()
+        if self.seen_filter is not None:
+            self.seen_filter.flush(self.known_vehicles.generation)
+            self.seen_filter.close()
+        self.known_vehicles.close()
@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+ページ内での車両カード抽出
+page.evaluate でページ内にスクリプトを実行し、車両カードの項目だけを小さなJSON配列で受け取る
+（page.content() でHTML全体を転送して解析し直さない）
+抽出規則は card_extractor・field_extractor と同じ
+"""
+
+import json
+from datetime import datetime
+from card_extractor import NAME_SELECTOR, PRICE_SELECTOR, DETAIL_LINK_SELECTOR, MAX_CARD_DEPTH
+from html_parser_backend import NON_TEXT_TAGS
+from field_extractor import YEAR_PATTERN, NEW_MARKERS, TEXT_SEPARATOR
+
+EXTRACT_CARDS_SCRIPT = """
+([keyword, nameSelector, priceSelector, linkSelector, maxDepth, skipTags,
+  yearPattern, newMarkers, separator]) => {
+    const skip = new Set(skipTags.map((tag) => tag.toUpperCase()));
+    const yearRe = new RegExp(yearPattern);
+
+    // BeautifulSoupの get_text() と同じくスクリプト等の中身は含めない
+    const textOf = (el, strip, sep = "") => {
+        const parts = [];
+        const walker = document.createTreeWalker(el, NodeFilter.SHOW_TEXT);
+        for (let node = walker.nextNode(); node; node = walker.nextNode()) {
+            if (node.parentNode && skip.has(node.parentNode.nodeName)) continue;
+            const text = strip ? node.nodeValue.trim() : node.nodeValue;
+            if (text) parts.push(text);
+        }
+        return parts.join(sep);
+    };
+
+    const ancestor = (el, depth) => {
+        for (let i = 0; i < depth; i++) {
+            el = el.parentElement;
+            if (!el || el.nodeName === "BODY") return null;
+        }
+        return el;
+    };
+
+    const findCardDepth = (nameEl) => {
+        let parent = nameEl.parentElement;
+        for (let depth = 1; parent && parent.nodeName !== "BODY" && depth <= maxDepth; depth++) {
+            if (parent.querySelector(priceSelector)) {
+                return parent.querySelectorAll(nameSelector).length > 1 ? null : depth;
+            }
+            parent = parent.parentElement;
+        }
+        return null;
+    };
+
+    const names = document.querySelectorAll(nameSelector);
+    const cards = [];
+    let cardDepth = null;
+    for (const nameEl of names) {
+        const name = textOf(nameEl, true);
+        if (keyword && !name.includes(keyword)) continue;
+
+        let card = null;
+        if (cardDepth !== null) {
+            card = ancestor(nameEl, cardDepth);
+            // card_extractor.iter_cards と同じく、隣のカードまで含む祖先は使わない
+            if (card && card.querySelectorAll(nameSelector).length !== 1) card = null;
+        }
+        if (!card) {
+            const depth = findCardDepth(nameEl);
+            if (depth !== null) {
+                card = ancestor(nameEl, depth);
+                if (cardDepth === null) cardDepth = depth;
+            }
+        }
+
+        const record = {name: name, price: null, year: null, is_new: false, detail_url: null};
+        if (card) {
+            const priceEl = card.querySelector(priceSelector);
+            if (priceEl) record.price = textOf(priceEl, true);
+
+            // field_extractor.extract_fields と同じ規則（カードのテキストを1回だけ取り出す）
+            const context = textOf(card, false, separator);
+            record.is_new = newMarkers.some((marker) => context.includes(marker));
+            const yearMatch = yearRe.exec(context);
+            if (yearMatch) {
+                // 年式を含む行全体
+                const start = context.lastIndexOf(separator, yearMatch.index - 1) + 1;
+                const end = context.indexOf(separator, yearMatch.index + yearMatch[0].length);
+                record.year = context.slice(start, end < 0 ? context.length : end).trim();
+            }
+
+            const link = card.querySelector(linkSelector);
+            if (link) record.detail_url = link.href;
+        }
+        cards.push(record);
+    }
+    return {nameCount: names.length, cards: cards};
+}
+"""
+
+
+async def extract_cards(page, keyword=None):
+    """表示中のページから車両カードの項目を取得
+
+    Returns:
+        (ページ内の車名要素数, keyword に一致したカードのリスト)
+    """
+    result = await page.evaluate(
+        EXTRACT_CARDS_SCRIPT,
+        [keyword, NAME_SELECTOR, PRICE_SELECTOR, DETAIL_LINK_SELECTOR, MAX_CARD_DEPTH, list(NON_TEXT_TAGS),
+         YEAR_PATTERN.pattern, list(NEW_MARKERS), TEXT_SEPARATOR]
+    )
+    return result["nameCount"], result["cards"]
+
+
+def cards_fingerprint_source(cards):
+    """変更検知用にカード一覧を文字列化（detected_at 等を含まない）"""
+    return json.dumps(cards, ensure_ascii=False, sort_keys=True)
+
+
+def vehicles_from_cards(cards, search_url):
+    """ページ内で抽出したカードを parse_vehicles と同じ形式の車両レコードに変換"""
+    vehicles = []
+    for card in cards:
+        vehicle = {
+            "name": card["name"],
+            "price": card.get("price") or "価格不明",
+            "year": card.get("year") or "年式不明",
+            "is_new": bool(card.get("is_new")),
+            "detected_at": datetime.now().isoformat(),
+            "url": search_url
+        }
+        if card.get("detail_url"):
+            vehicle["detail_url"] = card["detail_url"]
+        vehicles.append(vehicle)
+    return vehicles
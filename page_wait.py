@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+検索結果ページの表示待ち
+固定時間のスリープではなく、車両カードが描画され件数が安定した時点で待機を終える
+"""
+
+import json
+import math
+import time
+from pathlib import Path
+from urllib.parse import urlparse
+from playwright.async_api import TimeoutError as PlaywrightTimeoutError
+
+# 車両カードのセレクタ
+CARD_SELECTOR = "p.detais-name2, p.car-price-sub"
+COUNT_SELECTOR = "p.detais-name2"
+
+# 待機の上限（ミリ秒）
+DEFAULT_CEILING_MS = 10000
+
+# 件数が安定したと判断する条件
+STABLE_INTERVAL_MS = 250
+STABLE_ROUNDS = 2
+
+# 学習した待機時間の下限（ミリ秒）
+MIN_LEARNED_TIMEOUT_MS = 3000
+
+# サイトごとの待機時間統計
+WAIT_STATS_FILE = Path(__file__).parent / "data" / "wait_stats.json"
+
+
+class WaitStats:
+    """サイトごとの表示完了までの時間を記録し、待機上限を学習する"""
+
+    def __init__(self, path=WAIT_STATS_FILE):
+        self.path = Path(path)
+        self.sites = self._load()
+
+    def _load(self):
+        if self.path.exists():
+            try:
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    return json.load(f)
+            except Exception:
+                return {}
+        return {}
+
+    def save(self):
+        try:
+            self.path.parent.mkdir(exist_ok=True)
+            with open(self.path, 'w', encoding='utf-8') as f:
+                json.dump(self.sites, f, ensure_ascii=False, indent=2)
+        except Exception:
+            pass
+
+    def record(self, site, elapsed_ms, timed_out=False):
+        """計測結果を追加（平均と分散を逐次更新）"""
+        entry = self.sites.setdefault(site, {
+            "count": 0, "mean_ms": 0.0, "m2": 0.0, "max_ms": 0.0, "timeouts": 0
+        })
+        if timed_out:
+            entry["timeouts"] += 1
+            return
+
+        entry["count"] += 1
+        delta = elapsed_ms - entry["mean_ms"]
+        entry["mean_ms"] += delta / entry["count"]
+        entry["m2"] += delta * (elapsed_ms - entry["mean_ms"])
+        entry["max_ms"] = max(entry["max_ms"], elapsed_ms)
+
+    def suggest_timeout(self, site, ceiling_ms):
+        """過去の実績から待機上限を決める（平均+4σ、上限はceiling_ms）"""
+        entry = self.sites.get(site)
+        if not entry or entry["count"] < 3:
+            return ceiling_ms
+
+        std = math.sqrt(entry["m2"] / (entry["count"] - 1))
+        learned = max(entry["mean_ms"] + 4 * std, entry["max_ms"] * 1.5, MIN_LEARNED_TIMEOUT_MS)
+        return int(min(learned, ceiling_ms))
+
+    def summary(self, site):
+        entry = self.sites.get(site)
+        if not entry or not entry["count"]:
+            return "計測なし"
+        return f"平均 {entry['mean_ms']:.0f}ms / 最大 {entry['max_ms']:.0f}ms（{entry['count']}回）"
+
+
+async def wait_for_listings(page, ceiling_ms=DEFAULT_CEILING_MS, stats=None):
+    """車両カードが表示され、件数が安定するまで待機
+
+    Returns:
+        表示された車名要素の数（タイムアウト時は0）
+    """
+    site = urlparse(page.url).netloc
+    timeout_ms = stats.suggest_timeout(site, ceiling_ms) if stats else ceiling_ms
+    start = time.monotonic()
+
+    try:
+        await page.wait_for_selector(CARD_SELECTOR, state="attached", timeout=timeout_ms)
+    except PlaywrightTimeoutError:
+        # 該当0件、または表示が遅すぎる
+        if stats:
+            stats.record(site, timeout_ms, timed_out=True)
+        return 0
+
+    # 件数が連続して同じになるまで待つ
+    last_count = -1
+    stable = 0
+    while True:
+        count = await page.locator(COUNT_SELECTOR).count()
+        if count == last_count:
+            stable += 1
+            if stable >= STABLE_ROUNDS:
+                break
+        else:
+            stable = 0
+            last_count = count
+
+        elapsed_ms = (time.monotonic() - start) * 1000
+        if elapsed_ms + STABLE_INTERVAL_MS > timeout_ms:
+            break
+        await page.wait_for_timeout(STABLE_INTERVAL_MS)
+
+    if stats:
+        stats.record(site, (time.monotonic() - start) * 1000)
+    return last_count
+
+
+async def goto_listings(page, url, ceiling_ms=DEFAULT_CEILING_MS, stats=None):
+    """検索結果ページを開いて表示完了まで待機"""
+    # 画像等の読み込み完了（load）は待たず、カードの描画だけを待つ
+    await page.goto(url, wait_until="domcontentloaded")
+    return await wait_for_listings(page, ceiling_ms=ceiling_ms, stats=stats)
@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""
+検索結果の全ページ巡回
+1ページ目から総ページ数を割り出し、2ページ目以降を並列に取得して解析済みの車両をページ単位で返す
+ページ番号のパラメータはページ送りのリンクから見つかった場合だけ使う（推測したパラメータをサイトが
+無視すると、1ページ目を上限まで取得し続けるため）。取得したページの車両カードが前のページと
+同じになった場合も巡回をやめる
+"""
+
+import math
+import re
+from html import unescape
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+from fetch_engine import FetchEngine, DEFAULT_CONCURRENCY, DEFAULT_URL_TIMEOUT
+from fingerprint import result_fingerprint
+
+# 巡回するページ数の上限
+MAX_PAGES = 500
+
+# ページ番号パラメータの候補（ページ送りのリンクで使われているもの）
+PAGE_PARAMS = ("page", "pageNo", "pn", "p")
+
+# 総件数の表示を探す検索結果一覧の要素（result_stream のメイン一覧。おすすめ車両等の件数は数えない）
+RESULT_LIST_ID = "car-list-wrap"
+
+HREF_PATTERN = re.compile(r'href="([^"]+)"')
+TOTAL_COUNT_PATTERNS = [
+    re.compile(r'全\s*([\d,]+)\s*(?:件|台)'),
+    re.compile(r'([\d,]+)\s*(?:件|台)中'),
+    re.compile(r'該当(?:件数|台数)?[：:\s]*([\d,]+)\s*(?:件|台)'),
+]
+CARD_PATTERN = re.compile(r'class="[^"]*\bdetais-name2\b')
+RESULT_LIST_PATTERN = re.compile(r'<(\w+)\b[^>]*\bid="' + RESULT_LIST_ID + r'"[^>]*>')
+
+
+def result_list_html(html):
+    """検索結果一覧の要素のHTML（見つからなければ None）"""
+    match = RESULT_LIST_PATTERN.search(html)
+    if not match:
+        return None
+    tag_pattern = re.compile(r'<(/?)' + match.group(1) + r'\b[^>]*>', re.I)
+    depth = 1
+    for tag in tag_pattern.finditer(html, match.end()):
+        depth += -1 if tag.group(1) else 1
+        if depth == 0:
+            return html[match.start():tag.end()]
+    # 閉じタグが無い場合は文書の終わりまで
+    return html[match.start():]
+
+
+def discover_pagination(html, base_url):
+    """
+    1ページ目のHTMLから (ページ番号パラメータ名, 総ページ数) を求める
+
+    パラメータ名はページ送りのリンクから見つかった場合のみ（見つからなければ None）。
+    総件数は検索結果一覧の中の表示だけを使う
+    """
+    base_path = urlsplit(base_url).path
+    param = None
+    last_page = 1
+
+    # ページ番号付きリンクの最大値
+    for href in HREF_PATTERN.findall(html):
+        parts = urlsplit(unescape(href))
+        if parts.path and parts.path != base_path:
+            continue
+        for key, value in parse_qsl(parts.query):
+            if key in PAGE_PARAMS and value.isdigit():
+                param = param or key
+                if key == param:
+                    last_page = max(last_page, int(value))
+
+    # 総件数の表示 ÷ 1ページあたりの件数（どちらも検索結果一覧の中だけ）
+    result_list = result_list_html(html)
+    per_page = len(CARD_PATTERN.findall(result_list)) if result_list else 0
+    if per_page:
+        for pattern in TOTAL_COUNT_PATTERNS:
+            match = pattern.search(result_list)
+            if match:
+                total = int(match.group(1).replace(",", ""))
+                last_page = max(last_page, math.ceil(total / per_page))
+                break
+
+    return param, last_page
+
+
+def page_url(base_url, param, page):
+    """base_url のページ番号パラメータを差し替えたURL"""
+    parts = urlsplit(base_url)
+    query = [(key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True) if key != param]
+    query.append((param, str(page)))
+    return urlunsplit(parts._replace(query=urlencode(query)))
+
+
+class PaginationCrawler:
+    def __init__(self, fetcher, parse_html, concurrency=DEFAULT_CONCURRENCY,
+                 timeout=DEFAULT_URL_TIMEOUT, max_pages=MAX_PAGES, log=print):
+        self.parse_html = parse_html
+        self.max_pages = max_pages
+        self.log = log
+        self.engine = FetchEngine(
+            fetcher.browser_pool, concurrency=concurrency, timeout=timeout,
+            fetcher=fetcher, log=log
+        )
+
+        # 直近の巡回結果
+        self.page_count = 0
+        self.failed_pages = []
+        self.truncated = False  # max_pages で打ち切った・ページ送りが分からない・同じページが返った
+
+    @property
+    def complete(self):
+        """直近の巡回で全ページを取得できた"""
+        return not self.failed_pages and not self.truncated
+
+    async def iter_pages(self, url):
+        """ページごとに解析済みの車両リストを返す（2ページ目以降は到着順）"""
+        self.failed_pages = []
+        self.truncated = False
+
+        fetcher = self.engine.fetcher
+        first_html = (await fetcher.fetch_html(url)).html
+        yield await fetcher.parse_if_changed(url, first_html, self.parse_html)
+
+        param, last_page = discover_pagination(first_html, url)
+        if param is None and last_page > 1:
+            self.log(f"総ページ数 {last_page} の表示がありますが、ページ送りのリンクが無いため1ページ目のみ")
+            self.page_count = 1
+            self.truncated = True
+            return
+        if last_page > self.max_pages:
+            self.log(f"総ページ数 {last_page} が上限を超えるため {self.max_pages} ページまで巡回")
+            last_page = self.max_pages
+            self.truncated = True
+        self.page_count = last_page
+        if last_page <= 1:
+            return
+
+        self.log(f"全{last_page}ページを巡回（同時{self.engine.concurrency}ページ）")
+        urls = [page_url(url, param, page) for page in range(2, last_page + 1)]
+        # 車両カードの指紋 → ページ番号（ページ番号を無視して同じページが返るサイトを見分ける）
+        seen_pages = {result_fingerprint(first_html): 1}
+        results = self.engine.iter_fetch(urls)
+        try:
+            async for result in results:
+                page = result.index + 2
+                if not result.ok:
+                    self.failed_pages.append(page)
+                    self.log(f"{page}ページ目の取得エラー: {result.error}")
+                    continue
+                if CARD_PATTERN.search(result.html):
+                    fingerprint = result_fingerprint(result.html)
+                    if fingerprint in seen_pages:
+                        self.log(f"{page}ページ目が{seen_pages[fingerprint]}ページ目と同じ内容のため巡回を中止")
+                        self.truncated = True
+                        break
+                    seen_pages[fingerprint] = page
+                yield await fetcher.parse_if_changed(result.url, result.html, self.parse_html)
+        finally:
+            # 中止した場合は残りの取得をキャンセル
+            await results.aclose()
+
+        if self.failed_pages:
+            self.log(f"取得できなかったページ: {sorted(self.failed_pages)}")
@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""
+HTML解析のワーカープール
+解析（CPU処理）をイベントループの外で実行し、解析中も他ページの取得や通知を止めない
+html.parser / lxml はGILを保持したまま解析するため別プロセスで、
+selectolax（lexbor）は解析中にGILを解放するためスレッドで実行する
+"""
+
+import asyncio
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+from html_parser_backend import resolve_backend
+
+# auto: 解析バックエンドに合わせて選ぶ（selectolax → thread、それ以外 → process）
+POOL_KINDS = ("auto", "process", "thread")
+
+
+def default_workers():
+    """CPUコア数（最低1）"""
+    return max(1, os.cpu_count() or 1)
+
+
+class ParsePool:
+    def __init__(self, workers=None, kind="auto"):
+        if kind not in POOL_KINDS:
+            raise ValueError(f"不明なプールの種類: {kind}")
+        if kind == "auto":
+            kind = "thread" if resolve_backend() == "selectolax" else "process"
+
+        self.workers = workers or default_workers()
+        self.kind = kind
+        self._executor = None
+
+    def _get_executor(self):
+        # 最初の解析で起動（解析しない実行ではワーカーを作らない）
+        if self._executor is None:
+            if self.kind == "process":
+                self._executor = ProcessPoolExecutor(max_workers=self.workers)
+            else:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="parse")
+        return self._executor
+
+    async def run(self, func, *args, **kwargs):
+        """func(*args, **kwargs) をワーカーで実行して結果を返す
+
+        processの場合 func・引数・戻り値はpickleできる必要がある（モジュール直下の関数など）
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._get_executor(), partial(func, *args, **kwargs))
+
+    def close(self):
+        """ワーカーを停止（実行待ちの解析は取り消す）"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
@@ -5,9 +5,8 @@
 """
 
 import os
-import json
 import asyncio
-import hashlib
+from functools import partial
 from datetime import datetime, timedelta
 try:
     import smtplib
@@ -17,50 +16,94 @@ try:
 except ImportError:
     EMAIL_AVAILABLE = False
 from pathlib import Path
-from playwright.async_api import async_playwright
-from bs4 import BeautifulSoup
 from dotenv import load_dotenv
 import requests
+from browser_pool import BrowserPool
+from page_wait import WaitStats
+from carlist_fetcher import CarlistFetcher
+from http_fetcher import HttpFetcher
+from pagination import PaginationCrawler
+from region_sweep import RegionSweep
+from fingerprint import ChangeDetector
+from parse_pool import ParsePool
+from card_extractor import parse_listing_page
+from vehicle_store import open_store, import_legacy
+from sighting_log import SightingLog
+from seen_filter import open_seen_filter
+from snapshot_diff import SnapshotDiff
+from listing_monitor import (
+    ListingMonitor, build_search_url, YEAR_FROM, MAX_PRICE,
+    BLOCK_RESOURCES, FETCH_MODE, RECORD_RESPONSES, HTTP_FIRST, CRAWL_ALL_PAGES, PAGE_CONCURRENCY,
+    REGION_SWEEP, CHANGE_DETECTION, PARSE_WORKERS, PARSE_POOL, LISTING_SOURCE, VEHICLE_STORE,
+    TRACK_LAST_SEEN, SEEN_FILTER, SEEN_FILTER_ERROR_RATE
+)
 
 load_dotenv()
 
 # 設定
-YEAR_FROM = "2019"
-MAX_PRICE = "160"
-DRIVE_TYPE = "2"  # 4WD/e-Four
 CHECK_INTERVAL_MINUTES = 30  # 30分間隔でチェック
+WAIT_CEILING_MS = 10000  # 検索結果の表示待ち上限
 
 # ファイルパス
 DATA_DIR = Path(__file__).parent / "data"
-VEHICLES_DB = DATA_DIR / "vehicles.json"
+VEHICLES_DB = DATA_DIR / "vehicles.db"
+LEGACY_VEHICLES_JSON = DATA_DIR / "vehicles.json"  # 以前の保存形式（初回のみ取り込む）
+SIGHTINGS_DIR = DATA_DIR / "sightings"
+SEEN_FILTER_DIR = DATA_DIR / "seen_filter"
+LISTING_SNAPSHOT_FILE = DATA_DIR / "listing_snapshot.json"  # 前回のチェックの掲載（差分用）
 LOG_FILE = DATA_DIR / "monitor.log"
+WAIT_STATS_FILE = DATA_DIR / "wait_stats.json"
+RESPONSES_DIR = DATA_DIR / "responses"
+FINGERPRINTS_FILE = DATA_DIR / "fingerprints.json"
 
 # データディレクトリ作成
 DATA_DIR.mkdir(exist_ok=True)
 
-class PriusMonitor:
+class PriusMonitor(ListingMonitor):
     def __init__(self):
-        self.search_url = f"https://toyota.jp/ucar/carlist/?Tval=1&chk-detail-tvalue-sp-check=1&Cn=01_プリウス&Ymn={YEAR_FROM}&Drv={DRIVE_TYPE}&Pmx={MAX_PRICE}"
+        self.search_url = build_search_url()
         self.known_vehicles = self.load_known_vehicles()
+        # 目撃ログは全車両をメモリに持つので、フィルタを置いても車両ストアの照合は速くならない
+        self.seen_filter = open_seen_filter(
+            SEEN_FILTER_DIR, self.known_vehicles, error_rate=SEEN_FILTER_ERROR_RATE, log=self.log
+        ) if SEEN_FILTER and VEHICLE_STORE != "log" else None
+        self.listing_diff = SnapshotDiff(LISTING_SNAPSHOT_FILE)
+        if not self.known_vehicles:
+            # 車両データをリセットした場合は全ての掲載を新着として調べ直す
+            self.listing_diff.forget()
+        self.fetch_complete = False  # 直近の取得で全ページを確認できた
+        self.parsed_pages = {}  # このチェックで解析したページの指紋（保存できたら確定）: {変更検知のキー: 指紋}
+        # チェック間でブラウザを使い回す
+        self.browser_pool = BrowserPool(log=self.log)
+        self.wait_stats = WaitStats(WAIT_STATS_FILE)
+        self.change_detector = ChangeDetector(FINGERPRINTS_FILE) if CHANGE_DETECTION else None
+        if self.change_detector and not self.known_vehicles:
+            # 車両データをリセットした場合は必ず解析し直す
+            self.change_detector.forget()
+        self.http_fetcher = HttpFetcher(conditional=True, log=self.log) if HTTP_FIRST else None
+        self.parse_pool = ParsePool(PARSE_WORKERS, kind=PARSE_POOL) if PARSE_WORKERS > 0 else None
+        # ワーカーに渡せるようにモジュール直下の関数で解析
+        self.parse_html = partial(parse_listing_page, search_url=self.search_url, keyword="プリウス")
+        self.fetcher = CarlistFetcher(
+            self.browser_pool, self.wait_stats,
+            ceiling_ms=WAIT_CEILING_MS, block_resources=BLOCK_RESOURCES,
+            fetch_mode=FETCH_MODE, record_dir=RESPONSES_DIR if RECORD_RESPONSES else None,
+            http_fetcher=self.http_fetcher, change_detector=self.change_detector,
+            parse_pool=self.parse_pool, log=self.log
+        )
+        self.crawler = PaginationCrawler(
+            self.fetcher, self.parse_html, concurrency=PAGE_CONCURRENCY, log=self.log
+        )
+        self.region_sweep = RegionSweep(self.fetcher, self.parse_html, keyword="プリウス", log=self.log)
         
     def load_known_vehicles(self):
-        """既知の車両リストを読み込み"""
-        if VEHICLES_DB.exists():
-            try:
-                with open(VEHICLES_DB, 'r', encoding='utf-8') as f:
-                    return json.load(f)
-            except Exception as e:
-                self.log(f"車両データ読み込みエラー: {e}")
-                return {}
-        return {}
-    
-    def save_known_vehicles(self):
-        """車両リストを保存"""
-        try:
-            with open(VEHICLES_DB, 'w', encoding='utf-8') as f:
-                json.dump(self.known_vehicles, f, ensure_ascii=False, indent=2)
-        except Exception as e:
-            self.log(f"車両データ保存エラー: {e}")
+        """既知の車両ストアを開く（初回は以前の vehicles.json を取り込む）"""
+        if VEHICLE_STORE == "log":
+            store = SightingLog(SIGHTINGS_DIR)
+            import_legacy(store, [LEGACY_VEHICLES_JSON], source=LISTING_SOURCE, log=self.log)
+            return store
+        return open_store(VEHICLES_DB, [LEGACY_VEHICLES_JSON], source=LISTING_SOURCE, log=self.log,
+                          track_last_seen=TRACK_LAST_SEEN)
     
     def log(self, message):
         """ログ出力"""
@@ -74,100 +117,31 @@ class PriusMonitor:
         except Exception:
             pass
     
-    def generate_vehicle_id(self, vehicle_info):
-        """車両情報からユニークIDを生成"""
-        return hashlib.md5(vehicle_info.encode('utf-8')).hexdigest()[:8]
-    
-    async def fetch_current_vehicles(self):
-        """現在の車両リストを取得"""
+    async def iter_current_vehicles(self):
+        """現在の車両リストをページ単位で取得（全ページを取得できたら fetch_complete を True に）"""
+        self.fetch_complete = False
         try:
-            async with async_playwright() as pw:
-                browser = await pw.chromium.launch(headless=True)
-                page = await browser.new_page()
-                
-                await page.goto(self.search_url)
-                await page.wait_for_timeout(5000)
-                
-                html = await page.content()
-                await browser.close()
+            if REGION_SWEEP:
+                # 地域別に検索（1ページ目のみ。地域間の重複は差分で除く）
+                async for page_vehicles in self.region_sweep.iter_regions(self.search_url):
+                    yield page_vehicles
+            elif CRAWL_ALL_PAGES:
+                # 全ページ巡回（HTMLを解析）
+                async for page_vehicles in self.crawler.iter_pages(self.search_url):
+                    yield page_vehicles
+                self.fetch_complete = self.crawler.complete
+            else:
+                yield await self.fetcher.fetch_vehicles(
+                    self.search_url, self.parse_html, keyword="プリウス"
+                )
                 
-            return self.parse_vehicles(html)
-            
         except Exception as e:
             self.log(f"車両取得エラー: {e}")
-            return []
     
     def parse_vehicles(self, html):
         """HTMLから車両情報を解析"""
-        soup = BeautifulSoup(html, "html.parser")
-        vehicles = []
-        
-        car_names = soup.select("p.detais-name2")
-        
-        for name_elem in car_names:
-            try:
-                car_name = name_elem.get_text(strip=True)
-                
-                # プリウス以外はスキップ
-                if "プリウス" not in car_name:
-                    continue
-                
-                # 価格を探す
-                parent = name_elem.parent
-                price = "価格不明"
-                while parent and parent.name != 'body':
-                    price_elem = parent.select_one("p.car-price-sub")
-                    if price_elem:
-                        price = price_elem.get_text(strip=True)
-                        break
-                    parent = parent.parent
-                
-                # 年式を探す
-                year = "年式不明"
-                if parent:
-                    year_elem = parent.select_one("p:contains('年'), span:contains('年')")
-                    if year_elem:
-                        year_text = year_elem.get_text()
-                        if "年" in year_text:
-                            year = year_text.strip()
-                
-                # 新着バッジチェック
-                is_new = False
-                if parent:
-                    context = parent.get_text()
-                    is_new = "NEW" in context or "新着" in context
-                
-                vehicle_info = {
-                    "name": car_name,
-                    "price": price,
-                    "year": year,
-                    "is_new": is_new,
-                    "detected_at": datetime.now().isoformat(),
-                    "url": self.search_url
-                }
-                
-                vehicles.append(vehicle_info)
-                
-            except Exception as e:
-                self.log(f"車両解析エラー: {e}")
-                continue
-        
-        return vehicles
-    
-    def find_new_vehicles(self, current_vehicles):
-        """新着車両を検出"""
-        new_vehicles = []
-        
-        for vehicle in current_vehicles:
-            vehicle_id = self.generate_vehicle_id(f"{vehicle['name']}_{vehicle['price']}")
-            
-            if vehicle_id not in self.known_vehicles:
-                # 新しい車両を発見
-                self.known_vehicles[vehicle_id] = vehicle
-                new_vehicles.append(vehicle)
-                self.log(f"新着車両発見: {vehicle['name']} - {vehicle['price']}")
-        
-        return new_vehicles
+        # カードごとに1回だけ走査（プリウス以外はカードの特定も省略）
+        return parse_listing_page(html, self.search_url, keyword="プリウス")
     
     def send_slack_notification(self, new_vehicles):
         """Slack通知"""
@@ -271,11 +245,36 @@ class PriusMonitor:
     async def check_for_new_vehicles(self):
         """新着車両をチェック"""
         self.log("車両チェック開始")
+        if self.change_detector:
+            self.change_detector.start_check()
+        self.listing_diff.start()
+        self.parsed_pages = {}
         
-        current_vehicles = await self.fetch_current_vehicles()
-        self.log(f"現在の該当車両数: {len(current_vehicles)}台")
+        # ページが届くたびに新着判定
+        current_count = 0
+        new_vehicles = []
+        pages_known = True  # 解析を省略したページの前回の掲載が全て分かる
+        async for page_vehicles in self.iter_current_vehicles():
+            if page_vehicles.unchanged:
+                kept = self.keep_unchanged_page(page_vehicles)
+                if kept is None:
+                    pages_known = False
+                else:
+                    current_count += kept
+                continue
+            current_count += len(page_vehicles)
+            new_vehicles.extend(self.find_new_vehicles(page_vehicles, page=page_vehicles.key))
+            if page_vehicles.fingerprint is not None:
+                self.parsed_pages[page_vehicles.key] = page_vehicles.fingerprint
+        self.log_change_detection()
         
-        new_vehicles = self.find_new_vehicles(current_vehicles)
+        if self.change_detector and self.change_detector.all_unchanged:
+            self.log("検索結果に変更なし（解析・新着判定を省略）")
+        self.log(f"現在の該当車両数: {current_count}台")
+        complete = self.fetch_complete and pages_known
+        removed = self.find_removed_vehicles(complete)
+        if removed:
+            self.log(f"掲載終了 {len(removed)}台")
         
         if new_vehicles:
             self.log(f"新着車両 {len(new_vehicles)}台 を発見！")
@@ -296,13 +295,12 @@ class PriusMonitor:
                 self.log(f"通知送信完了: {', '.join(notifications_sent)}")
             else:
                 self.log("通知送信失敗")
-            
-            # データ保存
-            self.save_known_vehicles()
-            
         else:
             self.log("新着車両なし")
         
+        # データ保存（このチェックの追加・確認分をまとめて書き込み）
+        self.save_known_vehicles(complete=complete)
+        
         return len(new_vehicles)
 
     async def run_continuous_monitoring(self):
@@ -311,21 +309,26 @@ class PriusMonitor:
         self.log(f"監視条件: {YEAR_FROM}年以降, 4WD/e-Four, {MAX_PRICE}万円以下")
         self.log(f"チェック間隔: {CHECK_INTERVAL_MINUTES}分")
         
-        while True:
-            try:
-                await self.check_for_new_vehicles()
-                
-                # 次のチェックまで待機
-                self.log(f"次回チェック: {CHECK_INTERVAL_MINUTES}分後")
-                await asyncio.sleep(CHECK_INTERVAL_MINUTES * 60)
-                
-            except KeyboardInterrupt:
-                self.log("監視システム停止")
-                break
-            except Exception as e:
-                self.log(f"監視エラー: {e}")
-                # エラー時は1分後に再試行
-                await asyncio.sleep(60)
+        try:
+            while True:
+                try:
+                    # ブラウザの状態確認（クラッシュ時は再起動）
+                    await self.browser_pool.health_check()
+                    await self.check_for_new_vehicles()
+                    
+                    # 次のチェックまで待機
+                    self.log(f"次回チェック: {CHECK_INTERVAL_MINUTES}分後")
+                    await asyncio.sleep(CHECK_INTERVAL_MINUTES * 60)
+                    
+                except KeyboardInterrupt:
+                    self.log("監視システム停止")
+                    break
+                except Exception as e:
+                    self.log(f"監視エラー: {e}")
+                    # エラー時は1分後に再試行
+                    await asyncio.sleep(60)
+        finally:
+            await self.close()
 
 async def main():
     """メイン関数"""
@@ -336,7 +339,10 @@ async def main():
     # コマンドライン引数チェック
     if len(sys.argv) > 1 and sys.argv[1] == "--single-check":
         # 1回だけチェック（cron用）
-        await monitor.check_for_new_vehicles()
+        try:
+            await monitor.check_for_new_vehicles()
+        finally:
+            await monitor.close()
     else:
         # 継続監視
         await monitor.run_continuous_monitoring()
@@ -1,8 +1,11 @@
 import os
 import asyncio
-from playwright.async_api import async_playwright
-from bs4 import BeautifulSoup
 from dotenv import load_dotenv
+from browser_pool import BrowserPool
+from carlist_fetcher import CarlistFetcher
+from http_fetcher import HttpFetcher
+from html_parser_backend import make_soup
+from vehicle import parse_price_yen
 
 load_dotenv()  # .env に SLACK_WEBHOOK_URL などを設定しておく
 
@@ -10,27 +13,28 @@ CHECK_URL = "https://toyota.jp/ucar/carlist/?padid=from_jpucar_header_search"
 YEAR_FROM = "2019"
 DRIVE_TYPE_VALUE = "4WD"   # e-Four は 4WD の中に含まれるケースが多い
 MAX_PRICE = "160"          # 単位：万円
+MAX_PRICE_YEN = int(MAX_PRICE) * 10000
 
 async def fetch_listings():
-    async with async_playwright() as pw:
-        browser = await pw.chromium.launch()
-        page = await browser.new_page()
-        
-        # 正しいパラメータでプリウス検索
-        prius_url = f"https://toyota.jp/ucar/carlist/?Tval=1&chk-detail-tvalue-sp-check=1&Cn=01_プリウス&Ymn={YEAR_FROM}&Drv=2&Pmx={MAX_PRICE}"
-        print(f"検索条件: プリウス, {YEAR_FROM}年以降, 4WD/e-Four, {MAX_PRICE}万円以下")
-        print(f"アクセスURL: {prius_url}")
-        await page.goto(prius_url)
-        await page.wait_for_timeout(5000)  # サイト読み込み待機
-        
+    # 正しいパラメータでプリウス検索
+    prius_url = f"https://toyota.jp/ucar/carlist/?Tval=1&chk-detail-tvalue-sp-check=1&Cn=01_プリウス&Ymn={YEAR_FROM}&Drv=2&Pmx={MAX_PRICE}"
+    print(f"検索条件: プリウス, {YEAR_FROM}年以降, 4WD/e-Four, {MAX_PRICE}万円以下")
+    print(f"アクセスURL: {prius_url}")
+    
+    # HTTPで車両カードが取れなければブラウザで表示
+    browser_pool = BrowserPool()
+    fetcher = CarlistFetcher(browser_pool, http_fetcher=HttpFetcher())
+    try:
         print("プリウス専用ページにアクセス中...")
-        
-        html = await page.content()
-        await browser.close()
-    return html
+        fetched = await fetcher.fetch_html(prius_url)
+    finally:
+        await browser_pool.close()
+    
+    print(f"取得方法: {fetched.source}")
+    return fetched.html
 
 def parse_new_listings(html):
-    soup = BeautifulSoup(html, "html.parser")
+    soup = make_soup(html)
     cars = []
     
     print("プリウス車両情報を解析中...")
@@ -41,9 +45,6 @@ def parse_new_listings(html):
     
     print(f"車名要素: {len(car_names)}件, 価格要素: {len(car_prices)}件")
     
-    # 新着バッジを探す
-    new_badges = soup.find_all(string=lambda text: text and ("新着" in text or "NEW" in text.upper()))
-    
     # 車名から車両情報をペアにする
     processed_cars = set()  # 重複を避ける
     
@@ -73,33 +74,16 @@ def parse_new_listings(html):
                 car_info = f"{car_name} — {price}" + (" [新着]" if is_new else "")
                 if car_info not in processed_cars:
                     processed_cars.add(car_info)
-                    cars.append(car_info)
+                    cars.append((car_info, parse_price_yen(price)))
                     print(f"追加: {car_info}")
                 
         except Exception as e:
             print(f"車両解析エラー: {e}")
             continue
     
-    # 価格で160万円以下のものだけフィルタリング
-    if cars:
-        filtered_cars = []
-        for car in cars:
-            try:
-                # 価格から数値を抽出
-                import re
-                price_match = re.search(r'(\d+(?:\.\d+)?)万円', car)
-                if price_match:
-                    price_value = float(price_match.group(1))
-                    if price_value <= float(MAX_PRICE):
-                        filtered_cars.append(car)
-                else:
-                    filtered_cars.append(car)  # 価格不明の場合も含める
-            except:
-                filtered_cars.append(car)  # エラーの場合も含める
-        
-        cars = filtered_cars
-    
-    return cars
+    # 価格で160万円以下のものだけ（円単位の数値で比較、価格不明の場合も含める）
+    return [car_info for car_info, price_yen in cars
+            if price_yen is None or price_yen <= MAX_PRICE_YEN]
 
 async def main():
     html = await fetch_listings()
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+ホストごとのトークンバケット
+同時に多数のリクエストを出しても、ホストあたりの送信レートを一定に保つ
+"""
+
+import asyncio
+import threading
+import time
+from urllib.parse import urlsplit
+
+
+class TokenBucket:
+    def __init__(self, rate: float, capacity: int = 1):
+        """
+        Args:
+            rate: 1秒あたりに補充されるトークン数（＝許可するリクエスト数）
+            capacity: 連続して送れる最大数（バースト）
+        """
+        if rate <= 0:
+            raise ValueError("rate は正の値を指定してください")
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self) -> float:
+        """トークンを1つ予約し、送信可能になるまでの待ち時間（秒）を返す"""
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            # 不足分はマイナスで持ち越し、予約順に待たせる
+            self.tokens -= 1
+            return 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+
+    async def acquire(self):
+        wait = self.reserve()
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+    def acquire_sync(self):
+        wait = self.reserve()
+        if wait > 0:
+            time.sleep(wait)
+
+
+class HostRateLimiter:
+    """ホスト名ごとに TokenBucket を割り当てる"""
+
+    def __init__(self, rate: float = 1.0, capacity: int = 1):
+        self.rate = rate
+        self.capacity = capacity
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def bucket(self, url: str) -> TokenBucket:
+        host = urlsplit(url).netloc
+        with self._lock:
+            if host not in self._buckets:
+                self._buckets[host] = TokenBucket(self.rate, self.capacity)
+            return self._buckets[host]
+
+    async def acquire(self, url: str):
+        await self.bucket(url).acquire()
+
+
+# プロセス全体で共有する既定のリミッター（1ホストあたり毎秒1リクエスト）
+DEFAULT_RATE_LIMITER = HostRateLimiter(rate=1.0, capacity=1)
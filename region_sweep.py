@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+地域別の在庫確認
+地域ごとに位置情報を設定した独立したブラウザコンテキストで同時に検索し、結果を1つにまとめる
+"""
+
+import asyncio
+from config import PREFERRED_REGIONS, REGION_COORDINATES
+from vehicle import Vehicle, listing_key
+
+
+def vehicle_key(vehicle):
+    """地域間で同じ車両を判定するキー（掲載元の車両ID。無ければ車名・年式等）"""
+    return listing_key(Vehicle.from_dict(vehicle))
+
+
+class RegionSweep:
+    def __init__(self, fetcher, parse_html, regions=PREFERRED_REGIONS, keyword=None, log=print):
+        unknown = [region for region in regions if region not in REGION_COORDINATES]
+        if unknown:
+            raise ValueError(f"位置情報が未設定の地域: {', '.join(unknown)}")
+
+        self.fetcher = fetcher
+        self.parse_html = parse_html
+        self.regions = list(regions)
+        self.keyword = keyword
+        self.log = log
+
+        # 直近の地域別台数
+        self.region_counts = {}
+
+        # 同時に使うコンテキスト数だけプールに余裕を持たせる
+        pool = fetcher.browser_pool
+        pool.max_idle_pages = max(pool.max_idle_pages, len(self.regions))
+
+    async def _fetch_region(self, region, url):
+        context_options = {
+            "geolocation": REGION_COORDINATES[region],
+            "permissions": ["geolocation"],
+            "locale": "ja-JP",
+        }
+        # 同じURLでも地域ごとに結果が異なるため地域別に変更検知
+        change_key = f"{url}#{region}"
+        if self.fetcher.fetch_mode == "script":
+            return await self.fetcher.fetch_browser_vehicles(
+                url, self.parse_html, keyword=self.keyword, change_key=change_key, **context_options
+            )
+        fetched = await self.fetcher.fetch_browser_html(url, **context_options)
+        return await self.fetcher.parse_if_changed(change_key, fetched.html, self.parse_html)
+
+    async def _iter_regions(self, url):
+        """全地域を同時に検索し、完了した順に (地域, ListingPage) を返す（取得できなかった地域は返さない）"""
+        async def fetch(region):
+            try:
+                return region, await self._fetch_region(region, url), None
+            except Exception as e:
+                return region, None, e
+
+        self.region_counts = {}
+        for next_done in asyncio.as_completed([fetch(region) for region in self.regions]):
+            region, vehicles, error = await next_done
+            if error is not None:
+                self.log(f"{region}の取得エラー: {error}")
+                self.region_counts[region] = 0
+                continue
+            self.region_counts[region] = len(vehicles)
+            yield region, vehicles
+
+    async def iter_regions(self, url):
+        """
+        地域ごとの ListingPage を完了した順に返す
+
+        変更検知のキーは地域ごと（URL#地域）なので、監視ではページと同じように差分・指紋の確定を行う。
+        地域間の重複は差分側で除く
+        """
+        async for _, page in self._iter_regions(url):
+            yield page
+        self._log_counts()
+
+    async def sweep(self, url):
+        """全地域を同時に検索し、重複を除いた車両リストを返す"""
+        merged = {}
+        async for region, vehicles in self._iter_regions(url):
+            for vehicle in vehicles:
+                key = vehicle_key(vehicle)
+                if key in merged:
+                    if region not in merged[key]["regions"]:
+                        merged[key]["regions"].append(region)
+                else:
+                    vehicle["regions"] = [region]
+                    merged[key] = vehicle
+        self._log_counts(len(merged))
+        return list(merged.values())
+
+    def _log_counts(self, merged=None):
+        summary = ", ".join(f"{region} {self.region_counts.get(region, 0)}台" for region in self.regions)
+        if merged is None:
+            self.log(f"地域別: {summary}")
+        else:
+            self.log(f"地域別: {summary} → 重複除外後 {merged}台")
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+不要リクエストの遮断
+画像・フォント・動画・計測タグの読み込みを中止し、車両カードのテキストだけを描画させる
+"""
+
+from collections import Counter
+from urllib.parse import urlparse
+
+# 遮断するリソース種別
+BLOCKED_RESOURCE_TYPES = {"image", "font", "media"}
+
+# 遮断する計測・広告ドメイン（部分一致）
+TRACKER_HOST_KEYWORDS = (
+    "google-analytics.com",
+    "googletagmanager.com",
+    "doubleclick.net",
+    "googlesyndication.com",
+    "googleadservices.com",
+    "facebook.net",
+    "facebook.com",
+    "connect.facebook",
+    "adobedtm.com",
+    "omtrdc.net",
+    "demdex.net",
+    "criteo",
+    "yjtag.jp",
+    "yimg.jp",
+    "ads-twitter.com",
+    "analytics.twitter.com",
+    "bat.bing.com",
+    "clarity.ms",
+    "hotjar.com",
+    "karte.io",
+    "line-scdn.net",
+    "tiktok",
+)
+
+# 遮断1件あたりの推定サイズ（バイト）
+# 中止したリクエストは実サイズが分からないため、carlistページでの典型値で見積もる
+ESTIMATED_BYTES = {
+    "image": 35_000,
+    "font": 60_000,
+    "media": 500_000,
+    "tracker": 25_000,
+}
+
+
+class ResourceBlocker:
+    def __init__(self, blocked_types=BLOCKED_RESOURCE_TYPES, tracker_keywords=TRACKER_HOST_KEYWORDS):
+        self.blocked_types = set(blocked_types)
+        self.tracker_keywords = tuple(tracker_keywords)
+        self.blocked = Counter()
+        self.allowed = 0
+
+    def classify(self, resource_type, url):
+        """遮断対象なら種別名を返す（対象外はNone）"""
+        if resource_type in self.blocked_types:
+            return resource_type
+
+        host = urlparse(url).netloc
+        if any(keyword in host for keyword in self.tracker_keywords):
+            return "tracker"
+        return None
+
+    async def _handle(self, route):
+        request = route.request
+        kind = self.classify(request.resource_type, request.url)
+        if kind:
+            self.blocked[kind] += 1
+            await route.abort()
+        else:
+            self.allowed += 1
+            await route.continue_()
+
+    async def install(self, page):
+        """ページにルーティングを設定"""
+        await page.route("**/*", self._handle)
+
+    async def uninstall(self, page):
+        """ルーティングを解除（プールに戻すページ用）"""
+        try:
+            await page.unroute("**/*", self._handle)
+        except Exception:
+            pass
+
+    @property
+    def bytes_saved(self):
+        """推定削減バイト数"""
+        return sum(ESTIMATED_BYTES.get(kind, 0) * count for kind, count in self.blocked.items())
+
+    def report(self):
+        """チェック1回分の遮断結果"""
+        if not self.blocked:
+            return f"リソース遮断: なし（通過 {self.allowed}件）"
+        details = ", ".join(f"{kind} {count}件" for kind, count in self.blocked.most_common())
+        return (f"リソース遮断: {sum(self.blocked.values())}件（{details}）, "
+                f"通過 {self.allowed}件, 推定削減 {self.bytes_saved / 1024:.0f}KB")
@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+検索結果の逐次解析
+受信したHTMLの断片を順に流し込み、検索結果カード（おすすめ車両の li・メイン一覧の dl）が
+閉じるたびにそのカードのHTMLだけを取り出す。保持するのは組み立て中のカード1件分のみ
+"""
+
+from html.parser import HTMLParser
+
+# 一覧部分のid → カードのタグ
+RESULT_REGIONS = {
+    "slick_recommended": "li",
+    "car-list-wrap": "dl",
+}
+
+# 終了タグを省略できるタグ → その範囲を区切る要素
+# （li は次の li の開始で閉じる。ただし中の ul / ol に入った li はその中の入れ子）
+IMPLIED_END_TAGS = {
+    "li": ("ul", "ol"),
+}
+
+# 終了タグを持たない要素
+VOID_TAGS = frozenset((
+    "area", "base", "br", "col", "embed", "hr", "img", "input",
+    "link", "meta", "param", "source", "track", "wbr",
+))
+
+class ResultCardStream(HTMLParser):
+    def __init__(self, regions=None):
+        # 文字参照は元の表記のままカードのHTMLに戻す
+        super().__init__(convert_charrefs=False)
+        self.regions = regions or RESULT_REGIONS
+
+        self._region_tag = None
+        self._region_depth = 0
+        self._card_tag = None
+        self._card_parts = None
+        self._card_open = []  # カード内で開いている要素のタグ（カード自身を除く）
+        self._completed = []
+
+        # 取り出したカード数
+        self.card_count = 0
+
+    def push(self, chunk):
+        """HTMLの断片を解析し、閉じたカードのHTMLを返す"""
+        self.feed(chunk)
+        return self.drain()
+
+    def drain(self):
+        completed, self._completed = self._completed, []
+        return completed
+
+    def finish(self):
+        """最後の断片まで解析し、残ったカードのHTMLを返す"""
+        self.close()
+        return self.drain()
+
+    def _start_card(self):
+        self._card_parts = [self.get_starttag_text()]
+        self._card_open = []
+
+    def _end_card(self):
+        self._completed.append("".join(self._card_parts))
+        self._card_parts = None
+        self.card_count += 1
+
+    def _close_implied(self, tag):
+        """
+        終了タグを省略できる tag の開始で、閉じていない同じタグを閉じる
+        カード自身が閉じる（次のカードの開始）ときは True
+        """
+        containers = IMPLIED_END_TAGS.get(tag)
+        if containers is None:
+            return False
+        card_open = self._card_open
+        for i in range(len(card_open) - 1, -1, -1):
+            if card_open[i] in containers:
+                return False
+            if card_open[i] == tag:
+                del card_open[i:]
+                return False
+        return tag == self._card_tag
+
+    def handle_starttag(self, tag, attrs):
+        if self._card_parts is not None:
+            if self._close_implied(tag):
+                self._end_card()
+                self._start_card()
+                return
+            self._card_parts.append(self.get_starttag_text())
+            if tag not in VOID_TAGS:
+                self._card_open.append(tag)
+            return
+
+        if self._region_tag is None:
+            region_id = dict(attrs).get("id")
+            if region_id in self.regions:
+                self._region_tag = tag
+                self._region_depth = 1
+                self._card_tag = self.regions[region_id]
+            return
+
+        if tag == self._card_tag:
+            self._start_card()
+        elif tag == self._region_tag:
+            self._region_depth += 1
+
+    def handle_startendtag(self, tag, attrs):
+        if self._card_parts is not None:
+            self._card_parts.append(self.get_starttag_text())
+
+    def handle_endtag(self, tag):
+        if self._card_parts is not None:
+            card_open = self._card_open
+            if tag in card_open:
+                # 閉じていない子要素もここで閉じる
+                self._card_parts.append(f"</{tag}>")
+                del card_open[len(card_open) - 1 - card_open[::-1].index(tag):]
+                return
+            if tag == self._card_tag:
+                self._card_parts.append(f"</{tag}>")
+                self._end_card()
+                return
+            if tag != self._region_tag:
+                self._card_parts.append(f"</{tag}>")
+                return
+            # 一覧の終了タグ: 閉じていないカードはここで終わる
+            self._end_card()
+
+        if self._region_tag is not None and tag == self._region_tag:
+            self._region_depth -= 1
+            if self._region_depth == 0:
+                self._region_tag = None
+                self._card_tag = None
+
+    def handle_data(self, data):
+        if self._card_parts is not None:
+            self._card_parts.append(data)
+
+    def handle_entityref(self, name):
+        if self._card_parts is not None:
+            self._card_parts.append(f"&{name};")
+
+    def handle_charref(self, name):
+        if self._card_parts is not None:
+            self._card_parts.append(f"&#{name};")
+
+    def close(self):
+        super().close()
+        # 閉じタグが無いまま終わったカードも解析対象にする
+        if self._card_parts is not None:
+            self._end_card()
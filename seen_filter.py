@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+"""
+既知の車両IDの絞り込み（スケーラブル・ブルームフィルタ）
+「この車両IDを見たことがあるか」を固定長のビット列で調べる。
+「無い」と出た車両IDは確実に未知なので車両ストアを調べずに新着と判定し、
+「ある」と出た場合だけ車両ストア（正確な記録）で確かめる
+
+ビット列はスライスごとのファイルを mmap して持つ（プロセスのメモリに全件を載せない）。
+登録数が容量を超えたら、容量2倍・誤判定率を半分にしたスライスを追加する（全体の誤判定率は error_rate 以下）
+
+    seen_filter/meta.json       {"error_rate": ..., "store_generation": ..., "slices": [{"capacity", "bits", "hashes", "count"}]}
+    seen_filter/slice-000.bits  スライスのビット列
+"""
+
+import hashlib
+import json
+import math
+import mmap
+import os
+from pathlib import Path
+
+DEFAULT_ERROR_RATE = 0.001
+DEFAULT_CAPACITY = 100000   # 最初のスライスの容量（台）
+GROWTH = 2                  # スライスを追加するときの容量の倍率
+TIGHTENING = 0.5            # スライスを追加するときの誤判定率の倍率
+
+META_NAME = "meta.json"
+
+
+def slice_name(index):
+    return f"slice-{index:03d}.bits"
+
+
+def slice_size(capacity, error_rate):
+    """容量と誤判定率から (ビット数, ハッシュ数)"""
+    bits = math.ceil(-capacity * math.log(error_rate) / (math.log(2) ** 2))
+    hashes = max(1, math.ceil(math.log2(1 / error_rate)))
+    return bits, hashes
+
+
+HASH_MASK = (1 << 64) - 1
+
+
+def key_hashes(key):
+    """二重ハッシュ法の2つのハッシュ値（1回のハッシュ計算で全スライスの位置を求める）"""
+    digest = int.from_bytes(hashlib.blake2b(key.encode("utf-8"), digest_size=16).digest(), "little")
+    return digest & HASH_MASK, (digest >> 64) | 1
+
+
+class _Slice:
+    __slots__ = ("capacity", "bits", "hashes", "count", "file", "array")
+
+    def __init__(self, path, capacity, bits, hashes, count=0):
+        self.capacity = capacity
+        self.bits = bits
+        self.hashes = hashes
+        self.count = count
+        size = (bits + 7) // 8
+        if not path.exists() or path.stat().st_size != size:
+            with open(path, 'wb') as f:
+                f.truncate(size)
+        self.file = open(path, 'r+b')
+        self.array = mmap.mmap(self.file.fileno(), size)
+
+    def __contains__(self, hashes):
+        # 未登録のIDは最初の数ビットで分かるので、位置は1つずつ求めて0のビットで打ち切る
+        array, bits = self.array, self.bits
+        position, step = hashes
+        for _ in range(self.hashes):
+            bit = position % bits
+            if not array[bit >> 3] & (1 << (bit & 7)):
+                return False
+            position += step
+        return True
+
+    def add(self, hashes):
+        array, bits = self.array, self.bits
+        position, step = hashes
+        for _ in range(self.hashes):
+            bit = position % bits
+            array[bit >> 3] |= 1 << (bit & 7)
+            position += step
+        self.count += 1
+
+    def close(self):
+        self.array.flush()
+        self.array.close()
+        self.file.close()
+
+
+class SeenFilter:
+    """
+    スケーラブル・ブルームフィルタ
+
+    key in filter が False なら確実に未登録。True の場合は error_rate 以下の確率で誤り
+    """
+
+    def __init__(self, directory, error_rate=DEFAULT_ERROR_RATE, capacity=DEFAULT_CAPACITY):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.error_rate = error_rate
+        self.capacity = capacity
+        self.store_generation = None  # 最後に保存したときの車両ストアの世代（ずれていれば作り直す）
+        self.slices = []
+
+        meta_path = self.directory / META_NAME
+        meta = None
+        if meta_path.exists():
+            with open(meta_path, 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+        if meta and meta.get("error_rate") == error_rate:
+            self.store_generation = meta.get("store_generation")
+            for index, info in enumerate(meta["slices"]):
+                self.slices.append(_Slice(self.directory / slice_name(index), info["capacity"],
+                                          info["bits"], info["hashes"], info["count"]))
+        else:
+            # 誤判定率を変えた場合は作り直す
+            self.clear()
+
+    def __len__(self):
+        return sum(part.count for part in self.slices)
+
+    def __contains__(self, key):
+        hashes = key_hashes(key)
+        for part in reversed(self.slices):  # 新しいスライスほど大きく、登録も多い
+            if hashes in part:
+                return True
+        return False
+
+    @property
+    def memory_bytes(self):
+        """ビット列の大きさ（mmap したファイルの合計）"""
+        return sum((part.bits + 7) // 8 for part in self.slices)
+
+    def _add_slice(self):
+        index = len(self.slices)
+        capacity = self.capacity * GROWTH ** index
+        # 最初のスライスを error_rate * (1 - TIGHTENING) にすると、全スライスの合計が error_rate 以下になる
+        error_rate = self.error_rate * (1 - TIGHTENING) * TIGHTENING ** index
+        bits, hashes = slice_size(capacity, error_rate)
+        path = self.directory / slice_name(index)
+        if path.exists():
+            path.unlink()
+        self.slices.append(_Slice(path, capacity, bits, hashes))
+
+    def add(self, key):
+        """登録（既に登録済みとみなされる場合は何もしない）し、新たに登録したら True"""
+        hashes = key_hashes(key)
+        for part in self.slices:
+            if hashes in part:
+                return False
+        if not self.slices or self.slices[-1].count >= self.slices[-1].capacity:
+            self._add_slice()
+        self.slices[-1].add(hashes)
+        return True
+
+    def clear(self):
+        for part in self.slices:
+            part.close()
+        self.slices = []
+        for path in self.directory.glob("slice-*.bits"):
+            path.unlink()
+        self.store_generation = None
+        self._add_slice()
+
+    def rebuild(self, keys):
+        """車両IDを全て登録し直す"""
+        self.clear()
+        for key in keys:
+            self.add(key)
+
+    def flush(self, store_generation=None):
+        """ビット列をファイルに反映し、スライスの情報と車両ストアの世代を保存"""
+        if store_generation is not None:
+            self.store_generation = store_generation
+        for part in self.slices:
+            part.array.flush()
+        meta = {
+            "error_rate": self.error_rate,
+            "store_generation": self.store_generation,
+            "slices": [{"capacity": part.capacity, "bits": part.bits, "hashes": part.hashes, "count": part.count}
+                       for part in self.slices],
+        }
+        temp_path = self.directory / (META_NAME + ".tmp")
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(meta, f)
+        os.replace(temp_path, self.directory / META_NAME)
+
+    def close(self):
+        self.flush()
+        for part in self.slices:
+            part.close()
+        self.slices = []
+
+
+def open_seen_filter(directory, store, error_rate=DEFAULT_ERROR_RATE, log=print):
+    """
+    車両ストアの前に置くフィルタを開く
+
+    前回保存したときとストアの世代（車両を追加・更新した書き込みごとに変わる）が違う
+    （フィルタが無い・フィルタを保存する前に止まった・ストアを差し替えた等）場合は、
+    未登録の車両IDを「確実に未知」と誤判定しないようストアの車両IDから作り直す。
+    台数だけを比べると、同じ台数の別のストアや追加と削除が釣り合った変更を見逃す
+    """
+    seen_filter = SeenFilter(directory, error_rate=error_rate)
+    generation = store.generation
+    if generation is None or seen_filter.store_generation != generation:
+        seen_filter.rebuild(store.ids())
+        seen_filter.flush(store.generation)
+        log(f"既知の車両IDのフィルタを作成: {len(store)}台（{seen_filter.memory_bytes // 1024}KB）")
+    return seen_filter
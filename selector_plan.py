@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+一覧ページのセレクタ計画
+初めて見るレイアウトでは、候補のクラス名から車名・価格のセレクタと「車名から何段上がカードか」を調べて
+計画（SelectorPlan）にまとめ、レイアウトの指紋ごとに保持する。同じレイアウトのページは調べ直さずに計画を使う
+
+レイアウトの指紋はHTML文字列から安く求める（解析木を作らない）:
+最初の車名要素から最初の価格要素までのタグの並び（タグ名とclassのみ、テキストは含めない）
+"""
+
+import hashlib
+import re
+
+# 車名・価格の要素に付くクラス名の候補（先にあるものを優先）
+NAME_CLASSES = ("detais-name2", "car-name", "carname", "car_name")
+PRICE_CLASSES = ("car-price-sub", "car-price", "price")
+
+# 車名要素から価格を探して上がる段数の上限
+MAX_CARD_DEPTH = 10
+
+# 価格付きのカードが見つかるまで調べる車名要素の数
+PROBE_CARDS = 5
+
+# 車名要素から価格要素までとみなす最大文字数
+SKELETON_WINDOW = 8000
+
+TAG_PATTERN = re.compile(r'<(/?)([a-zA-Z][\w-]*)([^>]*)>')
+CLASS_ATTR_PATTERN = re.compile(r'\bclass\s*=\s*["\']([^"\']*)["\']')
+
+
+def _find_class(html, token, start=0, end=None):
+    """class属性に token を（単語として）含む最初の開始タグの (開始位置, 終了位置)
+
+    正規表現で全タグを調べず、文字列検索で token の出現位置だけを確かめる
+    """
+    end = len(html) if end is None else end
+    pos = html.find(token, start, end)
+    while pos >= 0:
+        tag_start = html.rfind("<", start, pos)
+        tag_end = html.find(">", pos, end)
+        if tag_start >= 0 and tag_end >= 0 and html.rfind(">", tag_start, pos) < 0:
+            classes = CLASS_ATTR_PATTERN.search(html, tag_start, tag_end + 1)
+            if classes and token in classes.group(1).split():
+                return tag_start, tag_end + 1
+        pos = html.find(token, pos + len(token), end)
+    return None
+
+
+def layout_fingerprint(html):
+    """レイアウトの指紋（車名要素の候補が無いページは None）"""
+    for name_class in NAME_CLASSES:
+        name_tag = _find_class(html, name_class)
+        if name_tag:
+            break
+    else:
+        return None
+
+    start = name_tag[0]
+    end = min(len(html), start + SKELETON_WINDOW)
+    price_class = None
+    for token in PRICE_CLASSES:
+        price_tag = _find_class(html, token, name_tag[1], end)
+        if price_tag:
+            price_class, end = token, price_tag[1]
+            break
+
+    skeleton = [name_class, str(price_class)]
+    for tag in TAG_PATTERN.finditer(html, start, end):
+        closing, name, attrs = tag.groups()
+        if closing:
+            skeleton.append(f"/{name.lower()}")
+        else:
+            classes = CLASS_ATTR_PATTERN.search(attrs)
+            skeleton.append(name.lower() + ("." + ".".join(sorted(classes.group(1).split())) if classes else ""))
+    return hashlib.sha1("|".join(skeleton).encode("utf-8")).hexdigest()[:16]
+
+
+def probe_card_depth(name_elem, name_selector, price_selector, max_depth=MAX_CARD_DEPTH):
+    """車名要素から、価格を含む最も近い祖先（カード）までの段数"""
+    parent = name_elem.parent
+    depth = 1
+    while parent is not None and parent.name != "body" and depth <= max_depth:
+        if parent.select_one(price_selector):
+            # 他の車名も含む場合はカードではなく一覧全体（このカードには価格が無い）
+            if len(parent.select(name_selector)) > 1:
+                return None
+            return depth
+        parent = parent.parent
+        depth += 1
+    return None
+
+
+class SelectorPlan:
+    __slots__ = ("name_selector", "price_selector", "card_depth", "fingerprint")
+
+    def __init__(self, name_selector, price_selector, card_depth=None, fingerprint=None):
+        self.name_selector = name_selector
+        self.price_selector = price_selector
+        # None: 価格付きのカードが見つからなかった（カードはページごとに探す）
+        self.card_depth = card_depth
+        self.fingerprint = fingerprint
+
+    def __repr__(self):
+        return (f"SelectorPlan(name={self.name_selector!r}, price={self.price_selector!r}, "
+                f"card_depth={self.card_depth})")
+
+
+def learn_plan(soup, fingerprint=None):
+    """候補のクラス名を順に試し、このページで使える計画を求める（車名要素が無ければ None）"""
+    for name_class in NAME_CLASSES:
+        names = soup.select(f".{name_class}")
+        if not names:
+            continue
+        name_selector = f"{names[0].name}.{name_class}"
+
+        for price_class in PRICE_CLASSES:
+            for name_elem in names[:PROBE_CARDS]:
+                depth = probe_card_depth(name_elem, name_selector, f".{price_class}")
+                if depth is None:
+                    continue
+                card = name_elem
+                for _ in range(depth):
+                    card = card.parent
+                price_selector = f"{card.select_one(f'.{price_class}').name}.{price_class}"
+                return SelectorPlan(name_selector, price_selector, depth, fingerprint)
+
+        return SelectorPlan(name_selector, f".{PRICE_CLASSES[0]}", None, fingerprint)
+    return None
+
+
+class SelectorPlanCache:
+    """レイアウトの指紋 → 計画（プロセス内で保持）"""
+
+    def __init__(self):
+        self.plans = {}
+        self.hits = 0
+        self.learned = 0
+
+    def plan_for(self, html, soup):
+        """html のレイアウトの計画（初めての指紋なら soup から求めて保持）"""
+        fingerprint = layout_fingerprint(html)
+        if fingerprint is None:
+            return None
+        plan = self.plans.get(fingerprint)
+        if plan is not None:
+            self.hits += 1
+            return plan
+
+        plan = learn_plan(soup, fingerprint)
+        if plan is not None:
+            self.plans[fingerprint] = plan
+            self.learned += 1
+        return plan
+
+
+# parse_listing_page が使う共有キャッシュ（ParsePoolのワーカーではプロセスごとに1回ずつ求める）
+DEFAULT_PLAN_CACHE = SelectorPlanCache()
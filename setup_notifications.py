@@ -136,4 +136,4 @@ if __name__ == "__main__":
     print("3. バックグラウンド実行は cron_example.txt を参考に設定")
     print()
     print("📝 ログは data/monitor.log に保存されます")
-    print("💾 検出済み車両は data/vehicles.json に保存されます")
\ No newline at end of file
+    print("💾 検出済み車両は data/vehicles.db に保存されます")
\ No newline at end of file
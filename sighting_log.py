@@ -0,0 +1,393 @@
+#!/usr/bin/env python3
+"""
+車両の目撃ログ（追記型）
+チェックごとに「見かけた・新着・価格変更・掲載終了」のイベントを JSONL のセグメントに追記する。
+一定数のイベントがたまったらスナップショットにまとめ（書き込みは別スレッド）、
+起動時はスナップショットを読んでから、それより後のセグメントだけを再生する
+
+    sightings/snapshot.json   {"segment": 次に再生するセグメント番号, "vehicles": {車両ID: レコード}}
+    sightings/000001.jsonl    {"t": 時刻, "e": "new", "id": 車両ID, "v": Vehicle.to_dict()}
+                              {"t": 時刻, "e": "price_changed", "id": 車両ID, "from": 円, "to": 円}
+                              {"t": 時刻, "e": "updated", "id": 車両ID, "v": Vehicle.to_dict()}
+                              {"t": 時刻, "e": "seen", "ids": [車両ID, ...]}
+                              {"t": 時刻, "e": "disappeared", "ids": [車両ID, ...]}
+                              {"t": 時刻, "e": "rekeyed", "id": 以前の車両ID, "to": 新しい車両ID}
+    sightings/archive/        スナップショットにまとめ終えたセグメント（履歴の確認用）
+
+イベントの適用は冪等（同じイベントを2回適用しても状態は変わらない）なので、
+スナップショットの途中で止まっても再生し直せば元に戻る
+
+使い方:
+    python sighting_log.py history [車両ID] --dir data/sightings
+"""
+
+import argparse
+import json
+import os
+import threading
+from datetime import datetime
+from pathlib import Path
+from vehicle import Vehicle, is_legacy_id
+
+EVENT_NEW = "new"
+EVENT_SEEN = "seen"
+EVENT_PRICE_CHANGED = "price_changed"
+EVENT_UPDATED = "updated"  # 価格以外の項目も変わった（レコード全体を持つ）
+EVENT_DISAPPEARED = "disappeared"
+EVENT_REKEYED = "rekeyed"
+
+# この数のイベントを追記したらスナップショットにまとめる
+COMPACT_EVENTS = 2000
+
+SNAPSHOT_NAME = "snapshot.json"
+ARCHIVE_DIR = "archive"
+SEGMENT_SUFFIX = ".jsonl"
+
+
+def segment_name(number):
+    return f"{number:06d}{SEGMENT_SUFFIX}"
+
+
+def _segment_numbers(directory):
+    return sorted(int(path.stem) for path in directory.glob(f"*{SEGMENT_SUFFIX}") if path.stem.isdigit())
+
+
+def read_events(path):
+    """セグメントのイベント（書き込み途中で止まった末尾の行は読み飛ばす）"""
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                continue
+
+
+class SightingLog:
+    """
+    {車両ID: Vehicle} と同じように使える目撃ログ
+
+    store[vehicle_id] = vehicle と mark_seen() は commit() までイベントにしない。
+    既知の車両を価格を変えて入れ直すと price_changed（価格以外も変われば updated）になり、価格履歴に追加される。
+    commit() でチェック1回分のイベントをまとめて追記する
+    """
+
+    def __init__(self, directory, compact_events=COMPACT_EVENTS, background=True):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.compact_events = compact_events
+        self.background = background
+
+        self.vehicles = {}     # {車両ID: Vehicle}
+        self.first_seen = {}
+        self.last_seen = {}
+        self.active = set()    # 掲載中（掲載終了のイベントが無い）の車両ID
+        self.prices = {}       # {車両ID: [[変更日時, 価格], ...]}（価格履歴）
+        self.pending = {}      # 次の commit() でイベントにする {車両ID: Vehicle}
+        self.seen = set()      # 次の commit() で seen にする既知の車両ID
+        self.rekeyed = {}      # 次の commit() で付け替える {以前の車両ID: 新しい車両ID}
+        self.legacy_count = 0  # 付け替えの済んでいない以前の車両IDの数（0になれば照合は不要）
+
+        self.segment = 1
+        self.events_since_snapshot = 0
+        self.compactor = None  # 実行中のスナップショット書き込み
+        self.file = None
+        self._load()
+
+    # 読み込み
+
+    def _load(self):
+        snapshot_path = self.directory / SNAPSHOT_NAME
+        if snapshot_path.exists():
+            with open(snapshot_path, 'r', encoding='utf-8') as f:
+                snapshot = json.load(f)
+            self.segment = snapshot["segment"]
+            for vehicle_id, record in snapshot["vehicles"].items():
+                self.vehicles[vehicle_id] = Vehicle.from_dict(record)
+                self.legacy_count += is_legacy_id(vehicle_id)
+                self.first_seen[vehicle_id] = record.get("first_seen")
+                self.last_seen[vehicle_id] = record.get("last_seen")
+                self.prices[vehicle_id] = record.get("price_history") or []
+                if record.get("active", True):
+                    self.active.add(vehicle_id)
+
+        # スナップショットより後のセグメントだけを再生
+        for number in _segment_numbers(self.directory):
+            if number < self.segment:
+                continue
+            for event in read_events(self.directory / segment_name(number)):
+                self._apply(event)
+                self.events_since_snapshot += 1
+            # 書き込み途中の末尾に追記しないよう、起動ごとに新しいセグメントにする
+            self.segment = number + 1
+
+    def _apply(self, event):
+        kind, timestamp = event["e"], event["t"]
+        if kind == EVENT_NEW:
+            vehicle_id = event["id"]
+            if vehicle_id not in self.vehicles:
+                self.legacy_count += is_legacy_id(vehicle_id)
+            self.vehicles[vehicle_id] = Vehicle.from_dict(event["v"])
+            self.first_seen.setdefault(vehicle_id, timestamp)
+            self._append_price(vehicle_id, timestamp, self.vehicles[vehicle_id].price)
+            self.last_seen[vehicle_id] = timestamp
+            self.active.add(vehicle_id)
+        elif kind == EVENT_PRICE_CHANGED:
+            vehicle_id = event["id"]
+            if vehicle_id in self.vehicles:
+                # スナップショットの書き込み中でも影響しないよう、Vehicle は置き換える
+                self.vehicles[vehicle_id] = self.vehicles[vehicle_id].copy(price=event["to"])
+                self._append_price(vehicle_id, timestamp, event["to"])
+                self.last_seen[vehicle_id] = timestamp
+                self.active.add(vehicle_id)
+        elif kind == EVENT_UPDATED:
+            vehicle_id = event["id"]
+            if vehicle_id in self.vehicles:
+                self.vehicles[vehicle_id] = Vehicle.from_dict(event["v"])
+                self._append_price(vehicle_id, timestamp, self.vehicles[vehicle_id].price)
+                self.last_seen[vehicle_id] = timestamp
+                self.active.add(vehicle_id)
+        elif kind == EVENT_SEEN:
+            for vehicle_id in event["ids"]:
+                if vehicle_id in self.vehicles:
+                    self.last_seen[vehicle_id] = timestamp
+                    self.active.add(vehicle_id)
+        elif kind == EVENT_DISAPPEARED:
+            self.active.difference_update(event["ids"])
+        elif kind == EVENT_REKEYED:
+            old_id, vehicle_id = event["id"], event["to"]
+            if old_id in self.vehicles:
+                self.legacy_count -= is_legacy_id(old_id)
+                self.vehicles.setdefault(vehicle_id, self.vehicles.pop(old_id))
+                self.first_seen.setdefault(vehicle_id, self.first_seen.pop(old_id, None))
+                self.last_seen.setdefault(vehicle_id, self.last_seen.pop(old_id, None))
+                self.prices[vehicle_id] = self.prices.pop(old_id, []) + self.prices.get(vehicle_id, [])
+                if old_id in self.active:
+                    self.active.discard(old_id)
+                    self.active.add(vehicle_id)
+
+    def _append_price(self, vehicle_id, timestamp, price):
+        history = self.prices.setdefault(vehicle_id, [])
+        if not history or history[-1][1] != price:
+            history.append([timestamp, price])
+
+    # {車両ID: Vehicle} としての操作
+
+    def __contains__(self, vehicle_id):
+        if vehicle_id in self.pending:
+            return True
+        return vehicle_id in self.vehicles and vehicle_id not in self.rekeyed
+
+    def __getitem__(self, vehicle_id):
+        if vehicle_id in self.pending:
+            return self.pending[vehicle_id]
+        return self.vehicles[vehicle_id]
+
+    def __setitem__(self, vehicle_id, vehicle):
+        self.pending[vehicle_id] = vehicle
+        self.seen.discard(vehicle_id)
+
+    def __len__(self):
+        return (len(self.vehicles) - len(self.rekeyed)
+                + sum(1 for vehicle_id in self.pending if vehicle_id not in self.vehicles))
+
+    def __iter__(self):
+        return (vehicle_id for vehicle_id, _ in self.items())
+
+    def get(self, vehicle_id, default=None):
+        return self[vehicle_id] if vehicle_id in self else default
+
+    def items(self):
+        """(車両ID, Vehicle)（未書き込みの変更は先に書き込む）"""
+        self.commit()
+        return list(self.vehicles.items())
+
+    def ids(self):
+        """車両ID（未書き込みの変更は先に書き込む）"""
+        self.commit()
+        return list(self.vehicles)
+
+    def price_history(self, vehicle_id):
+        """[(変更日時, 価格)]（古い順）"""
+        return [tuple(entry) for entry in self.prices.get(vehicle_id, ())]
+
+    def rekey(self, old_id, vehicle_id):
+        """
+        以前の車両IDで保存した車両を vehicle_id に付け替える（commit() でイベントにする）
+        初めて見た日時と価格履歴は引き継ぐ。vehicle_id の内容は store[vehicle_id] = vehicle で入れておく
+        """
+        self.rekeyed[old_id] = vehicle_id
+        self.legacy_count -= 1
+
+    def mark_seen(self, vehicle_id):
+        """既知の車両を今回のチェックで見かけた"""
+        if vehicle_id not in self.pending:
+            self.seen.add(vehicle_id)
+
+    # 書き込み
+
+    def commit(self, seen_at=None, complete=False):
+        """
+        チェック1回分のイベントをまとめて追記し、追記したイベント数を返す
+
+        complete: 全ページを確認できたチェック。今回見かけなかった掲載中の車両を掲載終了にする
+        （一部のページを取得できなかったチェックでは False にする。解析を省略したページの車両は
+        mark_seen() しておけば全ページを確認したものとしてよい）
+        """
+        seen_at = seen_at or datetime.now().isoformat()
+        # 付け替えは先に追記し、付け替え後の車両と比べて新着・価格変更を決める
+        events = [{"t": seen_at, "e": EVENT_REKEYED, "id": old_id, "to": vehicle_id}
+                  for old_id, vehicle_id in self.rekeyed.items()]
+        rekeyed_from = {vehicle_id: old_id for old_id, vehicle_id in self.rekeyed.items()}
+        seen = set(self.seen)
+        for vehicle_id, vehicle in self.pending.items():
+            known = self.vehicles.get(vehicle_id)
+            if known is None and vehicle_id in rekeyed_from:
+                known = self.vehicles[rekeyed_from[vehicle_id]]
+            if known is None:
+                events.append({"t": vehicle.detected_at or seen_at, "e": EVENT_NEW, "id": vehicle_id,
+                               "v": vehicle.to_dict()})
+            elif vehicle == known:
+                seen.add(vehicle_id)
+            elif vehicle == known.copy(price=vehicle.price):
+                events.append({"t": seen_at, "e": EVENT_PRICE_CHANGED, "id": vehicle_id,
+                               "from": known.price, "to": vehicle.price})
+            else:
+                # 走行距離・新着表示・URL等（付け替えた以前の車両IDのレコードも）は全体を置き換える
+                events.append({"t": seen_at, "e": EVENT_UPDATED, "id": vehicle_id, "v": vehicle.to_dict()})
+        if seen:
+            events.append({"t": seen_at, "e": EVENT_SEEN, "ids": sorted(seen)})
+        if complete:
+            disappeared = self.active - seen - set(self.pending) - set(self.rekeyed)
+            if disappeared:
+                events.append({"t": seen_at, "e": EVENT_DISAPPEARED, "ids": sorted(disappeared)})
+
+        self.pending.clear()
+        self.seen.clear()
+        self.rekeyed.clear()
+        if not events:
+            return 0
+
+        self._append(events)
+        for event in events:
+            self._apply(event)
+        self.events_since_snapshot += len(events)
+        if self.events_since_snapshot >= self.compact_events:
+            self.compact()
+        return len(events)
+
+    def _append(self, events):
+        if self.file is None:
+            self.file = open(self.directory / segment_name(self.segment), 'a', encoding='utf-8')
+        self.file.write("".join(
+            json.dumps(event, ensure_ascii=False, separators=(",", ":")) + "\n" for event in events
+        ))
+        self.file.flush()
+
+    def import_json(self, path, source=None):
+        """vehicles.json 形式のファイルを新着イベントとして取り込み、追加した台数を返す"""
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        added = 0
+        for vehicle_id, record in data.items():
+            if vehicle_id not in self:
+                self[vehicle_id] = Vehicle.from_dict(record, source=source)
+                added += 1
+        self.commit()
+        return added
+
+    def export_json(self, path):
+        """vehicles.json 形式で書き出す（バックアップ用）"""
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({vehicle_id: vehicle.to_dict() for vehicle_id, vehicle in self.items()},
+                      f, ensure_ascii=False, indent=2)
+
+    # スナップショット
+
+    def compact(self):
+        """
+        現在の状態をスナップショットにまとめ、まとめ終えたセグメントを archive/ に移す
+
+        以降の追記は新しいセグメントへ。スナップショットの書き込みは別スレッドで行う
+        （前回の書き込みが終わっていなければ待つ）
+        """
+        self.wait_for_compaction()
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+        self.segment += 1
+        self.events_since_snapshot = 0
+
+        # 書き込み中も追記を続けられるよう、この時点の状態を複製して渡す
+        state = (self.segment, dict(self.vehicles), dict(self.first_seen), dict(self.last_seen),
+                 set(self.active), {vehicle_id: list(history) for vehicle_id, history in self.prices.items()})
+        if self.background:
+            self.compactor = threading.Thread(target=self._write_snapshot, args=state, daemon=True)
+            self.compactor.start()
+        else:
+            self._write_snapshot(*state)
+
+    def _write_snapshot(self, segment, vehicles, first_seen, last_seen, active, prices):
+        records = {}
+        for vehicle_id, vehicle in vehicles.items():
+            record = vehicle.to_dict()
+            record["first_seen"] = first_seen.get(vehicle_id)
+            record["last_seen"] = last_seen.get(vehicle_id)
+            record["active"] = vehicle_id in active
+            record["price_history"] = prices.get(vehicle_id, [])
+            records[vehicle_id] = record
+
+        path = self.directory / SNAPSHOT_NAME
+        temp_path = path.with_suffix(".tmp")
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump({"segment": segment, "vehicles": records}, f, ensure_ascii=False)
+        os.replace(temp_path, path)
+
+        # スナップショットを置き換えてから、まとめ終えたセグメントを移す
+        archive = self.directory / ARCHIVE_DIR
+        archive.mkdir(exist_ok=True)
+        for number in _segment_numbers(self.directory):
+            if number < segment:
+                os.replace(self.directory / segment_name(number), archive / segment_name(number))
+
+    def wait_for_compaction(self):
+        if self.compactor is not None:
+            self.compactor.join()
+            self.compactor = None
+
+    def history(self, vehicle_id=None):
+        """archive/ と現在のセグメントのイベント（vehicle_id 指定時はその車両のみ）を古い順に"""
+        self.wait_for_compaction()
+        paths = [self.directory / ARCHIVE_DIR / segment_name(number)
+                 for number in _segment_numbers(self.directory / ARCHIVE_DIR)]
+        paths += [self.directory / segment_name(number) for number in _segment_numbers(self.directory)]
+        for path in paths:
+            for event in read_events(path):
+                if vehicle_id is None or event.get("id") == vehicle_id or vehicle_id in event.get("ids", ()):
+                    yield event
+
+    def close(self):
+        self.commit()
+        self.wait_for_compaction()
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="車両の目撃ログ")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    history_parser = subparsers.add_parser("history", help="イベントの履歴を表示")
+    history_parser.add_argument("vehicle_id", nargs="?", help="表示する車両ID（省略時は全て）")
+    history_parser.add_argument("--dir", default="data/sightings", help="目撃ログのディレクトリ")
+    args = parser.parse_args(argv)
+
+    store = SightingLog(args.dir)
+    try:
+        for event in store.history(args.vehicle_id):
+            print(json.dumps(event, ensure_ascii=False))
+    finally:
+        store.close()
+
+
+if __name__ == "__main__":
+    main()
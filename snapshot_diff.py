@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+"""
+検索結果の差分（前回のチェックとの比較）
+前回のチェックで見た掲載（掲載キー → 比べる項目の値）を保存しておき、今回の掲載と比べて
+新着（new）・掲載終了（removed）・内容の変更（changed、項目ごとの変更前後の値）のイベントを出す
+
+今回の掲載は1件ずつ辞書で前回の値を引くだけなので、1回のチェックの手間はそのチェックの掲載数に比例する
+（車両ストアに溜まった過去の車両の数には依らない）
+
+ページごとの掲載キーも保存し、変更検知で解析を省略したページ（前回と同じ内容）は
+そのページの前回の掲載を今回も見たものとして扱う（keep_page）
+
+    listing_snapshot.json  {"fields": ["name", "price", ...], "listings": {掲載キー: [値, ...]},
+                            "pages": {ページのキー: [掲載キー, ...]}}
+"""
+
+import json
+import os
+from pathlib import Path
+from vehicle import Vehicle, format_price_man
+
+EVENT_NEW = "new"
+EVENT_REMOVED = "removed"
+EVENT_CHANGED = "changed"
+
+# 比べる項目（Vehicle の属性）
+DIFF_FIELDS = ("name", "price", "year", "mileage", "dealer", "is_new", "url")
+
+FIELD_LABELS = {
+    "name": "車名",
+    "price": "価格",
+    "year": "年式",
+    "mileage": "走行距離",
+    "dealer": "販売店",
+    "is_new": "新着表示",
+    "url": "URL",
+}
+
+
+def format_field(field, value):
+    """項目の値を表示用の文字列にする"""
+    if field == "price":
+        return format_price_man(value)
+    if value is None:
+        return "不明"
+    if field == "year":
+        return f"{value}年"
+    if field == "mileage":
+        return f"{value:,}km"
+    if field == "is_new":
+        return "あり" if value else "なし"
+    return str(value)
+
+
+class ListingEvent:
+    """
+    掲載の差分1件
+
+    kind: EVENT_NEW / EVENT_REMOVED / EVENT_CHANGED
+    vehicle: 今回の Vehicle（掲載終了では None）/ previous: 前回の値から作った Vehicle（新着では None）
+    changes: {項目: (変更前, 変更後)}（内容の変更のみ）
+    """
+    __slots__ = ("kind", "key", "vehicle", "previous", "changes")
+
+    def __init__(self, kind, key, vehicle=None, previous=None, changes=None):
+        self.kind = kind
+        self.key = key
+        self.vehicle = vehicle
+        self.previous = previous
+        self.changes = changes or {}
+
+    @property
+    def fields(self):
+        """変わった項目"""
+        return tuple(self.changes)
+
+    def describe(self):
+        """"価格 143.8万円 → 139.8万円、走行距離 12,000km → 12,500km" の形式"""
+        return "、".join(
+            f"{FIELD_LABELS.get(field, field)} {format_field(field, old)} → {format_field(field, new)}"
+            for field, (old, new) in self.changes.items()
+        )
+
+    def __repr__(self):
+        return f"ListingEvent({self.kind!r}, {self.key!r}, fields={self.fields})"
+
+
+class SnapshotDiff:
+    """前回のチェックの掲載を保持し、今回の掲載との差分を出す"""
+
+    def __init__(self, path=None, fields=DIFF_FIELDS):
+        self.path = Path(path) if path else None
+        self.fields = tuple(fields)
+        # 前回のチェック: {掲載キー: 値のタプル} と {ページのキー: [掲載キー, ...]}
+        self.previous, self.pages = self._load()
+        self.current = {}        # 今回のチェックで見た掲載
+        self.current_pages = {}  # 今回のチェックで見たページ
+        self.changed = False     # 保存していない変更がある（無ければ save() は書き込まない）
+
+    def _load(self):
+        if not self.path or not self.path.exists():
+            return {}, {}
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except Exception:
+            return {}, {}
+        if tuple(data.get("fields", ())) != self.fields:
+            # 比べる項目を変えた場合は前回の値を使えない
+            return {}, {}
+        listings = {key: tuple(values) for key, values in data.get("listings", {}).items()}
+        return listings, data.get("pages", {})
+
+    def save(self):
+        """前回の掲載を書き込む（前回の保存から変わっていなければ何もしない）"""
+        if not self.path or not self.changed:
+            return
+        data = {"fields": list(self.fields), "listings": self.previous, "pages": self.pages}
+        temp_path = self.path.with_name(self.path.name + ".tmp")
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(temp_path, self.path)
+        self.changed = False
+
+    def forget(self):
+        """前回の掲載を破棄（次回は全ての掲載が新着）"""
+        self.previous = {}
+        self.pages = {}
+        self.current = {}
+        self.current_pages = {}
+        self.changed = True
+
+    def start(self):
+        """チェック1回分の掲載をリセット"""
+        self.current = {}
+        self.current_pages = {}
+
+    def _vehicle(self, values):
+        return Vehicle(**{"name": "", **dict(zip(self.fields, values))})
+
+    def update(self, listings, page=None):
+        """
+        (掲載キー, Vehicle) を前回と比べ、新着と内容の変更のイベントを返す
+
+        ページが届くたびに呼べる（page: ページのキー。keep_page() のために掲載キーを記録する）。
+        前回と同じ掲載はイベントを出さない。同じチェックで2回目に出てきた掲載キーは無視する
+        """
+        events = []
+        previous, current, fields = self.previous, self.current, self.fields
+        page_keys = self.current_pages.setdefault(page, []) if page is not None else None
+        for key, vehicle in listings:
+            if page_keys is not None:
+                page_keys.append(key)
+            if key in current:
+                continue
+            values = tuple(getattr(vehicle, field) for field in fields)
+            current[key] = values
+            old = previous.get(key)
+            if old is None:
+                self.changed = True
+                events.append(ListingEvent(EVENT_NEW, key, vehicle))
+            elif old != values:
+                self.changed = True
+                changes = {field: (before, after)
+                           for field, before, after in zip(fields, old, values) if before != after}
+                events.append(ListingEvent(EVENT_CHANGED, key, vehicle, self._vehicle(old), changes))
+        return events
+
+    def keep_page(self, page):
+        """
+        前回と同じ内容のページ（解析を省略した）の掲載を、前回の値のまま今回も見たものとする
+
+        今回も見たものとした掲載キーを返す。前回そのページの掲載を記録していなければ None
+        （差分を保存する前に止まった等。呼び出し側はそのページを解析し直す）
+        """
+        keys = self.pages.get(page)
+        if keys is None:
+            return None
+        previous, current = self.previous, self.current
+        kept = []
+        for key in keys:
+            if key not in current and key in previous:
+                current[key] = previous[key]
+                kept.append(key)
+        self.current_pages[page] = list(keys)
+        return kept
+
+    def finish(self, complete=False):
+        """
+        チェックを終え、掲載終了のイベントを返す
+
+        complete: 全ページを取得し、どのページも解析したか keep_page() で前回の掲載を引き継いだチェック。
+        このときだけ今回見なかった掲載を掲載終了とし、前回の掲載（とページ）を今回のものに置き換える。
+        一部のページを取得できなかった場合は見た掲載の値だけを更新する（見なかった掲載は前回のまま残す）
+        """
+        removed = []
+        # 新着・内容の変更は update() で記録済み。ここではページの掲載キーの入れ替わりを見る
+        if complete:
+            current = self.current
+            removed = [ListingEvent(EVENT_REMOVED, key, previous=self._vehicle(values))
+                       for key, values in self.previous.items() if key not in current]
+            if removed or self.pages != self.current_pages:
+                self.changed = True
+            self.previous = current
+            self.pages = self.current_pages
+        else:
+            if any(self.pages.get(page) != keys for page, keys in self.current_pages.items()):
+                self.changed = True
+            self.previous.update(self.current)
+            self.pages.update(self.current_pages)
+        self.current = {}
+        self.current_pages = {}
+        return removed
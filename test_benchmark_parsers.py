@@ -0,0 +1,44 @@
+#!/usr/bin/env python3
+"""
+ベンチマーク用の合成ページのテスト
+カード数を増やしたページが実際のページと同じ規則で解析できることを確認する
+"""
+
+from pathlib import Path
+from benchmark_parsers import carlist_html, enlarge_gazoo, report
+from toyota_used_car_search import ToyotaUsedCarSearch, DETAIL_ID_PATTERN
+from prius_monitor import PriusMonitor
+
+FIXTURE = Path(__file__).parent / "debug_response.html"
+
+
+def test_enlarge_gazoo():
+    """メイン一覧を120件に増やすと、おすすめ9件と合わせて重複除外後127件"""
+    html = enlarge_gazoo(FIXTURE.read_text(encoding="utf-8"), 120)
+    cars = ToyotaUsedCarSearch(parse_mode="region")._parse_search_results(html)
+    ids = [DETAIL_ID_PATTERN.search(car["url"]).group(1) for car in cars]
+    # 元の50件のうち2件はおすすめと重複
+    assert len(ids) == len(set(ids)) == 9 + 120 - 2
+    # 複製した2巡目の先頭（1巡目は重複2件を除いた48件）
+    assert cars[9]["name"] == cars[9 + 48]["name"] == "ヤリス X"
+
+
+def test_carlist_html():
+    monitor = PriusMonitor.__new__(PriusMonitor)
+    monitor.search_url = "https://toyota.jp/ucar/carlist/"
+    vehicles = monitor.parse_vehicles(carlist_html(30))
+    assert len(vehicles) == 30
+    assert sum(vehicle["is_new"] for vehicle in vehicles) == 5
+
+
+def test_report():
+    output = report([], repeat=3)
+    assert output["repeat"] == 3 and output["results"] == []
+    assert "html.parser" in output["backends"]
+
+
+if __name__ == "__main__":
+    test_enlarge_gazoo()
+    test_carlist_html()
+    test_report()
+    print("✅ ベンチマーク用ページのテスト完了")
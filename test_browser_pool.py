@@ -0,0 +1,23 @@
+#!/usr/bin/env python3
+"""
+常駐ブラウザプール（BrowserPool）のテスト
+ブラウザを使わないチェックでヘルスチェックがChromiumを起動しないことを確認する
+"""
+
+import asyncio
+from browser_pool import BrowserPool
+
+
+def test_health_check_before_launch():
+    """一度も起動していなければヘルスチェックは何もしない"""
+    pool = BrowserPool(log=lambda message: None)
+    for _ in range(3):
+        assert asyncio.run(pool.health_check()) is True
+    assert pool.launch_count == 0
+    assert pool._playwright is None
+    assert pool._browser is None
+
+
+if __name__ == "__main__":
+    test_health_check_before_launch()
+    print("✅ 常駐ブラウザプールのテスト完了")
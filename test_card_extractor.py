@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+車両カード抽出のテスト
+"""
+
+from html_parser_backend import available_backends, make_soup
+from card_extractor import iter_cards, card_fields, parse_listing_page
+
+# 2台目は価格応談（価格要素なし）、3台目は年式なし
+CARLIST_HTML = """
+<html><body>
+<ul class="result">
+  <li class="card"><div class="head"><span class="badge">新着</span><p class="detais-name2">プリウス A</p></div>
+    <div class="spec"><span>2019年</span></div><p class="car-price-sub">145万円</p></li>
+  <li class="card"><div class="head"><p class="detais-name2">プリウス S</p></div>
+    <div class="spec"><span>2020年</span></div><p class="ask">応談</p></li>
+  <li class="card"><div class="head"><p class="detais-name2">アクア G</p></div>
+    <p class="car-price-sub">98万円</p></li>
+</ul>
+</body></html>
+"""
+
+
+def _extract(backend, keyword=None):
+    soup = make_soup(CARLIST_HTML, backend)
+    return [(name, *card_fields(card, price_elem)) for name, card, price_elem in iter_cards(soup, keyword)]
+
+
+def test_card_fields():
+    """カードごとに車名・価格・年式・新着を取り出す"""
+    for backend in available_backends():
+        assert _extract(backend) == [
+            ("プリウス A", "145万円", "2019年", True),
+            # 価格の無いカードは隣のカードの価格を拾わない
+            ("プリウス S", "価格不明", "2020年", False),
+            ("アクア G", "98万円", "年式不明", False),
+        ], backend
+
+
+def test_keyword_filter():
+    """keyword を含む車名だけ返す"""
+    for backend in available_backends():
+        assert [row[0] for row in _extract(backend, keyword="プリウス")] == ["プリウス A", "プリウス S"], backend
+
+
+def test_no_price_on_first_card():
+    """先頭カードに価格が無くても一覧全体をカードとみなさない"""
+    html = CARLIST_HTML.replace('<p class="car-price-sub">145万円</p>', "")
+    for backend in available_backends():
+        soup = make_soup(html, backend)
+        rows = [(name, card_fields(card, price_elem)[0]) for name, card, price_elem in iter_cards(soup)]
+        assert rows == [("プリウス A", "価格不明"), ("プリウス S", "価格不明"), ("アクア G", "98万円")], backend
+
+
+def test_detail_url():
+    """詳細ページへのリンクがあるカードは絶対URLの detail_url を持つ"""
+    html = CARLIST_HTML.replace('<p class="car-price-sub">145万円</p>',
+                                '<p class="car-price-sub">145万円</p><a href="/ucar/detail/A1">詳細</a>')
+    for backend in available_backends():
+        vehicles = parse_listing_page(html, "https://toyota.jp/ucar/carlist/?Cn=01", backend=backend)
+        assert vehicles[0]["detail_url"] == "https://toyota.jp/ucar/detail/A1", backend
+        assert "detail_url" not in vehicles[1], backend
+
+
+# 1台目だけ車名が1段深いカード（2台目は1台目の段数だと一覧全体まで上がる）
+IRREGULAR_HTML = """
+<html><body><ul class="result">
+  <li class="card"><div class="head"><p class="detais-name2">プリウス A</p></div>
+    <p class="car-price-sub">145万円</p><a href="/ucar/detail/A1">詳細</a></li>
+  <li class="card"><p class="detais-name2">プリウス S</p>
+    <p class="car-price-sub">138万円</p><a href="/ucar/detail/S2">詳細</a></li>
+</ul></body></html>
+"""
+
+
+def test_irregular_card_depth():
+    """最初のカードと段数が違うカードは、隣のカードを含む祖先を使わずに探し直す"""
+    for backend in available_backends():
+        vehicles = parse_listing_page(IRREGULAR_HTML, "https://toyota.jp/ucar/carlist/?Cn=01", backend=backend)
+        assert [(vehicle["name"], vehicle["price"], vehicle["detail_url"]) for vehicle in vehicles] == [
+            ("プリウス A", "145万円", "https://toyota.jp/ucar/detail/A1"),
+            ("プリウス S", "138万円", "https://toyota.jp/ucar/detail/S2"),
+        ], backend
+
+
+if __name__ == "__main__":
+    test_card_fields()
+    test_keyword_filter()
+    test_no_price_on_first_card()
+    test_detail_url()
+    test_irregular_card_depth()
+    print("✅ 車両カード抽出のテスト完了")
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+一覧JSON変換のテスト
+保存済みレスポンス（data/responses/*.json）があればそれも再解析する
+"""
+
+from pathlib import Path
+from carlist_json import (
+    find_vehicle_list, format_price, load_recorded_responses,
+    parse_listing_json, vehicles_from_payloads
+)
+
+SEARCH_URL = "https://toyota.jp/ucar/carlist/?Cn=01_プリウス"
+RESPONSES_DIR = Path(__file__).parent / "data" / "responses"
+
+# レスポンス形式の例（ネストした一覧・円単位の価格・グレード別項目）
+SAMPLE_PAYLOAD = {
+    "status": "ok",
+    "result": {
+        "totalCount": 3,
+        "items": [
+            {"ucarId": "0360117B68458", "carName": "プリウス", "grade": "A ツーリング 4WD",
+             "totalPrice": 1450000, "modelYear": "2019年(R1年)", "newFlg": "1"},
+            {"ucarId": "0360133D13504", "carName": "プリウス S 4WD",
+             "totalPrice": "143.8万円", "modelYear": 2020, "newFlg": "0"},
+            {"ucarId": "0360103E09476", "carName": "アクア G",
+             "totalPrice": 980000, "modelYear": 2021},
+        ],
+    },
+    "banners": [{"name": "キャンペーン", "link": "/campaign"}],
+}
+
+
+def test_find_vehicle_list():
+    """ネストしたJSONから車両リストを見つける"""
+    found = find_vehicle_list(SAMPLE_PAYLOAD)
+    assert len(found) == 3
+    assert find_vehicle_list({"banners": [{"name": "x"}]}) == []
+
+
+def test_parse_listing_json():
+    """parse_vehicles と同じ形式に変換される"""
+    vehicles = parse_listing_json(SAMPLE_PAYLOAD, SEARCH_URL, keyword="プリウス")
+    assert [v["name"] for v in vehicles] == ["プリウス A ツーリング 4WD", "プリウス S 4WD"]
+    assert [v["price"] for v in vehicles] == ["145万円", "143.8万円"]
+    assert [v["year"] for v in vehicles] == ["2019年", "2020年"]
+    assert [v["is_new"] for v in vehicles] == [True, False]
+    assert vehicles[0]["listing_id"] == "0360117B68458"
+    assert all(v["url"] == SEARCH_URL for v in vehicles)
+
+
+def test_format_price():
+    assert format_price(1438000) == "143.8万円"
+    assert format_price(143.8) == "143.8万円"
+    assert format_price("1,380,000円") == "138万円"
+    assert format_price(None) == "価格不明"
+
+
+def test_no_listing_response():
+    """一覧JSONが無ければNone（DOM解析にフォールバック）"""
+    assert vehicles_from_payloads([], SEARCH_URL) is None
+    assert vehicles_from_payloads([("https://toyota.jp/api/config", {"a": 1})], SEARCH_URL) is None
+
+
+def test_recorded_responses():
+    """保存済みレスポンスを再解析"""
+    if not RESPONSES_DIR.exists():
+        print("保存済みレスポンスなし（RECORD_RESPONSES=1 で監視を実行すると保存されます）")
+        return
+
+    recorded = load_recorded_responses(RESPONSES_DIR)
+    vehicles = vehicles_from_payloads(recorded, SEARCH_URL)
+    print(f"保存済みレスポンス: {len(recorded)}件, 車両: {len(vehicles or [])}台")
+    for vehicle in (vehicles or [])[:5]:
+        assert vehicle["name"]
+        print(f"  • {vehicle['name']} - {vehicle['price']} ({vehicle['year']})")
+
+
+if __name__ == "__main__":
+    test_find_vehicle_list()
+    test_parse_listing_json()
+    test_format_price()
+    test_no_listing_response()
+    test_recorded_responses()
+    print("✅ 一覧JSON変換テスト完了")
@@ -0,0 +1,39 @@
+#!/usr/bin/env python3
+"""
+並列取得エンジン（FetchEngine）のテスト
+同時に取得したページの取得方法が他のページのものと入れ替わらないことを確認する
+"""
+
+import asyncio
+from carlist_fetcher import FetchedPage
+from fetch_engine import FetchEngine
+
+
+class _Pool:
+    max_idle_pages = 1
+
+
+class _Fetcher:
+    """URLごとに取得方法・所要時間が異なる取得（後に始めたページほど早く終わる）"""
+
+    def __init__(self):
+        self.browser_pool = _Pool()
+
+    async def fetch_html(self, url):
+        index = int(url.rsplit("=", 1)[1])
+        await asyncio.sleep(0.01 * (4 - index))
+        return FetchedPage(f"<html>{index}</html>", "http" if index % 2 else "dom", index)
+
+
+def test_source_per_result():
+    """取得方法は結果ごとに、そのページを取得した方法になる"""
+    engine = FetchEngine(_Pool(), concurrency=4, fetcher=_Fetcher(), log=lambda message: None)
+    urls = [f"https://toyota.jp/ucar/carlist/?page={index}" for index in range(4)]
+    results = asyncio.run(engine.fetch_all(urls))
+    assert [result.html for result in results] == [f"<html>{index}</html>" for index in range(4)]
+    assert [result.source for result in results] == ["dom", "http", "dom", "http"]
+
+
+if __name__ == "__main__":
+    test_source_per_result()
+    print("✅ 並列取得エンジンのテスト完了")
@@ -0,0 +1,45 @@
+#!/usr/bin/env python3
+"""
+カード項目抽出のテスト
+1回のテキスト取得で年式・走行距離・販売店・新着が得られ、どのバックエンドでも同じになることを確認する
+"""
+
+from pathlib import Path
+from field_extractor import card_text, extract_fields
+from html_parser_backend import available_backends, make_soup
+
+FIXTURE = Path(__file__).parent / "debug_response.html"
+
+
+def _fields(text):
+    fields = extract_fields(text)
+    return fields.year, fields.year_text, fields.mileage, fields.dealer, fields.is_new
+
+
+def test_extract_fields():
+    text = "\n".join(["NEW", "プリウス S", "年式", "2019年(R1年)", "車検 2026年8月", "3.2万km",
+                      "トヨタモビリティ東京 小平店"])
+    assert _fields(text) == ("2019", "2019年(R1年)", 32000, "トヨタモビリティ東京 小平店", True)
+    assert _fields("走行距離\n102,000km") == (None, None, 102000, None, False)
+    # 西暦でない「年」や数字の無い km は拾わない
+    assert _fields("保証1年\nkm表示なし\n新着") == (None, None, None, None, True)
+
+
+def test_gazoo_detail_area():
+    """gazooのメイン一覧の詳細欄から全バックエンドで同じ項目"""
+    html = FIXTURE.read_text(encoding="utf-8")
+    results = {}
+    for backend in available_backends():
+        areas = make_soup(html, backend).select("#car-list-wrap div.detail_area")
+        results[backend] = [_fields(card_text(area)) for area in areas]
+    expected = results["html.parser"]
+    assert len(expected) == 50
+    assert expected[0][:3] == ("2023", "2023年(R5年)", 2000)
+    for backend, fields in results.items():
+        assert fields == expected, backend
+
+
+if __name__ == "__main__":
+    test_extract_fields()
+    test_gazoo_detail_area()
+    print("✅ カード項目抽出のテスト完了")
@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+"""
+検索結果の変更検知（ChangeDetector）のテスト
+指紋は判定では更新されず、ページの車両を保存できた後にだけ確定されることを確認する
+"""
+
+import asyncio
+import tempfile
+from functools import partial
+from pathlib import Path
+from urllib.parse import parse_qsl, urlsplit
+from card_extractor import parse_listing_page
+from carlist_fetcher import CarlistFetcher, FetchedPage
+from fingerprint import ChangeDetector, result_fingerprint
+from pagination import PaginationCrawler, page_url
+from snapshot_diff import SnapshotDiff
+from vehicle_store import VehicleStore
+
+SEARCH_URL = "https://toyota.jp/ucar/carlist/?Cn=01_プリウス"
+
+
+def _page(*cars, last_page=1):
+    """cars: (詳細ページのID, 価格) または (詳細ページのID, 価格, 車名, 年式)"""
+    cards = "".join(
+        f'<dl><dt><a href="/ucar/detail/{car[0]}"><p class="detais-name2">'
+        f'{car[2] if len(car) > 2 else f"プリウス {car[0]}"}</p></a></dt>'
+        f'<dd><p class="car-price-sub">{car[1]}</p><p>{car[3] if len(car) > 3 else "2020年"}</p></dd></dl>'
+        for car in cars
+    )
+    links = "".join(f'<a href="/ucar/carlist/?page={page}">{page}</a>' for page in range(2, last_page + 1))
+    return f'<html><body><div id="car-list-wrap">{cards}</div>{links}</body></html>'
+
+
+def test_is_unchanged_is_read_only():
+    """判定だけでは指紋を更新しない。commit() した内容だけ「変更なし」になる"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "fingerprints.json"
+        detector = ChangeDetector(path)
+        html = _page(("A1", "150万円"))
+        assert not detector.is_unchanged(SEARCH_URL, html)
+        assert not detector.is_unchanged(SEARCH_URL, html)
+
+        detector.commit(SEARCH_URL, result_fingerprint(html))
+        assert detector.is_unchanged(SEARCH_URL, html)
+        assert not detector.is_unchanged(SEARCH_URL, _page(("A1", "145万円")))
+        detector.save()
+        assert ChangeDetector(path).is_unchanged(SEARCH_URL, html)
+
+
+def test_fingerprint_covers_identity_fields():
+    """車名・価格が同じでも詳細リンク・年式・新着バッジが変われば別の指紋"""
+    base = result_fingerprint(_page(("AAA", "150万円", "プリウス A", "2020年")))
+    assert result_fingerprint(_page(("AAA", "150万円", "プリウス A", "2020年"))) == base
+    assert result_fingerprint(_page(("BBB", "150万円", "プリウス A", "2020年"))) != base
+    assert result_fingerprint(_page(("AAA", "150万円", "プリウス A", "2019年"))) != base
+    assert result_fingerprint(_page(("AAA", "150万円", "プリウス A", "2020年 NEW"))) != base
+    # カードから離れた部分（広告等）の変化は無視
+    html = _page(("AAA", "150万円", "プリウス A", "2020年"))
+    assert result_fingerprint(html.replace("</body>", "<p>" + "x" * 3000 + "2024年の広告</p></body>")) == base
+
+
+def test_parse_if_changed_defers_commit():
+    """解析したページは指紋を付けて返し、確定するまでは次回も解析する"""
+    detector = ChangeDetector()
+    fetcher = CarlistFetcher(None, change_detector=detector, log=lambda message: None)
+    parse_html = partial(parse_listing_page, search_url=SEARCH_URL)
+    html = _page(("A1", "150万円"), ("B2", "140万円"))
+
+    page = asyncio.run(fetcher.parse_if_changed(SEARCH_URL, html, parse_html))
+    assert len(page) == 2 and not page.unchanged and page.key == SEARCH_URL
+    again = asyncio.run(fetcher.parse_if_changed(SEARCH_URL, html, parse_html))
+    assert len(again) == 2 and not again.unchanged
+
+    detector.commit(page.key, page.fingerprint)
+    skipped = asyncio.run(fetcher.parse_if_changed(SEARCH_URL, html, parse_html))
+    assert skipped == [] and skipped.unchanged
+    assert (detector.hits, detector.misses) == (1, 2)
+
+
+class _Pool:
+    max_idle_pages = 1
+
+
+def _monitor(tmp, pages):
+    """pages: {ページ番号: HTML}（チェックの間に書き換えられる）を全ページ巡回する監視"""
+    from prius_monitor import PriusMonitor
+    monitor = PriusMonitor.__new__(PriusMonitor)
+    monitor.log = lambda message: None
+    monitor.known_vehicles = VehicleStore(Path(tmp) / "vehicles.db")
+    monitor.seen_filter = None
+    monitor.http_fetcher = None
+    monitor.change_detector = ChangeDetector(Path(tmp) / "fingerprints.json")
+    monitor.listing_diff = SnapshotDiff(Path(tmp) / "listing_snapshot.json")
+    monitor.parsed_pages = {}
+    monitor.fetch_complete = False
+    for channel in ("slack", "email", "desktop"):
+        setattr(monitor, f"send_{channel}_notification", lambda vehicles: False)
+
+    fetcher = CarlistFetcher(_Pool(), change_detector=monitor.change_detector, log=monitor.log)
+
+    async def fetch_html(url):
+        return FetchedPage(pages[int(dict(parse_qsl(urlsplit(url).query)).get("page", 1))], "http")
+
+    fetcher.fetch_html = fetch_html
+    parse_html = partial(parse_listing_page, search_url=SEARCH_URL, keyword="プリウス")
+    crawler = PaginationCrawler(fetcher, parse_html, concurrency=2, log=monitor.log)
+
+    async def iter_current_vehicles():
+        monitor.fetch_complete = False
+        async for page_vehicles in crawler.iter_pages(SEARCH_URL):
+            yield page_vehicles
+        monitor.fetch_complete = crawler.complete
+
+    monitor.iter_current_vehicles = iter_current_vehicles
+    return monitor
+
+
+def test_monitor_commits_after_save():
+    """車両ストアへの保存に失敗したチェックの指紋は確定せず、次のチェックで解析し直して保存する"""
+    with tempfile.TemporaryDirectory() as tmp:
+        monitor = _monitor(tmp, {1: _page(("A1", "150万円"))})
+        store_commit = monitor.known_vehicles.commit
+
+        def failing_commit(*args, **kwargs):
+            raise OSError("disk full")
+
+        monitor.known_vehicles.commit = failing_commit
+        assert asyncio.run(monitor.check_for_new_vehicles()) == 1
+        assert monitor.change_detector.fingerprints == {}
+        assert not (Path(tmp) / "fingerprints.json").exists()
+
+        # 次のチェックでは同じページを解析し直し、保存できてから指紋を確定する
+        monitor.known_vehicles.commit = store_commit
+        assert asyncio.run(monitor.check_for_new_vehicles()) == 0
+        assert monitor.change_detector.misses == 1
+        assert "toyota.jp:A1" in VehicleStore(Path(tmp) / "vehicles.db")
+        assert list(monitor.change_detector.fingerprints) == [SEARCH_URL]
+
+        # 保存済みのページは解析を省略し、掲載・指紋とも変わらないので書き込まない
+        snapshot = Path(tmp) / "listing_snapshot.json"
+        fingerprints = Path(tmp) / "fingerprints.json"
+        snapshot.unlink()
+        fingerprints.unlink()
+        assert asyncio.run(monitor.check_for_new_vehicles()) == 0
+        assert monitor.change_detector.hits == 1
+        assert not snapshot.exists() and not fingerprints.exists()
+        monitor.known_vehicles.close()
+
+
+def test_same_name_and_price_swap():
+    """同じ車名・価格の別の車両（詳細ページ・年式が違う）に入れ替わったページは解析し直す"""
+    with tempfile.TemporaryDirectory() as tmp:
+        pages = {1: _page(("AAA", "150万円", "プリウス A", "2020年"))}
+        monitor = _monitor(tmp, pages)
+        assert asyncio.run(monitor.check_for_new_vehicles()) == 1
+
+        pages[1] = _page(("BBB", "150万円", "プリウス A", "2019年"))
+        assert asyncio.run(monitor.check_for_new_vehicles()) == 1
+        assert monitor.change_detector.misses == 1
+        assert "toyota.jp:BBB" in monitor.known_vehicles
+        monitor.known_vehicles.close()
+
+
+def test_unchanged_page_counts_as_seen():
+    """全ページ巡回: 前回と同じページの掲載は今回も見たものとし、別のページで消えた掲載だけを掲載終了にする"""
+    with tempfile.TemporaryDirectory() as tmp:
+        pages = {1: _page(("A1", "150万円"), ("B2", "140万円"), last_page=2),
+                 2: _page(("C3", "145万円"), ("D4", "155万円"), last_page=2)}
+        monitor = _monitor(tmp, pages)
+        assert asyncio.run(monitor.check_for_new_vehicles()) == 4
+        assert set(monitor.change_detector.fingerprints) == {SEARCH_URL, page_url(SEARCH_URL, "page", 2)}
+
+        # 1ページ目は前回と同じ（解析を省略）、2ページ目では D4 が消えた
+        pages[2] = _page(("C3", "145万円"), last_page=2)
+        removed = []
+
+        def find_removed(complete, find=monitor.find_removed_vehicles):
+            events = find(complete)
+            removed.extend(events)
+            return events
+
+        monitor.find_removed_vehicles = find_removed
+        assert asyncio.run(monitor.check_for_new_vehicles()) == 0
+        assert (monitor.change_detector.hits, monitor.change_detector.misses) == (1, 1)
+        assert [event.key for event in removed] == ["toyota.jp:D4"]
+        assert sorted(monitor.listing_diff.previous) == ["toyota.jp:A1", "toyota.jp:B2", "toyota.jp:C3"]
+
+        # 全ページが前回と同じなら何も掲載終了にしない
+        removed.clear()
+        assert asyncio.run(monitor.check_for_new_vehicles()) == 0
+        assert monitor.change_detector.all_unchanged and removed == []
+        assert len(SnapshotDiff(Path(tmp) / "listing_snapshot.json").previous) == 3
+
+        # 前回のページの掲載が記録されていない（差分を保存する前に止まった等）場合は
+        # 掲載終了を判定せず、そのページの指紋を破棄して次回解析し直す
+        monitor.listing_diff.pages.pop(SEARCH_URL)
+        pages[2] = _page(last_page=2)
+        assert asyncio.run(monitor.check_for_new_vehicles()) == 0
+        assert removed == [] and SEARCH_URL not in monitor.change_detector.fingerprints
+        assert asyncio.run(monitor.check_for_new_vehicles()) == 0
+        assert [event.key for event in removed] == ["toyota.jp:C3"]
+        monitor.known_vehicles.close()
+
+
+if __name__ == "__main__":
+    test_is_unchanged_is_read_only()
+    test_fingerprint_covers_identity_fields()
+    test_parse_if_changed_defers_commit()
+    test_monitor_commits_after_save()
+    test_same_name_and_price_swap()
+    test_unchanged_page_counts_as_seen()
+    print("✅ 変更検知のテスト完了")
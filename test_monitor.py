@@ -20,20 +20,15 @@ async def test_monitoring():
     print(f"\n✅ テスト完了")
     print(f"🚗 新着車両: {new_count}台")
     
-    # データファイルの確認
-    import json
+    # 車両ストアの確認
     from pathlib import Path
     
-    vehicles_file = Path("data/vehicles.json")
-    if vehicles_file.exists():
-        with open(vehicles_file, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-        print(f"💾 保存済み車両: {len(data)}台")
-        
-        if data:
-            print("\n📋 検出済み車両一覧:")
-            for vehicle_id, vehicle in data.items():
-                print(f"  • {vehicle['name']} - {vehicle['price']} ({vehicle_id})")
+    print(f"💾 保存済み車両: {len(monitor.known_vehicles)}台")
+    if len(monitor.known_vehicles):
+        print("\n📋 検出済み車両一覧:")
+        for vehicle_id, vehicle in monitor.known_vehicles.items():
+            print(f"  • {vehicle.name} - {vehicle.price_text} ({vehicle_id})")
+    await monitor.close()
     
     # ログファイルの確認
     log_file = Path("data/monitor.log")
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+ページ内抽出（FETCH_MODE=script）のテスト
+ブラウザ内で抽出した結果が BeautifulSoup での解析（parse_vehicles）と一致することを確認する
+Chromiumが起動できない環境ではブラウザを使う比較をスキップとして報告する
+"""
+
+import asyncio
+import pytest
+from page_extract import extract_cards, vehicles_from_cards
+from prius_monitor import PriusMonitor
+from test_parser_backends import CARLIST_HTML
+from test_card_extractor import CARLIST_HTML as CARLIST_HTML_NO_PRICE, IRREGULAR_HTML
+
+SEARCH_URL = "https://toyota.jp/ucar/carlist/?Cn=01_プリウス"
+
+
+def _monitor():
+    # ブラウザを起動せずに解析メソッドだけ使う
+    monitor = PriusMonitor.__new__(PriusMonitor)
+    monitor.search_url = SEARCH_URL
+    monitor.log = lambda message: None
+    return monitor
+
+
+def _comparable(vehicles):
+    keys = ("name", "price", "year", "is_new", "url")
+    return [{key: vehicle[key] for key in keys} for vehicle in vehicles]
+
+
+async def _extract_in_browser(pages):
+    from playwright.async_api import async_playwright
+    async with async_playwright() as p:
+        try:
+            browser = await p.chromium.launch(headless=True)
+        except Exception as e:
+            pytest.skip(f"Chromiumを起動できないためブラウザでの比較を省略: {e}")
+        try:
+            page = await browser.new_page()
+            results = []
+            for html in pages:
+                await page.set_content(html)
+                results.append(await extract_cards(page, keyword="プリウス"))
+            return results
+        finally:
+            await browser.close()
+
+
+def test_vehicles_from_cards():
+    """抽出結果を parse_vehicles と同じ形式に変換"""
+    cards = [
+        {"name": "プリウス A", "price": "145万円", "year": "2019年", "is_new": True,
+         "detail_url": "https://toyota.jp/ucar/detail/1"},
+        {"name": "プリウス S", "price": None, "year": None, "is_new": False, "detail_url": None},
+    ]
+    vehicles = vehicles_from_cards(cards, SEARCH_URL)
+    assert _comparable(vehicles) == [
+        {"name": "プリウス A", "price": "145万円", "year": "2019年", "is_new": True, "url": SEARCH_URL},
+        {"name": "プリウス S", "price": "価格不明", "year": "年式不明", "is_new": False, "url": SEARCH_URL},
+    ]
+    assert vehicles[0]["detail_url"] == "https://toyota.jp/ucar/detail/1"
+    assert "detail_url" not in vehicles[1]
+
+
+def test_matches_parse_vehicles():
+    """ブラウザ内の抽出と parse_vehicles の結果が一致（段数の違うカードも同じ規則で探し直す）"""
+    pages = [(CARLIST_HTML, 3), (CARLIST_HTML_NO_PRICE, 3), (IRREGULAR_HTML, 2)]
+    results = asyncio.run(_extract_in_browser([html for html, _ in pages]))
+    monitor = _monitor()
+    for (html, count), (name_count, cards) in zip(pages, results):
+        assert name_count == count
+        expected = _comparable(monitor.parse_vehicles(html))
+        assert _comparable(vehicles_from_cards(cards, SEARCH_URL)) == expected
+
+
+if __name__ == "__main__":
+    test_vehicles_from_cards()
+    try:
+        test_matches_parse_vehicles()
+    except pytest.skip.Exception as e:
+        print(f"⚠️ {e}")
+    print("✅ ページ内抽出のテスト完了")
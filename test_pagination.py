@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+全ページ巡回（PaginationCrawler）のテスト
+ページ番号パラメータ・総ページ数の割り出しと、同じページが返る場合に巡回をやめることを確認する
+"""
+
+import asyncio
+from urllib.parse import parse_qsl, urlsplit
+from carlist_fetcher import FetchedPage
+from pagination import PaginationCrawler, discover_pagination, result_list_html
+
+SEARCH_URL = "https://toyota.jp/ucar/carlist/?Cn=01_プリウス"
+
+
+def _card(name, price):
+    return f'<dl><p class="detais-name2">{name}</p><p class="car-price-sub">{price}</p></dl>'
+
+
+def _page(cards, links="", total=None, recommended=""):
+    count = f"<p>全{total}件</p>" if total else ""
+    return (f'<html><body><ul id="slick_recommended">{recommended}</ul>'
+            f'<div id="car-list-wrap">{count}<div>{"".join(cards)}</div></div>{links}</body></html>')
+
+
+def test_discover_pagination():
+    cards = [_card(f"プリウス {i}", "150万円") for i in range(2)]
+    links = '<a href="/ucar/carlist/?Cn=01_プリウス&amp;page=2">2</a><a href="/ucar/carlist/?page=3">3</a>'
+    assert discover_pagination(_page(cards, links=links), SEARCH_URL) == ("page", 3)
+    assert discover_pagination(_page(cards, links=links, total=9), SEARCH_URL) == ("page", 5)
+
+    # ページ送りのリンクが無ければパラメータは推測しない
+    assert discover_pagination(_page(cards, total=9), SEARCH_URL) == (None, 5)
+    # 検索結果一覧の外（おすすめ車両等）の件数は数えない
+    recommended = "<li>おすすめ 全120件</li>"
+    assert discover_pagination(_page(cards, recommended=recommended), SEARCH_URL) == (None, 1)
+    assert result_list_html(_page(cards)).endswith("</dl></div></div>")
+
+
+class _Pool:
+    max_idle_pages = 1
+
+
+class _Fetcher:
+    """ページ番号を無視する（どのページでも1ページ目を返す）サイト"""
+
+    def __init__(self, pages):
+        self.browser_pool = _Pool()
+        self.pages = pages
+        self.requested = []
+
+    async def fetch_html(self, url):
+        page = int(dict(parse_qsl(urlsplit(url).query)).get("page", 1))
+        self.requested.append(page)
+        return FetchedPage(self.pages.get(page, self.pages[1]), "http")
+
+    async def parse_if_changed(self, url, html, parse_html):
+        return parse_html(html)
+
+
+def _crawl(fetcher, max_pages=500):
+    crawler = PaginationCrawler(fetcher, lambda html: [html], concurrency=2, max_pages=max_pages,
+                                log=lambda message: None)
+
+    async def run():
+        return [page async for page in crawler.iter_pages(SEARCH_URL)]
+
+    return crawler, asyncio.run(run())
+
+
+def test_stops_on_repeated_page():
+    """同じ車両カードのページが返ったら巡回をやめ、全ページを確認できなかった扱いにする"""
+    links = "".join(f'<a href="/ucar/carlist/?page={page}">{page}</a>' for page in range(2, 401))
+    first = _page([_card("プリウス A", "150万円")], links=links)
+    fetcher = _Fetcher({1: first})
+    crawler, pages = _crawl(fetcher)
+    assert len(pages) == 1 and not crawler.complete
+    assert len(fetcher.requested) < 10
+
+    # ページ送りのリンクが無く総件数だけある場合は2ページ目以降を推測しない
+    fetcher = _Fetcher({1: _page([_card("プリウス A", "150万円")], total=50)})
+    crawler, pages = _crawl(fetcher)
+    assert fetcher.requested == [1] and not crawler.complete
+
+
+def test_crawls_distinct_pages():
+    links = "".join(f'<a href="/ucar/carlist/?page={page}">{page}</a>' for page in range(2, 4))
+    pages = {page: _page([_card(f"プリウス {page}", "150万円")], links=links) for page in range(1, 4)}
+    crawler, results = _crawl(_Fetcher(pages))
+    assert sorted(html for html, in results) == sorted(pages.values()) and crawler.complete
+
+
+if __name__ == "__main__":
+    test_discover_pagination()
+    test_stops_on_repeated_page()
+    test_crawls_distinct_pages()
+    print("✅ 全ページ巡回のテスト完了")
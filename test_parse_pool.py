@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+解析ワーカープールのテスト
+別プロセス・スレッドで解析しても、イベントループ内で解析した場合と同じ車両レコードになることを確認する
+"""
+
+import asyncio
+from functools import partial
+from card_extractor import parse_listing_page
+from html_parser_backend import available_backends
+from parse_pool import ParsePool
+from test_parser_backends import CARLIST_HTML, SEARCH_URL
+
+
+def _without_timestamp(vehicles):
+    return [{k: v for k, v in vehicle.items() if k != "detected_at"} for vehicle in vehicles]
+
+
+async def _parse_all(pool, parse_html, pages):
+    try:
+        return await asyncio.gather(*(pool.run(parse_html, html) for html in pages))
+    finally:
+        pool.close()
+
+
+def test_pool_matches_direct_parse():
+    """process / thread のどちらでも直接の解析と同じ結果"""
+    pages = [CARLIST_HTML] * 4
+    for backend in available_backends():
+        parse_html = partial(parse_listing_page, search_url=SEARCH_URL, keyword="プリウス", backend=backend)
+        expected = _without_timestamp(parse_html(CARLIST_HTML))
+        assert [v["name"] for v in expected] == ["プリウス A ツーリング 4WD", "プリウス S 4WD"]
+
+        for kind in ("process", "thread"):
+            results = asyncio.run(_parse_all(ParsePool(2, kind=kind), parse_html, pages))
+            for vehicles in results:
+                assert _without_timestamp(vehicles) == expected, (backend, kind)
+
+
+def test_pool_kind():
+    """auto は解析バックエンドに合わせて選ぶ"""
+    import html_parser_backend
+    original = html_parser_backend.HTML_PARSER
+    try:
+        html_parser_backend.HTML_PARSER = "html.parser"
+        assert ParsePool(kind="auto").kind == "process"
+        if "selectolax" in available_backends():
+            html_parser_backend.HTML_PARSER = "selectolax"
+            assert ParsePool(kind="auto").kind == "thread"
+    finally:
+        html_parser_backend.HTML_PARSER = original
+
+    try:
+        ParsePool(kind="fork")
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("未対応の種類は ValueError")
+
+
+if __name__ == "__main__":
+    test_pool_matches_direct_parse()
+    test_pool_kind()
+    print("✅ 解析ワーカープールのテスト完了")
@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+HTML解析バックエンドのテスト
+どのバックエンドでも同じ車両情報が得られることを確認する
+"""
+
+from pathlib import Path
+from html_parser_backend import available_backends, make_soup, resolve_backend
+from toyota_used_car_search import ToyotaUsedCarSearch, DETAIL_ID_PATTERN
+from prius_monitor import PriusMonitor
+from cloud_monitor import CloudPriusMonitor
+from prius_scraper import parse_new_listings
+
+FIXTURE = Path(__file__).parent / "debug_response.html"
+SEARCH_URL = "https://toyota.jp/ucar/carlist/?Cn=01_プリウス"
+
+# toyota.jp の一覧カードを模したHTML（NEWバッジ・スクリプト・年式表記を含む）
+CARLIST_HTML = """
+<html><body>
+<div class="result">
+  <div class="car-card">
+    <div class="name-box"><span class="badge">NEW</span><p class="detais-name2">プリウス A ツーリング 4WD</p></div>
+    <div class="spec"><span>2019年(R1年)</span><span>3.2万km</span></div>
+    <p class="car-price-sub">145<span>.0</span>万円</p>
+  </div>
+  <div class="car-card">
+    <div class="name-box"><p class="detais-name2">プリウス S 4WD</p></div>
+    <script>var label = "NEW";</script>
+    <div class="spec"><p>2020年(R2年)</p></div>
+    <p class="car-price-sub">143.8万円</p>
+  </div>
+  <div class="car-card">
+    <div class="name-box"><p class="detais-name2">アクア G</p></div>
+    <p class="car-price-sub">98万円</p>
+  </div>
+</div>
+</body></html>
+"""
+
+
+def _without_timestamp(vehicles):
+    return [{k: v for k, v in vehicle.items() if k != "detected_at"} for vehicle in vehicles]
+
+
+def _monitor(cls):
+    # ブラウザを起動せずに解析メソッドだけ使う
+    monitor = cls.__new__(cls)
+    monitor.search_url = SEARCH_URL
+    monitor.log = lambda message: None
+    return monitor
+
+
+def _parse_vehicles_with(cls, backend, html):
+    import html_parser_backend
+    original = html_parser_backend.HTML_PARSER
+    html_parser_backend.HTML_PARSER = backend
+    try:
+        return _without_timestamp(_monitor(cls).parse_vehicles(html))
+    finally:
+        html_parser_backend.HTML_PARSER = original
+
+
+def test_resolve_backend():
+    """未インストールのバックエンドは html.parser に戻る"""
+    assert resolve_backend("html.parser") == "html.parser"
+    assert resolve_backend("auto") == available_backends()[-1]
+    try:
+        resolve_backend("html5")
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("未対応のバックエンドは ValueError")
+
+
+def test_common_interface():
+    """BeautifulSoupと同じ呼び方で同じ結果"""
+    html = '<div><dl><dt class="a">x</dt><dd><img alt="トヨタ プリウス"></dd></dl><script>NEW</script> y </div>'
+    for backend in available_backends():
+        soup = make_soup(html, backend)
+        div = soup.select_one("div")
+        assert div.get_text() == "x y ", backend
+        assert div.get_text(strip=True) == "xy", backend
+        dt = div.select_one("dt.a")
+        assert dt.get("class") == ["a"], backend
+        assert dt.find_next_sibling("dd").select_one("img")["alt"] == "トヨタ プリウス", backend
+        assert dt.parent.name == "dl", backend
+        assert div.select("div") == [], backend
+
+
+def test_gazoo_fixture_identical():
+    """debug_response.html から全バックエンドで同じ車両情報"""
+    html = FIXTURE.read_text(encoding="utf-8")
+    for parse_mode, count in (("full", 9), ("region", 57)):
+        results = {
+            backend: ToyotaUsedCarSearch(html_parser=backend, parse_mode=parse_mode)._parse_search_results(html)
+            for backend in available_backends()
+        }
+        expected = results["html.parser"]
+        assert len(expected) == count, parse_mode
+        for backend, cars in results.items():
+            assert cars == expected, (parse_mode, backend)
+
+
+def test_gazoo_region_mode():
+    """一覧部分だけの解析: おすすめ＋メイン一覧を車両IDで重複除外"""
+    html = FIXTURE.read_text(encoding="utf-8")
+    full = ToyotaUsedCarSearch(parse_mode="full")._parse_search_results(html)
+    region = ToyotaUsedCarSearch(parse_mode="region")._parse_search_results(html)
+
+    # おすすめ車両はページ全体の解析と同じ（文書順で先頭）
+    assert region[:len(full)] == full
+    # メイン一覧50台のうち2台はおすすめと重複
+    ids = [DETAIL_ID_PATTERN.search(car["url"]).group(1) for car in region]
+    assert len(ids) == len(set(ids)) == 9 + 50 - 2
+    main = region[len(full)]
+    assert main["name"] == "ヤリス X"
+    assert (main["price"], main["year"], main["mileage"]) == ("168.9", "2023", "2,000")
+
+
+def test_parse_vehicles_identical():
+    """parse_vehicles の結果が全バックエンドで一致"""
+    for cls in (PriusMonitor, CloudPriusMonitor):
+        expected = _parse_vehicles_with(cls, "html.parser", CARLIST_HTML)
+        assert [v["name"] for v in expected] == ["プリウス A ツーリング 4WD", "プリウス S 4WD"]
+        assert [v["price"] for v in expected] == ["145.0万円", "143.8万円"]
+        for backend in available_backends():
+            assert _parse_vehicles_with(cls, backend, CARLIST_HTML) == expected, (cls.__name__, backend)
+
+    vehicles = _parse_vehicles_with(PriusMonitor, "html.parser", CARLIST_HTML)
+    assert [v["year"] for v in vehicles] == ["2019年(R1年)", "2020年(R2年)"]
+    # スクリプト内の "NEW" は新着扱いしない
+    assert [v["is_new"] for v in vehicles] == [True, False]
+
+
+def test_parse_new_listings_identical():
+    """prius_scraper.parse_new_listings の結果が全バックエンドで一致"""
+    import html_parser_backend
+    original = html_parser_backend.HTML_PARSER
+    results = {}
+    try:
+        for backend in available_backends():
+            html_parser_backend.HTML_PARSER = backend
+            results[backend] = parse_new_listings(CARLIST_HTML)
+    finally:
+        html_parser_backend.HTML_PARSER = original
+    expected = results["html.parser"]
+    assert expected == ["プリウス A ツーリング 4WD — 145.0万円 [新着]", "プリウス S 4WD — 143.8万円"]
+    for backend, cars in results.items():
+        assert cars == expected, backend
+
+
+if __name__ == "__main__":
+    print(f"利用可能なバックエンド: {', '.join(available_backends())}")
+    test_resolve_backend()
+    test_common_interface()
+    test_gazoo_fixture_identical()
+    test_gazoo_region_mode()
+    test_parse_vehicles_identical()
+    test_parse_new_listings_identical()
+    print("✅ HTML解析バックエンドのテスト完了")
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+レート制限（TokenBucket）と gazoo 検索の接続の使い回しのテスト
+トークンの補充間隔どおりに待たせること、イベントループの中から同期版の検索を呼べることを確認する
+"""
+
+import asyncio
+import time
+import requests
+from rate_limiter import TokenBucket, HostRateLimiter
+from toyota_used_car_search import ToyotaUsedCarSearch
+
+
+def test_reserve_schedule():
+    """バースト分は待たずに送り、それ以降は 1/rate 秒ずつ後ろに予約する"""
+    bucket = TokenBucket(rate=10, capacity=2)
+    waits = [bucket.reserve() for _ in range(4)]
+    assert waits[:2] == [0.0, 0.0]
+    assert abs(waits[2] - 0.1) < 0.01 and abs(waits[3] - 0.2) < 0.01
+
+
+def test_async_acquire_timing():
+    """同時に待つリクエストも補充レートを超えない"""
+    bucket = TokenBucket(rate=20, capacity=1)
+
+    async def run():
+        start = time.monotonic()
+        times = []
+
+        async def request():
+            await bucket.acquire()
+            times.append(time.monotonic() - start)
+
+        await asyncio.gather(*(request() for _ in range(5)))
+        return sorted(times)
+
+    times = asyncio.run(run())
+    assert times[0] < 0.03
+    assert 0.18 <= times[-1] < 0.35
+    assert all(later - earlier >= 0.04 for earlier, later in zip(times, times[1:]))
+
+
+def test_host_buckets():
+    limiter = HostRateLimiter(rate=1.0)
+    assert limiter.bucket("https://gazoo.com/U-Car/search_result") is limiter.bucket("https://gazoo.com/U-Car/")
+    assert limiter.bucket("https://gazoo.com/") is not limiter.bucket("https://toyota.jp/")
+
+
+class _Response:
+    status_code = 200
+    text = "<html><body></body></html>"
+    encoding = "utf-8"
+    url = "https://gazoo.com/U-Car/search_result"
+    headers = {}
+
+    def raise_for_status(self):
+        pass
+
+
+def _search():
+    search = ToyotaUsedCarSearch(rate_limiter=None)
+    search.session = requests.Session()
+    search.requests = []
+
+    def get(url, params=None, **kwargs):
+        search.requests.append(params)
+        return _Response()
+
+    search.session.get = get
+    return search
+
+
+def test_sync_search_in_running_loop():
+    """同期版の search_cars はイベントループの中から呼んでも RuntimeError にならない"""
+    search = _search()
+
+    async def run():
+        return search.search_cars(price_max=160, body_type="4wd")
+
+    assert asyncio.run(run()) == []
+    assert search.requests == [{"Pmx": 160, "Tp": 1, "Drv": 2}]
+
+
+def test_nested_client():
+    """開いている接続は search_many_async の中でも差し替えずに使い、最も外側で閉じる"""
+    search = _search()
+
+    async def run():
+        async with search:
+            client = search._client
+            results = await search.search_many_async([{"price_max": 160}, {"body_type": "4wd"}])
+            assert search._client is client
+        return results
+
+    assert asyncio.run(run()) == [[], []]
+    assert search._client is None and len(search.requests) == 2
+
+
+if __name__ == "__main__":
+    test_reserve_schedule()
+    test_async_acquire_timing()
+    test_host_buckets()
+    test_sync_search_in_running_loop()
+    test_nested_client()
+    print("✅ レート制限のテスト完了")
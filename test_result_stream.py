@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+検索結果の逐次解析のテスト
+debug_response.html を細かく分けて流し込み、一括解析と同じ車両が得られることを確認する
+"""
+
+from pathlib import Path
+from result_stream import ResultCardStream
+from toyota_used_car_search import ToyotaUsedCarSearch
+
+FIXTURE = Path(__file__).parent / "debug_response.html"
+
+
+class _ChunkedResponse:
+    """受信済みのチャンク数を記録するレスポンス"""
+
+    encoding = "utf-8"
+
+    def __init__(self, body, chunk_size):
+        self.body = body
+        self.chunk_size = chunk_size
+        self.chunks_read = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def raise_for_status(self):
+        pass
+
+    def iter_content(self, chunk_size):
+        for i in range(0, len(self.body), self.chunk_size):
+            self.chunks_read += 1
+            yield self.body[i:i + self.chunk_size]
+
+
+class _Session:
+    def __init__(self, response):
+        self.response = response
+        self.headers = {}
+
+    def get(self, url, **kwargs):
+        assert kwargs.get("stream") is True
+        return self.response
+
+
+def test_chunked_feed_matches_full_parse():
+    """どこで区切っても一括解析（region）と同じ結果"""
+    html = FIXTURE.read_text(encoding="utf-8")
+    searcher = ToyotaUsedCarSearch()
+    expected = searcher._parse_search_results(html)
+
+    for size in (7, 1000, 16 * 1024):
+        stream = ResultCardStream()
+        seen_ids = set()
+        cars = []
+        for i in range(0, len(html), size):
+            cars.extend(searcher._cars_from_cards(stream.push(html[i:i + size]), seen_ids))
+        cars.extend(searcher._cars_from_cards(stream.finish(), seen_ids))
+        assert cars == expected, size
+        # おすすめ9件＋メイン一覧50件（重複は解析時に除外）
+        assert stream.card_count == 59
+
+
+def test_entities_and_unclosed_card():
+    """文字参照を保ったままカードを取り出し、閉じていないカードも最後に返す"""
+    stream = ResultCardStream()
+    cards = stream.push('<ul id="slick_recommended"><li><a href="/U-Car/detail?Id=1&amp;x=1">A&amp;B</a></li><li>')
+    assert cards == ['<li><a href="/U-Car/detail?Id=1&amp;x=1">A&amp;B</a></li>']
+    assert stream.push("<p>途中") == []
+    assert stream.finish() == ["<li><p>途中"]
+
+
+def test_implicitly_closed_cards():
+    """閉じタグの無い li は次の li か一覧の終わりで閉じ、入れ子の li はカードに含める"""
+    stream = ResultCardStream()
+    cards = stream.push('<ul id="slick_recommended"><li>A<li>B<ul><li>B-1<li>B-2</ul>')
+    assert cards == ["<li>A"]
+    cards = stream.push('<li>C</ul><dl><dd>一覧外</dd></dl>')
+    assert cards == ["<li>B<ul><li>B-1<li>B-2</ul>", "<li>C"]
+    assert stream.finish() == []
+    assert stream.card_count == 3
+
+
+def test_iter_search_cars_yields_before_download_completes():
+    """本文を読み切る前に最初の車両が返る"""
+    body = FIXTURE.read_bytes()
+    response = _ChunkedResponse(body, chunk_size=4096)
+    searcher = ToyotaUsedCarSearch(rate_limiter=None)
+    searcher.session = _Session(response)
+
+    cars = searcher.iter_search_cars(price_max=150)
+    first = next(cars)
+    total_chunks = -(-len(body) // 4096)
+    assert first["url"].startswith("https://gazoo.com/U-Car/detail?Id=")
+    assert response.chunks_read < total_chunks
+
+    rest = list(cars)
+    assert response.chunks_read == total_chunks
+    assert len(rest) + 1 == 57
+
+
+if __name__ == "__main__":
+    test_chunked_feed_matches_full_parse()
+    test_entities_and_unclosed_card()
+    test_implicitly_closed_cards()
+    test_iter_search_cars_yields_before_download_completes()
+    print("✅ 逐次解析のテスト完了")
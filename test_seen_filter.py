@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+既知の車両IDのフィルタ（SeenFilter）のテスト
+登録済みのIDを取りこぼさないこと、誤判定率、スライスの追加、保存・作り直しを確認する
+"""
+
+import tempfile
+from pathlib import Path
+from vehicle import Vehicle
+from vehicle_store import VehicleStore
+from seen_filter import SeenFilter, open_seen_filter
+
+
+def test_no_false_negatives():
+    """登録したIDは必ず「ある」。容量を超えるとスライスを追加し、誤判定率は指定以下"""
+    with tempfile.TemporaryDirectory() as tmp:
+        seen = SeenFilter(tmp, error_rate=0.01, capacity=1000)
+        keys = [f"toyota.jp:{i:08d}" for i in range(5000)]
+        for key in keys:
+            seen.add(key)
+        assert all(key in seen for key in keys)
+        assert len(seen.slices) == 3  # 1000 + 2000 + 4000
+        # 誤判定で登録済みとみなされたIDは数えない
+        assert 4950 <= len(seen) <= 5000
+
+        false_positives = sum(f"gazoo:{i:08d}" in seen for i in range(20000))
+        assert false_positives / 20000 <= 0.01, false_positives
+        seen.close()
+
+
+def test_reopen():
+    """ファイルに保存したビット列を開き直して使える"""
+    with tempfile.TemporaryDirectory() as tmp:
+        seen = SeenFilter(tmp, capacity=100)
+        for i in range(300):
+            seen.add(f"id-{i}")
+        seen.close()
+
+        reopened = SeenFilter(tmp, capacity=100)
+        assert len(reopened) == 300 and all(f"id-{i}" in reopened for i in range(300))
+        assert not reopened.add("id-5")
+        reopened.close()
+
+        # 誤判定率を変えた場合は空から作り直す
+        changed = SeenFilter(tmp, error_rate=0.01, capacity=100)
+        assert len(changed) == 0
+        changed.close()
+
+
+def test_open_with_store():
+    """車両ストアと世代が合わなければストアの車両IDから作り直す"""
+    with tempfile.TemporaryDirectory() as tmp:
+        store = VehicleStore(Path(tmp) / "vehicles.db")
+        for i in range(50):
+            store[f"toyota.jp:{i}"] = Vehicle(f"プリウス {i}", price=1400000)
+        store.commit("2025-08-03T12:00:00")
+
+        logs = []
+        seen = open_seen_filter(Path(tmp) / "seen_filter", store, log=logs.append)
+        assert len(logs) == 1 and all(f"toyota.jp:{i}" in seen for i in range(50))
+        seen.close()
+
+        # 世代が同じなら作り直さない（世代は書き込みと一緒に保存される）
+        reopened = VehicleStore(Path(tmp) / "vehicles.db")
+        assert reopened.generation == store.generation is not None
+        reopened.close()
+        seen = open_seen_filter(Path(tmp) / "seen_filter", store, log=logs.append)
+        assert len(logs) == 1
+        seen.close()
+
+        # フィルタを保存しないまま車両が増えた場合は作り直す
+        store["toyota.jp:new"] = Vehicle("プリウス Z", price=1500000)
+        store.commit("2025-08-04T12:00:00")
+        seen = open_seen_filter(Path(tmp) / "seen_filter", store, log=logs.append)
+        assert len(logs) == 2 and "toyota.jp:new" in seen
+        seen.close()
+
+        # 台数が同じ別のストアに差し替えた場合も作り直す
+        other = VehicleStore(Path(tmp) / "other.db")
+        for i in range(51):
+            other[f"gazoo:{i}"] = Vehicle(f"プリウス {i}", price=1400000)
+        other.commit("2025-08-05T12:00:00")
+        assert len(other) == len(store)
+        seen = open_seen_filter(Path(tmp) / "seen_filter", other, log=logs.append)
+        assert len(logs) == 3 and all(f"gazoo:{i}" in seen for i in range(51))
+        seen.close()
+        other.close()
+        store.close()
+
+
+if __name__ == "__main__":
+    test_no_false_negatives()
+    test_reopen()
+    test_open_with_store()
+    print("✅ 既知の車両IDのフィルタのテスト完了")
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+セレクタ計画のテスト
+同じレイアウトのページでは計画を1回だけ求め、レイアウトが変わった場合のみ求め直すことを確認する
+"""
+
+from benchmark_parsers import carlist_html
+from card_extractor import iter_cards, card_fields
+from html_parser_backend import available_backends, make_soup
+from selector_plan import SelectorPlanCache, layout_fingerprint, learn_plan
+from test_parser_backends import CARLIST_HTML
+from test_card_extractor import CARLIST_HTML as CARLIST_HTML_NO_PRICE
+
+# クラス名・構造が異なる一覧（価格は span.car-price、カードは li）
+OTHER_LAYOUT_HTML = """
+<html><body><ul class="list">
+  <li><div class="head"><h3 class="car-name">プリウス Z</h3></div><span class="car-price">199.8万円</span></li>
+  <li><div class="head"><h3 class="car-name">プリウス G</h3></div><span class="car-price">185万円</span></li>
+</ul></body></html>
+"""
+
+
+def _records(soup, plan=None):
+    return [(name, *card_fields(card, price_elem)) for name, card, price_elem in iter_cards(soup, plan=plan)]
+
+
+def test_fingerprint_ignores_content():
+    """カード数・車名・価格が違っても同じレイアウトなら同じ指紋"""
+    assert layout_fingerprint(carlist_html(10)) == layout_fingerprint(carlist_html(500))
+    assert layout_fingerprint(carlist_html(10)) != layout_fingerprint(CARLIST_HTML)
+    assert layout_fingerprint("<html><body>車両なし</body></html>") is None
+
+
+def test_learn_once_per_layout():
+    cache = SelectorPlanCache()
+    for cards in (10, 50, 200):
+        html = carlist_html(cards)
+        plan = cache.plan_for(html, make_soup(html))
+    assert (cache.learned, cache.hits) == (1, 2)
+    assert (plan.name_selector, plan.price_selector, plan.card_depth) == ("p.detais-name2", "p.car-price-sub", 2)
+
+    # レイアウトが変わった場合は1回だけ求め直す
+    for _ in range(2):
+        plan = cache.plan_for(OTHER_LAYOUT_HTML, make_soup(OTHER_LAYOUT_HTML))
+    assert (cache.learned, cache.hits) == (2, 3)
+    assert (plan.name_selector, plan.price_selector, plan.card_depth) == ("h3.car-name", "span.car-price", 2)
+
+
+def test_plan_matches_probing():
+    """計画を使った抽出は、最初のカードから段数を求める抽出と同じ結果"""
+    for backend in available_backends():
+        for html in (CARLIST_HTML, CARLIST_HTML_NO_PRICE, carlist_html(30)):
+            soup = make_soup(html, backend)
+            plan = learn_plan(soup)
+            assert _records(soup, plan) == _records(soup), backend
+
+        soup = make_soup(OTHER_LAYOUT_HTML, backend)
+        assert _records(soup, learn_plan(soup)) == [
+            ("プリウス Z", "199.8万円", "年式不明", False),
+            ("プリウス G", "185万円", "年式不明", False),
+        ], backend
+
+
+if __name__ == "__main__":
+    test_fingerprint_ignores_content()
+    test_learn_once_per_layout()
+    test_plan_matches_probing()
+    print("✅ セレクタ計画のテスト完了")
@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+"""
+目撃ログ（SightingLog）のテスト
+チェックごとのイベント追記、再起動時の再生、スナップショットへのまとめを確認する
+"""
+
+import json
+import tempfile
+from pathlib import Path
+from vehicle import Vehicle, load_vehicle_map
+from vehicle_store import import_legacy
+from sighting_log import SightingLog, SNAPSHOT_NAME, ARCHIVE_DIR, segment_name
+
+BACKUP = Path(__file__).parent / "vehicles_backup.json"
+
+
+def _vehicle(name, price):
+    return Vehicle(name, price=price, year=2019, source="toyota.jp", detected_at="2025-08-03T12:00:00")
+
+
+def _events(directory):
+    return [json.loads(line) for path in sorted(Path(directory).glob("*.jsonl"))
+            for line in path.read_text(encoding="utf-8").splitlines()]
+
+
+def test_events_and_replay():
+    """チェックごとに新着・見かけた・価格変更・掲載終了を追記し、再起動時に再生して同じ状態に戻る"""
+    with tempfile.TemporaryDirectory() as tmp:
+        store = SightingLog(tmp)
+        store["a"] = _vehicle("プリウス S 4WD", 1438000)
+        store["b"] = _vehicle("プリウス A", 1430000)
+        assert store.commit("2025-08-03T12:00:00", complete=True) == 2
+        assert store.commit() == 0  # 変更が無ければ追記しない
+
+        # 2回目: a は値下げ、b は見かけない（全ページを確認したので掲載終了）
+        store["a"] = _vehicle("プリウス S 4WD", 1398000)
+        assert store.commit("2025-08-04T09:00:00", complete=True) == 2
+        kinds = [event["e"] for event in _events(tmp)]
+        assert kinds == ["new", "new", "price_changed", "disappeared"]
+        assert store.active == {"a"}
+
+        # 3回目: 一部のページしか確認できなかったチェックでは掲載終了にしない
+        store.mark_seen("b")
+        store.commit("2025-08-05T09:00:00", complete=False)
+        store.commit("2025-08-06T09:00:00", complete=False)
+        assert store.active == {"a", "b"}
+        store.close()
+
+        # 再起動するとイベントを再生して同じ状態に戻る
+        reopened = SightingLog(tmp)
+        assert reopened["a"].price == 1398000
+        assert reopened.active == {"a", "b"}
+        assert reopened.first_seen["b"] == "2025-08-03T12:00:00"
+        assert reopened.last_seen["b"] == "2025-08-05T09:00:00"
+        assert [event["e"] for event in reopened.history("a")] == ["new", "price_changed"]
+        assert reopened.price_history("a") == [("2025-08-03T12:00:00", 1438000), ("2025-08-04T09:00:00", 1398000)]
+        reopened.close()
+
+
+def test_field_updates():
+    """価格以外の項目の変更は updated として全体を保存し、再起動後も変更後の値"""
+    with tempfile.TemporaryDirectory() as tmp:
+        store = SightingLog(tmp)
+        store["a"] = _vehicle("プリウス S 4WD", 1438000).copy(mileage=12000)
+        store.commit("2025-08-03T12:00:00")
+        store["a"] = store["a"].copy(mileage=12500, is_new=True)
+        store.commit("2025-08-04T09:00:00")
+        store["a"] = store["a"].copy(mileage=13000, price=1398000)
+        store.commit("2025-08-05T09:00:00")
+        assert [event["e"] for event in _events(tmp)] == ["new", "updated", "updated"]
+        store.close()
+
+        reopened = SightingLog(tmp)
+        assert (reopened["a"].mileage, reopened["a"].is_new, reopened["a"].price) == (13000, True, 1398000)
+        assert [price for _, price in reopened.price_history("a")] == [1438000, 1398000]
+        reopened.close()
+
+
+def test_torn_tail():
+    """書き込み途中で止まった末尾の行は読み飛ばし、次は新しいセグメントに追記"""
+    with tempfile.TemporaryDirectory() as tmp:
+        store = SightingLog(tmp)
+        store["a"] = _vehicle("プリウス S 4WD", 1438000)
+        store.close()
+        with open(Path(tmp) / segment_name(1), 'a', encoding='utf-8') as f:
+            f.write('{"t": "2025-08-04", "e": "se')
+
+        reopened = SightingLog(tmp)
+        assert len(reopened) == 1 and reopened.segment == 2
+        reopened.mark_seen("a")
+        reopened.close()
+        assert (Path(tmp) / segment_name(2)).exists()
+
+
+def test_compaction():
+    """一定数のイベントでスナップショットにまとめ、再起動時はそれ以降のセグメントだけを再生"""
+    with tempfile.TemporaryDirectory() as tmp:
+        store = SightingLog(tmp, compact_events=3)
+        for i in range(5):
+            store[f"v{i}"] = _vehicle(f"プリウス {i}", 1400000 + i)
+            store.commit(f"2025-08-0{i + 1}T12:00:00")
+        store.close()
+
+        snapshot = json.loads((Path(tmp) / SNAPSHOT_NAME).read_text(encoding="utf-8"))
+        assert snapshot["segment"] == 2 and len(snapshot["vehicles"]) == 3
+        assert (Path(tmp) / ARCHIVE_DIR / segment_name(1)).exists()
+        assert not (Path(tmp) / segment_name(1)).exists()
+
+        reopened = SightingLog(tmp)
+        assert len(reopened) == 5
+        assert reopened.events_since_snapshot == 2  # 再生したのは末尾のセグメントだけ
+        assert [event["id"] for event in reopened.history()] == [f"v{i}" for i in range(5)]
+        reopened.close()
+
+
+def test_import_legacy():
+    """vehicles_backup.json を新着イベントとして1回だけ取り込む"""
+    expected = load_vehicle_map(json.loads(BACKUP.read_text(encoding="utf-8")), source="toyota.jp")
+    with tempfile.TemporaryDirectory() as tmp:
+        store = SightingLog(tmp)
+        import_legacy(store, [BACKUP], source="toyota.jp", log=lambda message: None)
+        assert dict(store.items()) == expected
+        import_legacy(store, [BACKUP], source="toyota.jp", log=lambda message: None)
+        assert len(_events(tmp)) == len(expected)
+        assert store.legacy_count == len(expected)
+
+        # 以前の車両IDは新しい車両IDに付け替え、初めて見た日時と価格履歴を引き継ぐ
+        legacy_id = next(iter(expected))
+        store["toyota.jp:L1"] = expected[legacy_id].copy(detail_id="L1")
+        store.rekey(legacy_id, "toyota.jp:L1")
+        assert legacy_id not in store and len(store) == len(expected)
+        store.commit("2025-08-05T12:00:00")
+        assert [event["e"] for event in _events(tmp)[-2:]] == ["rekeyed", "updated"]
+        store.close()
+
+        reopened = SightingLog(tmp)
+        assert legacy_id not in reopened and reopened.legacy_count == len(expected) - 1
+        # 付け替え後は今回の掲載のレコード（車両ID付き）
+        assert reopened["toyota.jp:L1"] == expected[legacy_id].copy(detail_id="L1")
+        assert reopened.first_seen["toyota.jp:L1"] == expected[legacy_id].detected_at
+        assert len(reopened.price_history("toyota.jp:L1")) == 1
+        reopened.close()
+
+
+def test_disappeared_with_unchanged_pages():
+    """監視: 解析を省略したページの車両は見かけたものとし、別のページで消えた車両を掲載終了にする"""
+    import asyncio
+    from test_fingerprint import _monitor, _page
+    with tempfile.TemporaryDirectory() as tmp:
+        pages = {1: _page(("A1", "150万円"), ("B2", "140万円"), last_page=2),
+                 2: _page(("C3", "145万円"), ("D4", "155万円"), last_page=2)}
+        monitor = _monitor(tmp, pages)
+        monitor.known_vehicles.close()
+        monitor.known_vehicles = SightingLog(Path(tmp) / "sightings", background=False)
+        assert asyncio.run(monitor.check_for_new_vehicles()) == 4
+
+        pages[2] = _page(("C3", "145万円"), last_page=2)
+        assert asyncio.run(monitor.check_for_new_vehicles()) == 0
+        assert monitor.change_detector.hits == 1
+        disappeared = [event for event in _events(Path(tmp) / "sightings") if event["e"] == "disappeared"]
+        assert [event["ids"] for event in disappeared] == [["toyota.jp:D4"]]
+        assert monitor.known_vehicles.active == {"toyota.jp:A1", "toyota.jp:B2", "toyota.jp:C3"}
+        monitor.known_vehicles.close()
+
+
+if __name__ == "__main__":
+    test_events_and_replay()
+    test_field_updates()
+    test_torn_tail()
+    test_compaction()
+    test_import_legacy()
+    test_disappeared_with_unchanged_pages()
+    print("✅ 目撃ログのテスト完了")
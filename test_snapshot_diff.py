@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+検索結果の差分（SnapshotDiff）のテスト
+新着・掲載終了・項目ごとの変更のイベント、一部のページしか見ていないチェック、
+解析を省略したページの引き継ぎ、保存・読み込みを確認する
+"""
+
+import json
+import tempfile
+from pathlib import Path
+from vehicle import Vehicle, listing_key
+from snapshot_diff import SnapshotDiff, EVENT_NEW, EVENT_REMOVED, EVENT_CHANGED
+
+
+def _listing(detail_id, price, mileage=12000):
+    vehicle = Vehicle(f"プリウス {detail_id}", price=price, year=2019, mileage=mileage,
+                      detail_id=detail_id, source="toyota.jp")
+    return listing_key(vehicle), vehicle
+
+
+def test_events():
+    """前回と比べて新着・内容の変更・掲載終了を出し、変わらない掲載は出さない"""
+    diff = SnapshotDiff()
+    first = [_listing("A", 1438000), _listing("B", 1430000), _listing("C", 1500000)]
+    events = diff.update(first)
+    assert [event.kind for event in events] == [EVENT_NEW] * 3
+    assert diff.finish(complete=True) == []
+
+    diff.start()
+    events = diff.update([_listing("A", 1398000, mileage=12500), _listing("B", 1430000)])
+    events += diff.update([_listing("D", 1550000), _listing("A", 1398000, mileage=12500)])  # 次のページで重複
+    assert [(event.kind, event.key) for event in events] == [(EVENT_CHANGED, "toyota.jp:A"),
+                                                            (EVENT_NEW, "toyota.jp:D")]
+    changed = events[0]
+    assert changed.fields == ("price", "mileage")
+    assert changed.changes["price"] == (1438000, 1398000)
+    assert changed.previous.price == 1438000 and changed.vehicle.price == 1398000
+    assert changed.describe() == "価格 143.8万円 → 139.8万円、走行距離 12,000km → 12,500km"
+
+    removed = diff.finish(complete=True)
+    assert [(event.kind, event.key) for event in removed] == [(EVENT_REMOVED, "toyota.jp:C")]
+    assert removed[0].previous.name == "プリウス C" and removed[0].vehicle is None
+
+
+def test_incomplete_check():
+    """全ページを確認できなかったチェックでは掲載終了を出さず、見なかった掲載は前回のまま残す"""
+    diff = SnapshotDiff()
+    diff.update([_listing("A", 1438000), _listing("B", 1430000)])
+    diff.finish(complete=True)
+
+    diff.start()
+    diff.update([_listing("A", 1398000)])
+    assert diff.finish(complete=False) == []
+    assert set(diff.previous) == {"toyota.jp:A", "toyota.jp:B"}
+
+    # 次のチェックでは値下げ後の価格と比べる
+    diff.start()
+    assert diff.update([_listing("A", 1398000), _listing("B", 1430000)]) == []
+    assert diff.finish(complete=True) == []
+
+
+def test_keep_page():
+    """前回と同じ内容のページの掲載は前回の値のまま今回も見たものとし、記録の無いページは None"""
+    diff = SnapshotDiff()
+    diff.update([_listing("A", 1438000), _listing("B", 1430000)], page="p1")
+    diff.update([_listing("C", 1500000)], page="p2")
+    diff.finish(complete=True)
+    assert diff.pages == {"p1": ["toyota.jp:A", "toyota.jp:B"], "p2": ["toyota.jp:C"]}
+
+    diff.start()
+    assert diff.keep_page("p1") == ["toyota.jp:A", "toyota.jp:B"]
+    assert diff.keep_page("p3") is None
+    assert diff.update([], page="p2") == []
+    removed = diff.finish(complete=True)
+    assert [event.key for event in removed] == ["toyota.jp:C"]
+    assert set(diff.previous) == {"toyota.jp:A", "toyota.jp:B"}
+    assert diff.pages == {"p1": ["toyota.jp:A", "toyota.jp:B"], "p2": []}
+
+
+def test_save_and_load():
+    """保存した前回の掲載を読み込んで比べる。変わっていなければ書き込まない。比べる項目を変えた場合は使わない"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "listing_snapshot.json"
+        diff = SnapshotDiff(path)
+        diff.update([_listing("A", 1438000)], page="p1")
+        diff.finish(complete=True)
+        diff.save()
+        saved = json.loads(path.read_text(encoding="utf-8"))
+        assert list(saved["listings"]) == ["toyota.jp:A"]
+        assert saved["pages"] == {"p1": ["toyota.jp:A"]}
+        assert SnapshotDiff(path).keep_page("p1") == ["toyota.jp:A"]
+
+        reloaded = SnapshotDiff(path)
+        assert reloaded.update([_listing("A", 1438000)]) == []
+        assert [event.kind for event in reloaded.update([_listing("B", 1430000)])] == [EVENT_NEW]
+
+        # 前回と同じチェック（解析を省略したページのみ）は書き込まず、掲載終了があれば書き込む
+        unchanged = SnapshotDiff(path)
+        unchanged.keep_page("p1")
+        assert unchanged.finish(complete=True) == [] and not unchanged.changed
+        unchanged.update([], page="p1")
+        assert len(unchanged.finish(complete=True)) == 1 and unchanged.changed
+        path.unlink()
+        unchanged.save()
+        assert json.loads(path.read_text(encoding="utf-8"))["pages"] == {"p1": []}
+
+        assert SnapshotDiff(path, fields=("name", "price")).previous == {}
+        reloaded.forget()
+        assert reloaded.previous == {} and reloaded.pages == {}
+
+
+if __name__ == "__main__":
+    test_events()
+    test_incomplete_check()
+    test_keep_page()
+    test_save_and_load()
+    print("✅ 検索結果の差分のテスト完了")
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+車両レコード（Vehicle）のテスト
+表示用の文字列から数値への変換と、保存・読み込みで内容が変わらないことを確認する
+"""
+
+import json
+from pathlib import Path
+from vehicle import (Vehicle, YEN, parse_price_yen, parse_model_year, parse_mileage_km, format_price_man,
+                     detail_id_from_url, listing_key, load_vehicle_map, dump_vehicle_map)
+from toyota_used_car_search import ToyotaUsedCarSearch, to_vehicle
+
+FIXTURE = Path(__file__).parent / "debug_response.html"
+BACKUP = Path(__file__).parent / "vehicles_backup.json"
+
+
+def test_parse_helpers():
+    """価格（円）・年式・走行距離（km）を整数に"""
+    assert parse_price_yen("143.8万円") == 1438000
+    assert parse_price_yen("145.0万円") == 1450000
+    assert parse_price_yen("168.9") == 1689000          # gazooの price_decimal 結合後（万円単位）
+    assert parse_price_yen("1,438,000円") == 1438000
+    assert parse_price_yen("価格不明") is None
+
+    # 単位の無い値は型に関わらず unit で換算（既定は万円）
+    assert parse_price_yen(143.8) == 1438000
+    assert parse_price_yen(145) == 1450000
+    assert parse_price_yen(1438000, unit=YEN) == 1438000
+    assert parse_price_yen(1438000.0, unit=YEN) == 1438000
+    assert parse_price_yen("1438000", unit=YEN) == 1438000
+    assert parse_price_yen("143.8万円", unit=YEN) == 1438000
+
+    assert parse_model_year("2019年(R1年)") == 2019
+    assert parse_model_year("2023") == 2023
+    assert parse_model_year("年式不明") is None
+
+    assert parse_mileage_km("12,000") == 12000
+    assert parse_mileage_km("3.2万km") == 32000
+    assert parse_mileage_km("2023年 | 102,000km | 愛知県") == 102000
+    assert parse_mileage_km("走行距離不明") is None
+
+    assert format_price_man(1438000) == "143.8万円"
+    assert format_price_man(1450000) == "145万円"
+    assert format_price_man(None) == "価格不明"
+
+
+def test_gazoo_vehicles():
+    """gazoo検索結果の表示用レコードから Vehicle に変換"""
+    html = FIXTURE.read_text(encoding="utf-8")
+    cars = ToyotaUsedCarSearch(parse_mode="region")._parse_search_results(html)
+    vehicles = [to_vehicle(car) for car in cars]
+
+    yaris = vehicles[9]
+    assert (yaris.name, yaris.price, yaris.year, yaris.mileage) == ("ヤリス X", 1689000, 2023, 2000)
+    assert yaris.detail_id == "0360117B68458"
+    assert yaris.source == "gazoo"
+    # 10万km以上も桁を落とさない
+    assert max(v.mileage for v in vehicles if v.mileage) >= 100000
+    assert all(v.price for v in vehicles)
+
+
+def test_round_trip():
+    """旧形式（表示用）の保存データを読み込み、数値のまま保存・復元できる"""
+    legacy = json.loads(BACKUP.read_text(encoding="utf-8"))
+    vehicles = load_vehicle_map(legacy, source="toyota.jp")
+    first_id = next(iter(legacy))
+    assert vehicles[first_id].price == parse_price_yen(legacy[first_id]["price"])
+    assert vehicles[first_id].url == legacy[first_id]["search_url"]
+
+    saved = json.loads(json.dumps(dump_vehicle_map(vehicles), ensure_ascii=False))
+    assert load_vehicle_map(saved) == vehicles
+    assert isinstance(saved[first_id]["price"], int)
+    # 保存した円単位の数値は万円とみなさない
+    assert Vehicle.from_dict({"name": "プリウス", "price": 1438000}).price == 1438000
+    assert Vehicle.from_dict({"name": "プリウス", "price": "143.8"}).price == 1438000
+
+
+def test_slots():
+    """属性の辞書を持たず、ハッシュ不可"""
+    vehicle = Vehicle("プリウス S", price=1438000)
+    assert not hasattr(vehicle, "__dict__")
+    assert vehicle.price_text == "143.8万円"
+    # 書き換えられるためハッシュ不可（__eq__ と食い違うハッシュを作らない）
+    try:
+        hash(vehicle)
+    except TypeError:
+        pass
+    else:
+        raise AssertionError("Vehicle はハッシュ不可")
+
+
+def test_listing_key():
+    """掲載元の車両IDがあれば価格が変わっても同じキー。無ければ車名・年式等から作る"""
+    assert detail_id_from_url("https://toyota.jp/ucar/detail/0360117B68458") == "0360117B68458"
+    assert detail_id_from_url("https://gazoo.com/U-Car/detail?Id=0360117B68458") == "0360117B68458"
+    search_url = "https://toyota.jp/ucar/carlist/?Tval=1&chk-detail-tvalue-sp-check=1&Cn=01_プリウス"
+    assert detail_id_from_url(search_url) is None
+
+    record = {"name": "プリウス S", "price": "143.8万円", "url": search_url,
+              "detail_url": "https://toyota.jp/ucar/detail/A1"}
+    before = Vehicle.from_dict(record, source="toyota.jp")
+    after = Vehicle.from_dict(dict(record, price="139.8万円"), source="toyota.jp")
+    assert before.detail_id == "A1"
+    assert listing_key(before) == listing_key(after) == "toyota.jp:A1"
+
+    # 車両IDが無い場合: 走行距離が分かれば価格は含めない
+    gazoo_like = Vehicle("プリウス S", price=1438000, year=2019, mileage=12000)
+    assert listing_key(gazoo_like) == listing_key(gazoo_like.copy(price=1398000))
+    assert listing_key(gazoo_like) != listing_key(gazoo_like.copy(mileage=30000))
+    # 車名・年式しか分からない場合は価格で区別する
+    bare = Vehicle("プリウス S", price=1438000, year=2019)
+    assert listing_key(bare) != listing_key(bare.copy(price=1398000))
+
+
+if __name__ == "__main__":
+    test_parse_helpers()
+    test_gazoo_vehicles()
+    test_round_trip()
+    test_slots()
+    test_listing_key()
+    print("✅ 車両レコードのテスト完了")
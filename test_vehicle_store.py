@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""
+車両ストア（SQLite）のテスト
+vehicles_backup.json の取り込み、チェックごとのまとめ書き込み、保存内容が Vehicle と一致することを確認する
+"""
+
+import json
+import tempfile
+from pathlib import Path
+from vehicle import Vehicle, load_vehicle_map
+from vehicle_store import VehicleStore, open_store, model_of
+from seen_filter import open_seen_filter
+from snapshot_diff import SnapshotDiff
+
+BACKUP = Path(__file__).parent / "vehicles_backup.json"
+
+
+def test_import_backup():
+    """vehicles_backup.json を取り込むと、JSONから作った Vehicle と同じ内容になる"""
+    expected = load_vehicle_map(json.loads(BACKUP.read_text(encoding="utf-8")), source="toyota.jp")
+    with tempfile.TemporaryDirectory() as tmp:
+        logs = []
+        store = open_store(Path(tmp) / "vehicles.db", [BACKUP, Path(tmp) / "missing.json"],
+                           source="toyota.jp", log=logs.append)
+        assert len(store) == len(expected)
+        assert dict(store.items()) == expected
+        assert len(logs) == 1
+
+        # 2回目以降は取り込まない（空のストアのときだけ）
+        store.close()
+        store = open_store(Path(tmp) / "vehicles.db", [BACKUP], source="toyota.jp", log=logs.append)
+        assert len(store) == len(expected) and len(logs) == 1
+
+        # 同じファイルを手動で取り込んでも重複しない
+        assert store.import_json(BACKUP) == 0
+        store.close()
+
+
+def test_batched_upserts():
+    """追加は commit() まで書き込まず、1回でまとめて書く。見かけただけの車両は書き込まない"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "vehicles.db"
+        store = VehicleStore(path)
+        first = Vehicle("プリウス S 4WD", price=1438000, year=2019, source="toyota.jp",
+                        detected_at="2025-08-03T12:00:00")
+        store["a"] = first
+        store["b"] = Vehicle("プリウス A", price=1430000)
+        assert "a" in store and len(store) == 2
+
+        # 別の接続からはまだ見えない
+        other = VehicleStore(path)
+        assert "a" not in other and len(other) == 0
+
+        assert store.commit("2025-08-03T12:00:00") == 2
+        assert "a" in other and other["a"] == first
+        assert store.commit() == 0  # 変更が無ければ書き込まない
+
+        store.mark_seen("a")
+        assert store.commit("2025-08-04T09:00:00") == 0
+        # track_last_seen のときだけ見かけた車両の last_seen を更新
+        tracking = VehicleStore(path, track_last_seen=True)
+        tracking.mark_seen("a")
+        assert tracking.commit("2025-08-04T09:00:00") == 1
+        tracking.close()
+        first_seen, last_seen, model = store.conn.execute(
+            "SELECT first_seen, last_seen, model FROM vehicles WHERE vehicle_id = 'a'").fetchone()
+        assert (first_seen, last_seen, model) == ("2025-08-03T12:00:00", "2025-08-04T09:00:00", "プリウス")
+        assert store.conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+
+        # 内容が変わった車両は上書き（first_seen は変えない）
+        store["a"] = Vehicle("プリウス S 4WD", price=1398000, year=2019, source="toyota.jp",
+                             detected_at="2025-08-03T12:00:00")
+        assert len(store) == 2  # 既にある車両の更新は台数に数えない
+        store.commit("2025-08-05T09:00:00")
+        assert len(store) == 2
+        assert other["a"].price == 1398000
+        assert other.conn.execute("SELECT first_seen FROM vehicles WHERE vehicle_id = 'a'").fetchone()[0] \
+            == "2025-08-03T12:00:00"
+        assert other.get("missing") is None
+        other.close()
+        store.close()
+
+
+def test_export_roundtrip():
+    """書き出したJSONは以前の vehicles.json と同じ形式で読み込める"""
+    with tempfile.TemporaryDirectory() as tmp:
+        store = open_store(Path(tmp) / "vehicles.db", [BACKUP], source="toyota.jp", log=lambda message: None)
+        store.export_json(Path(tmp) / "vehicles.json")
+        exported = json.loads((Path(tmp) / "vehicles.json").read_text(encoding="utf-8"))
+        assert load_vehicle_map(exported) == dict(store.items())
+        store.close()
+
+
+def test_price_history():
+    """値下げは同じ車両の更新になり、価格履歴に1行ずつ追加される"""
+    with tempfile.TemporaryDirectory() as tmp:
+        store = VehicleStore(Path(tmp) / "vehicles.db")
+        vehicle = Vehicle("プリウス S 4WD", price=1438000, detail_id="A1", source="toyota.jp")
+        store["toyota.jp:A1"] = vehicle
+        store.commit("2025-08-03T12:00:00")
+        store["toyota.jp:A1"] = vehicle.copy(price=1398000)
+        store.commit("2025-08-10T12:00:00")
+        store["toyota.jp:A1"] = vehicle.copy(price=1398000)  # 同じ価格なら追加しない
+        store.commit("2025-08-11T12:00:00")
+        assert len(store) == 1
+        assert store.price_history("toyota.jp:A1") == [("2025-08-03T12:00:00", 1438000),
+                                                       ("2025-08-10T12:00:00", 1398000)]
+        store.close()
+
+
+def test_monitor_price_change():
+    """監視: 車両IDが同じなら値下げを新着として通知しない。以前の車両IDで保存済みの車両も通知せず付け替える"""
+    from prius_monitor import PriusMonitor
+    with tempfile.TemporaryDirectory() as tmp:
+        monitor = PriusMonitor.__new__(PriusMonitor)
+        monitor.log = lambda message: None
+        monitor.known_vehicles = open_store(Path(tmp) / "vehicles.db", [BACKUP], source="toyota.jp",
+                                            log=monitor.log)
+        monitor.seen_filter = open_seen_filter(Path(tmp) / "seen_filter", monitor.known_vehicles,
+                                               log=monitor.log)
+        monitor.listing_diff = SnapshotDiff()
+        listed = {"name": "プリウス Z", "price": "150万円", "year": "2020年",
+                  "detail_url": "https://toyota.jp/ucar/detail/Z1"}
+        assert monitor.find_new_vehicles([listed]) == [listed]
+        monitor.known_vehicles.commit("2025-08-03T12:00:00")
+        assert monitor.find_removed_vehicles(complete=True) == []
+        assert monitor.find_new_vehicles([dict(listed, price="145万円")]) == []
+        monitor.known_vehicles.commit("2025-08-04T12:00:00")
+        monitor.find_removed_vehicles(complete=False)
+        assert [price for _, price in monitor.known_vehicles.price_history("toyota.jp:Z1")] == [1500000, 1450000]
+
+        # vehicles_backup.json の車両（車名＋価格のID）は通知せず、新しい車両IDに付け替える
+        backup = json.loads(BACKUP.read_text(encoding="utf-8"))
+        legacy_id, legacy = next(iter(backup.items()))
+        store = monitor.known_vehicles
+        assert store.legacy_count == len(backup)
+        relisted = {"name": legacy["name"], "price": legacy["price"],
+                    "detail_url": "https://toyota.jp/ucar/detail/L1"}
+        assert monitor.find_new_vehicles([relisted]) == []
+        assert legacy_id not in store and store.legacy_count == len(backup) - 1
+        store.commit("2025-08-05T12:00:00")
+        assert len(store) == len(backup) + 1
+        assert store.conn.execute("SELECT first_seen FROM vehicles WHERE vehicle_id = 'toyota.jp:L1'"
+                                  ).fetchone()[0] == legacy["detected_at"]
+        assert store.price_history("toyota.jp:L1")[0] == (legacy["detected_at"], 1450000)
+        assert VehicleStore(store.path).legacy_count == len(backup) - 1
+
+        # 以前の車両IDが残っていなければ照合しない
+        store.legacy_count = 0
+        monitor.generate_vehicle_id = None
+        assert monitor.find_new_vehicles([dict(relisted, detail_url="https://toyota.jp/ucar/detail/L2")]) != []
+        monitor.seen_filter.close()
+        monitor.known_vehicles.close()
+
+
+def test_model_of():
+    assert model_of("プリウス A ツーリング 4WD") == "プリウス"
+    assert model_of("") is None
+
+
+if __name__ == "__main__":
+    test_import_backup()
+    test_batched_upserts()
+    test_export_roundtrip()
+    test_price_history()
+    test_monitor_price_change()
+    test_model_of()
+    print("✅ 車両ストアのテスト完了")
@@ -1,6 +1,7 @@
 import asyncio
 from playwright.async_api import async_playwright
 from bs4 import BeautifulSoup
+from page_wait import goto_listings, wait_for_listings
 
 async def test_with_different_locations():
     async with async_playwright() as pw:
@@ -26,8 +27,7 @@ async def test_with_different_locations():
             
             try:
                 # プリウス検索ページにアクセス
-                await page.goto("https://toyota.jp/ucar/carlist/?car_series=prius")
-                await page.wait_for_timeout(5000)  # 位置情報取得待ち
+                await goto_listings(page, "https://toyota.jp/ucar/carlist/?car_series=prius")
                 
                 html = await page.content()
                 soup = BeautifulSoup(html, "html.parser")
@@ -95,8 +95,7 @@ async def check_pagination(pw):
     page = await browser.new_page()
     
     try:
-        await page.goto("https://toyota.jp/ucar/carlist/?car_series=prius")
-        await page.wait_for_timeout(3000)
+        await goto_listings(page, "https://toyota.jp/ucar/carlist/?car_series=prius")
         
         # ページネーションボタンを探す
         next_buttons = await page.query_selector_all("a:has-text('次へ'), a:has-text('>')")
@@ -109,7 +108,7 @@ async def check_pagination(pw):
             print("*** ページネーション発見 - 2ページ目以降を確認 ***")
             if next_buttons:
                 await next_buttons[0].click()
-                await page.wait_for_timeout(3000)
+                await wait_for_listings(page)
                 
                 html = await page.content()
                 soup = BeautifulSoup(html, "html.parser")
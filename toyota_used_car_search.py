@@ -3,23 +3,93 @@
 トヨタ認定中古車の検索を自動化するスクリプト
 """
 
+import asyncio
+import codecs
 import requests
 import json
 from urllib.parse import urlencode
-from typing import Dict, List, Optional
-import time
+from typing import AsyncIterator, Dict, Iterator, List, Optional
 import re
-from bs4 import BeautifulSoup
+from async_http_client import AsyncHttpClient, HttpClientError, STREAM_CHUNK_SIZE, stream_encoding
+from rate_limiter import DEFAULT_RATE_LIMITER
+from html_parser_backend import make_soup
+from result_stream import ResultCardStream
+from vehicle import Vehicle
+from field_extractor import card_text, extract_fields
+
+# 解析モード（region: 検索結果の一覧部分だけ / full: ページ全体）
+PARSE_MODES = ("region", "full")
+
+# 検索結果の一覧部分（おすすめ車両・メインの検索結果）
+RESULT_REGION_IDS = ("slick_recommended", "car-list-wrap")
+RESULT_CARD_SELECTOR = "#slick_recommended > li, #car-list-wrap > dl"
+DETAIL_LINK_SELECTOR = "a[href*='/U-Car/detail?Id=']"
+DETAIL_ID_PATTERN = re.compile(r'/U-Car/detail\?Id=(\w+)')
+# 一覧部分の終わり（これ以降はモーダル・フッター）
+RESULT_REGION_END = '</section>'
+
+
+def to_vehicle(car_info: Dict) -> Vehicle:
+    """_parse_search_results の車両情報（表示用の文字列）を Vehicle に変換"""
+    vehicle = Vehicle.from_dict(car_info, source="gazoo")
+    id_match = DETAIL_ID_PATTERN.search(car_info.get('url', ''))
+    if id_match:
+        vehicle.detail_id = id_match.group(1)
+    return vehicle
 
 
 class ToyotaUsedCarSearch:
-    def __init__(self):
+    def __init__(self,
+                 max_connections: int = 10,
+                 http2: bool = False,
+                 rate_limiter=DEFAULT_RATE_LIMITER,
+                 html_parser: Optional[str] = None,
+                 parse_mode: str = "region"):
+        """
+        Args:
+            max_connections: 接続プールの最大接続数（同時検索数の上限）
+            http2: HTTP/2を使う（httpxとh2がインストールされている場合のみ）
+            rate_limiter: ホストごとのレート制限（既定はプロセス全体で毎秒1リクエスト）
+            html_parser: HTML解析バックエンド（省略時は環境変数 HTML_PARSER、html_parser_backend参照）
+            parse_mode: region は検索結果の一覧部分だけを解析、full はページ全体から探す
+        """
+        if parse_mode not in PARSE_MODES:
+            raise ValueError(f"未対応の解析モード: {parse_mode}（{', '.join(PARSE_MODES)}）")
         self.base_url = "https://gazoo.com/U-Car/"
         self.search_url = "https://gazoo.com/U-Car/search_result"
         self.session = requests.Session()
         self.session.headers.update({
             'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
         })
+        self.max_connections = max_connections
+        self.http2 = http2
+        self.rate_limiter = rate_limiter
+        self.html_parser = html_parser
+        self.parse_mode = parse_mode
+        self._client = None
+        self._client_depth = 0  # async with の入れ子の深さ（最も外側を抜けたときだけ閉じる）
+    
+    def _new_client(self) -> AsyncHttpClient:
+        return AsyncHttpClient(
+            headers=dict(self.session.headers),
+            max_connections=self.max_connections,
+            http2=self.http2,
+            rate_limiter=self.rate_limiter,
+            session=self.session
+        )
+    
+    async def __aenter__(self):
+        """複数の検索で接続を使い回す場合は async with で開く（開いている間に入れ子で開いても同じ接続を使う）"""
+        if self._client is None:
+            self._client = await self._new_client().open()
+        self._client_depth += 1
+        return self
+    
+    async def __aexit__(self, exc_type, exc, tb):
+        self._client_depth -= 1
+        if self._client_depth == 0:
+            await self._client.close()
+            self._client = None
     
     def search_cars(self, 
                    price_min: Optional[int] = None,
@@ -30,21 +100,46 @@ class ToyotaUsedCarSearch:
                    year_min: Optional[int] = None,
                    year_max: Optional[int] = None) -> List[Dict]:
         """
-        中古車を検索する
+        中古車を検索する（search_cars_async の同期版）
+        
+        requests のセッションで取得するため、イベントループの中（非同期の監視等）からも呼べる。
+        同時に複数の条件を検索する場合は search_many_async を使う
+        """
+        params = self._search_params(price_max=price_max, body_type=body_type, certified_only=certified_only)
+        if self.rate_limiter is not None:
+            self.rate_limiter.bucket(self.search_url).acquire_sync()
+        
+        try:
+            print(f"検索URL: {self.search_url}")
+            print(f"パラメータ: {params}")
+            response = self.session.get(self.search_url, params=params, timeout=30)
+            response.raise_for_status()
+            print(f"レスポンスステータス: {response.status_code}")
+            return self._parse_search_results(response.text)
+        except requests.exceptions.RequestException as e:
+            print(f"検索エラー: {e}")
+            return []
+    
+    async def search_many_async(self, conditions: List[Dict]) -> List[List[Dict]]:
+        """
+        複数条件を同時に検索する（接続プールとレート制限を共有）
         
         Args:
-            price_min: 最低価格（万円）
-            price_max: 最高価格（万円）
-            body_type: ボディタイプ（'compact', 'sedan', 'suv', 'minivan' など）
-            certified_only: トヨタ認定中古車のみ
-            mileage_max: 最大走行距離（km）
-            year_min: 最低年式
-            year_max: 最高年式
+            conditions: search_cars_async のキーワード引数のリスト
         
         Returns:
-            検索結果のリスト
+            条件と同じ順序の検索結果リスト
+        """
+        async with self:
+            return await asyncio.gather(*(self.search_cars_async(**condition) for condition in conditions))
+    
+    def _search_params(self,
+                       price_max: Optional[int] = None,
+                       body_type: Optional[str] = None,
+                       certified_only: bool = True) -> Dict:
+        """
+        検索条件をURLパラメータに変換
         """
-        
         params = {}
         
         # 価格条件（最高価格のみ対応）
@@ -66,170 +161,341 @@ class ToyotaUsedCarSearch:
             # 認定中古車フィルタのパラメータを調査中
             pass
         
+        return params
+    
+    async def search_cars_async(self, 
+                   price_min: Optional[int] = None,
+                   price_max: Optional[int] = None,
+                   body_type: Optional[str] = None,
+                   certified_only: bool = True,
+                   mileage_max: Optional[int] = None,
+                   year_min: Optional[int] = None,
+                   year_max: Optional[int] = None) -> List[Dict]:
+        """
+        中古車を検索する
+        
+        Args:
+            price_min: 最低価格（万円）
+            price_max: 最高価格（万円）
+            body_type: ボディタイプ（'compact', 'sedan', 'suv', 'minivan' など）
+            certified_only: トヨタ認定中古車のみ
+            mileage_max: 最大走行距離（km）
+            year_min: 最低年式
+            year_max: 最高年式
+        
+        Returns:
+            検索結果のリスト
+        """
+        
+        params = self._search_params(price_max=price_max, body_type=body_type, certified_only=certified_only)
+        
         try:
             print(f"検索URL: {self.search_url}")
             print(f"パラメータ: {params}")
             
-            response = self.session.get(self.search_url, params=params, timeout=30)
-            response.raise_for_status()
+            # リクエスト間隔はレート制限（トークンバケット）で調整
+            if self._client is not None:
+                response = await self._client.get(self.search_url, params=params)
+            else:
+                async with self._new_client() as client:
+                    response = await client.get(self.search_url, params=params)
             
             print(f"レスポンスステータス: {response.status_code}")
             
             # HTMLパースして結果を抽出
-            results = self._parse_search_results(response.text)
+            return self._parse_search_results(response.text)
             
-            # リクエスト間隔を空ける
-            time.sleep(1)
-            
-            return results
-            
-        except requests.exceptions.RequestException as e:
+        except HttpClientError as e:
             print(f"検索エラー: {e}")
             return []
     
+    def iter_search_cars(self, **criteria) -> Iterator[Dict]:
+        """
+        中古車を検索し、受信しながら解析した車両を1台ずつ返す（同期版）
+        
+        Args:
+            criteria: search_cars と同じ検索条件
+        """
+        params = self._search_params(
+            price_max=criteria.get('price_max'),
+            body_type=criteria.get('body_type'),
+            certified_only=criteria.get('certified_only', True)
+        )
+        if self.rate_limiter is not None:
+            self.rate_limiter.bucket(self.search_url).acquire_sync()
+        
+        try:
+            with self.session.get(self.search_url, params=params, timeout=30, stream=True) as response:
+                response.raise_for_status()
+                decoder = codecs.getincrementaldecoder(stream_encoding(response.encoding))(errors='replace')
+                stream = ResultCardStream()
+                seen_ids = set()
+                for chunk in response.iter_content(STREAM_CHUNK_SIZE):
+                    yield from self._cars_from_cards(stream.push(decoder.decode(chunk)), seen_ids)
+                stream.feed(decoder.decode(b'', final=True))
+                yield from self._cars_from_cards(stream.finish(), seen_ids)
+        except requests.exceptions.RequestException as e:
+            print(f"検索エラー: {e}")
+    
+    async def aiter_search_cars(self, **criteria) -> AsyncIterator[Dict]:
+        """
+        中古車を検索し、受信しながら解析した車両を1台ずつ返す
+        
+        Args:
+            criteria: search_cars_async と同じ検索条件
+        """
+        params = self._search_params(
+            price_max=criteria.get('price_max'),
+            body_type=criteria.get('body_type'),
+            certified_only=criteria.get('certified_only', True)
+        )
+        stream = ResultCardStream()
+        seen_ids = set()
+        
+        try:
+            if self._client is not None:
+                async for text in self._client.stream_text(self.search_url, params=params):
+                    for car_info in self._cars_from_cards(stream.push(text), seen_ids):
+                        yield car_info
+            else:
+                async with self._new_client() as client:
+                    async for text in client.stream_text(self.search_url, params=params):
+                        for car_info in self._cars_from_cards(stream.push(text), seen_ids):
+                            yield car_info
+            for car_info in self._cars_from_cards(stream.finish(), seen_ids):
+                yield car_info
+        except HttpClientError as e:
+            print(f"検索エラー: {e}")
+    
+    def _cars_from_cards(self, card_htmls: List[str], seen_ids: set) -> Iterator[Dict]:
+        for card_html in card_htmls:
+            car_info = self._parse_card_html(card_html, seen_ids)
+            if car_info:
+                yield car_info
+    
     def _parse_search_results(self, html_content: str) -> List[Dict]:
         """
         検索結果のHTMLをパースして車両情報を抽出
         """
         try:
-            soup = BeautifulSoup(html_content, 'html.parser')
-            cars = []
+            if self.parse_mode == "region":
+                cars = self._parse_result_region(html_content)
+            else:
+                cars = self._parse_full_document(html_content)
             
-            # HTMLの構造に基づいて直接車両情報を抽出
+            print(f"抽出された車両数: {len(cars)}")
+            return cars
             
-            # 方法1: おすすめ車両セクション（上部の横スクロール）
-            recommended_cars = soup.find_all('li')
-            for li in recommended_cars:
-                # 車両詳細リンクがあるかチェック
-                detail_link = li.find('a', href=lambda x: x and '/U-Car/detail?Id=' in x)
-                if not detail_link:
-                    continue
+        except Exception as e:
+            print(f"HTMLパースエラー: {e}")
+            return []
+    
+    def _parse_full_document(self, html_content: str) -> List[Dict]:
+        """
+        ページ全体を解析し、全てのliとdtから車両を探す
+        """
+        soup = make_soup(html_content, self.html_parser)
+        cars = []
+        
+        # HTMLの構造に基づいて直接車両情報を抽出
+        
+        # 方法1: おすすめ車両セクション（上部の横スクロール）
+        recommended_cars = soup.select('li')
+        for li in recommended_cars:
+            # 車両詳細リンクがあるかチェック
+            detail_link = li.select_one(DETAIL_LINK_SELECTOR)
+            if not detail_link:
+                continue
+            
+            try:
+                car_info = self._parse_recommended_card(li, detail_link)
                 
-                try:
-                    car_info = {}
-                    car_info['url'] = 'https://gazoo.com' + detail_link['href']
-                    
-                    # 車両名（dt class="carname"内のテキスト）
-                    carname_dt = li.find('dt', class_='carname')
-                    if carname_dt:
-                        carname_link = carname_dt.find('a')
-                        if carname_link:
-                            # 「トヨタ」を除去して車名のみ取得
-                            name_parts = carname_link.get_text().strip().split()
-                            if len(name_parts) > 1 and name_parts[0] == 'トヨタ':
-                                car_info['name'] = ' '.join(name_parts[1:])
-                            else:
-                                car_info['name'] = carname_link.get_text().strip()
+                # 基本情報が取得できた場合のみ追加
+                if 'name' in car_info and 'price' in car_info:
+                    cars.append(car_info)
                     
-                    # 価格（dl class="totalprice"内）
-                    totalprice_dl = li.find('dl', class_='totalprice')
-                    if totalprice_dl:
-                        price_dd = totalprice_dl.find('dd')
-                        if price_dd:
-                            # <span class="value">数値<span class="price_decimal">.小数</span></span>万円
-                            value_span = price_dd.find('span', class_='value')
-                            if value_span:
-                                # まず小数点部分を取得
-                                decimal_span = value_span.find('span', class_='price_decimal')
-                                if decimal_span:
-                                    # 小数点部分のテキストを取得
-                                    decimal_text = decimal_span.get_text().strip()
-                                    # 小数点部分を一時的に削除してメイン数値を取得
-                                    temp_span = value_span.get_text()
-                                    main_number = temp_span.replace(decimal_text, '').strip()
-                                    # 結合
-                                    car_info['price'] = main_number + decimal_text
-                                else:
-                                    car_info['price'] = value_span.get_text().strip()
-                    
-                    # 基本情報が取得できた場合のみ追加
-                    if 'name' in car_info and 'price' in car_info:
-                        cars.append(car_info)
-                        
-                except Exception as e:
-                    continue
-            
-            # 方法2: メインの検索結果リスト
-            # dt要素で車両情報を含むものを探す
-            main_results = soup.find_all('dt', class_=lambda x: x is None or 'carname' not in str(x))
+            except Exception as e:
+                continue
+        
+        # 方法2: メインの検索結果リスト
+        # dt要素で車両情報を含むものを探す
+        main_results = soup.select('dt:not(.carname)')
+        
+        for dt in main_results:
+            # wrap_linkクラスのaタグを持つdtを探す
+            wrap_link = dt.select_one('a.wrap_link')
+            if not wrap_link or '/U-Car/detail?Id=' not in wrap_link.get('href', ''):
+                continue
             
-            for dt in main_results:
-                # wrap_linkクラスのaタグを持つdtを探す
-                wrap_link = dt.find('a', class_='wrap_link')
-                if not wrap_link or '/U-Car/detail?Id=' not in wrap_link.get('href', ''):
+            try:
+                # 同じdd要素内の情報を取得
+                parent_dd = dt.find_next_sibling('dd')
+                if not parent_dd:
                     continue
                 
-                try:
-                    car_info = {}
-                    car_info['url'] = 'https://gazoo.com' + wrap_link['href']
-                    
-                    # 同じdd要素内の情報を取得
-                    parent_dd = dt.find_next_sibling('dd')
-                    if not parent_dd:
-                        continue
-                    
-                    # 車両名（imgのalt属性から）
-                    img_elem = parent_dd.find('img')
-                    if img_elem and img_elem.get('alt'):
-                        alt_text = img_elem['alt'].strip()
-                        # "トヨタ "を除去
-                        if alt_text.startswith('トヨタ '):
-                            car_info['name'] = alt_text[3:]
-                        else:
-                            car_info['name'] = alt_text
-                    
-                    # 価格（支払総額の数値部分）
-                    price_area = parent_dd.find('ul', class_='price_area')
-                    if price_area:
-                        price_number = price_area.find('p', class_='number')
-                        if price_number:
-                            # 数値部分を抽出
-                            price_text = price_number.get_text().replace('万円', '').replace('\n', '').strip()
-                            car_info['price'] = price_text
-                    
-                    # 年式と走行距離（detail_area内のテキストから）
-                    detail_area = parent_dd.find('div', class_='detail_area')
-                    if detail_area:
-                        detail_text = detail_area.get_text()
-                        
-                        # 年式を抽出
-                        year_match = re.search(r'(\d{4})年', detail_text)
-                        if year_match:
-                            car_info['year'] = year_match.group(1)
-                        
-                        # 走行距離を抽出
-                        mileage_patterns = [
-                            r'(\d{1,2}(?:,\d{3})*)\s*km',
-                            r'(\d+(?:\.\d+)?)\s*万km'
-                        ]
-                        for pattern in mileage_patterns:
-                            mileage_match = re.search(pattern, detail_text)
-                            if mileage_match:
-                                if '万km' in mileage_match.group(0):
-                                    mileage_num = float(mileage_match.group(1)) * 10000
-                                    car_info['mileage'] = f"{int(mileage_num):,}"
-                                else:
-                                    car_info['mileage'] = mileage_match.group(1)
-                                break
-                        
-                        # 販売店名を抽出
-                        dealer_match = re.search(r'トヨタモビリティ[^\n\r]+', detail_text)
-                        if dealer_match:
-                            car_info['dealer'] = dealer_match.group(0).strip()
+                car_info = self._parse_result_card(wrap_link, parent_dd)
+                
+                # 基本情報が取得できた場合のみ追加
+                if 'name' in car_info and 'price' in car_info:
+                    cars.append(car_info)
                     
-                    # 基本情報が取得できた場合のみ追加
-                    if 'name' in car_info and 'price' in car_info:
-                        cars.append(car_info)
-                        
-                except Exception as e:
-                    continue
+            except Exception as e:
+                continue
+        
+        return cars
+    
+    def _parse_result_region(self, html_content: str) -> List[Dict]:
+        """
+        検索結果の一覧部分（おすすめ・メイン一覧）だけを解析
+        両方のカードを文書順に1回で走査し、車両IDで重複を除く
+        """
+        soup = make_soup(self._slice_result_region(html_content), self.html_parser, only_ids=RESULT_REGION_IDS)
+        cars = []
+        seen_ids = set()
+        
+        for card in soup.select(RESULT_CARD_SELECTOR):
+            car_info = self._parse_card(card, seen_ids)
+            if car_info:
+                cars.append(car_info)
+        
+        return cars
+    
+    def _parse_card(self, card, seen_ids: set) -> Optional[Dict]:
+        """
+        検索結果カード（おすすめ車両の li / メイン一覧の dl）1件を解析
+        seen_ids に含まれる車両IDは重複として None を返す
+        """
+        try:
+            if card.name == 'li':
+                link = card.select_one(DETAIL_LINK_SELECTOR)
+                detail_dd = None
+            else:
+                # メイン一覧: <dl><dt>アイコン</dt><dd>リンク・画像・価格・詳細</dd></dl>
+                detail_dd = card.select_one('dd')
+                link = detail_dd.select_one('a.wrap_link') if detail_dd else None
+            if not link:
+                return None
             
-            print(f"抽出された車両数: {len(cars)}")
-            return cars
+            id_match = DETAIL_ID_PATTERN.search(link.get('href', ''))
+            if not id_match or id_match.group(1) in seen_ids:
+                return None
             
+            if detail_dd is None:
+                car_info = self._parse_recommended_card(card, link)
+            else:
+                car_info = self._parse_result_card(link, detail_dd)
+            
+            # 基本情報が取得できた場合のみ追加
+            if 'name' in car_info and 'price' in car_info:
+                seen_ids.add(id_match.group(1))
+                return car_info
+                
         except Exception as e:
-            print(f"HTMLパースエラー: {e}")
-            return []
+            pass
+        return None
+    
+    def _parse_card_html(self, card_html: str, seen_ids: set) -> Optional[Dict]:
+        """
+        逐次解析で取り出したカード1件分のHTMLを解析
+        """
+        soup = make_soup(card_html, self.html_parser)
+        card = soup.select_one('li, dl')
+        return self._parse_card(card, seen_ids) if card else None
+    
+    def _slice_result_region(self, html_content: str) -> str:
+        """
+        一覧部分を含む範囲だけを切り出す（ヘッダー・モーダル・フッターは字句解析もしない）
+        目印が見つからない場合はページ全体を返す
+        """
+        positions = [html_content.find(f'id="{region_id}"') for region_id in RESULT_REGION_IDS]
+        if min(positions) < 0:
+            return html_content
+        start = html_content.rfind('<', 0, positions[0])
+        end = html_content.find(RESULT_REGION_END, positions[-1])
+        if start < 0 or end < 0:
+            return html_content
+        return html_content[start:end]
+    
+    def _parse_recommended_card(self, li, detail_link) -> Dict:
+        """
+        おすすめ車両（li）から車両情報を抽出
+        """
+        car_info = {}
+        car_info['url'] = 'https://gazoo.com' + detail_link['href']
+        
+        # 車両名（dt class="carname"内のテキスト）
+        carname_dt = li.select_one('dt.carname')
+        if carname_dt:
+            carname_link = carname_dt.select_one('a')
+            if carname_link:
+                # 「トヨタ」を除去して車名のみ取得
+                name_parts = carname_link.get_text().strip().split()
+                if len(name_parts) > 1 and name_parts[0] == 'トヨタ':
+                    car_info['name'] = ' '.join(name_parts[1:])
+                else:
+                    car_info['name'] = carname_link.get_text().strip()
+        
+        # 価格（dl class="totalprice"内）
+        totalprice_dl = li.select_one('dl.totalprice')
+        if totalprice_dl:
+            price_dd = totalprice_dl.select_one('dd')
+            if price_dd:
+                # <span class="value">数値<span class="price_decimal">.小数</span></span>万円
+                value_span = price_dd.select_one('span.value')
+                if value_span:
+                    # まず小数点部分を取得
+                    decimal_span = value_span.select_one('span.price_decimal')
+                    if decimal_span:
+                        # 小数点部分のテキストを取得
+                        decimal_text = decimal_span.get_text().strip()
+                        # 小数点部分を一時的に削除してメイン数値を取得
+                        temp_span = value_span.get_text()
+                        main_number = temp_span.replace(decimal_text, '').strip()
+                        # 結合
+                        car_info['price'] = main_number + decimal_text
+                    else:
+                        car_info['price'] = value_span.get_text().strip()
+        
+        return car_info
+    
+    def _parse_result_card(self, wrap_link, parent_dd) -> Dict:
+        """
+        メイン一覧のカード（リンクと詳細のdd）から車両情報を抽出
+        """
+        car_info = {}
+        car_info['url'] = 'https://gazoo.com' + wrap_link['href']
+        
+        # 車両名（imgのalt属性から）
+        img_elem = parent_dd.select_one('img')
+        if img_elem and img_elem.get('alt'):
+            alt_text = img_elem['alt'].strip()
+            # "トヨタ "を除去
+            if alt_text.startswith('トヨタ '):
+                car_info['name'] = alt_text[len('トヨタ '):]
+            else:
+                car_info['name'] = alt_text
+        
+        # 価格（支払総額の数値部分）
+        price_area = parent_dd.select_one('ul.price_area')
+        if price_area:
+            price_number = price_area.select_one('p.number')
+            if price_number:
+                # 数値部分を抽出
+                price_text = price_number.get_text().replace('万円', '').replace('\n', '').strip()
+                car_info['price'] = price_text
+        
+        # 年式・走行距離・販売店（detail_area内のテキストを1回だけ取り出して抽出）
+        detail_area = parent_dd.select_one('div.detail_area')
+        if detail_area:
+            fields = extract_fields(card_text(detail_area))
+            if fields.year:
+                car_info['year'] = fields.year
+            if fields.mileage is not None:
+                car_info['mileage'] = f"{fields.mileage:,}"
+            if fields.dealer:
+                car_info['dealer'] = fields.dealer
+        
+        return car_info
     
     def display_results(self, results: List[Dict]):
         """
@@ -0,0 +1,222 @@
+#!/usr/bin/env python3
+"""
+車両レコード
+表示用の文字列（"143.8万円"・"年式不明"・"12,000"）ではなく、価格（円）・年式・走行距離（km）を
+整数で持つ。__slots__ で1台あたりのメモリを抑え、価格の上限チェック等を数値比較で行えるようにする
+"""
+
+import hashlib
+import re
+from typing import Dict, Optional
+
+YEAR_PATTERN = re.compile(r'(?:19|20)\d{2}')
+MILEAGE_PATTERN = re.compile(r'(\d[\d,]*(?:\.\d+)?)\s*(万)?\s*km')
+
+# 詳細ページのURLから掲載元の車両IDを取り出す（gazoo: /U-Car/detail?Id=XXXX / toyota.jp: .../detail/XXXX）
+DETAIL_ID_PATTERNS = (
+    re.compile(r'[?&]Id=(\w+)'),
+    re.compile(r'/detail/([\w-]+)'),
+)
+
+YEN = 1
+MAN = 10000
+
+# 以前の車両ID（車名＋価格のMD5の先頭8桁）
+LEGACY_ID_PATTERN = re.compile(r'[0-9a-f]{8}')
+
+
+def _man_to_int(number: str) -> Optional[int]:
+    """"143.8" のような万単位の数値文字列を整数に換算（floatの丸め誤差を出さない）"""
+    whole, _, fraction = number.partition(".")
+    if not whole.isdigit() or (fraction and not fraction.isdigit()):
+        return None
+    return int(whole) * MAN + int(fraction[:4].ljust(4, "0") or 0)
+
+
+def parse_price_yen(value, unit: int = MAN) -> Optional[int]:
+    """
+    価格を円単位の整数にする
+
+    "143.8万円" / "145.0万円" / "1,438,000円" のように単位の付いた文字列はその単位で換算する。
+    単位の無い数値・文字列（gazooの price_decimal を結合した "168.9" 等）は unit 円単位として換算する
+    （既定は万円。円単位の数値は unit=YEN）。"価格不明" 等は None
+    """
+    if value is None or isinstance(value, bool):
+        return None
+    if isinstance(value, int):
+        return value * unit
+    if isinstance(value, float):
+        return round(value * unit)
+
+    text = str(value).replace(",", "").replace("\n", "").strip()
+    if text.endswith("万円"):
+        return _man_to_int(text[:-2].strip())
+    if text.endswith("円"):
+        text = text[:-1].strip()
+        return int(text) if text.isdigit() else None
+    yen = _man_to_int(text)
+    return None if yen is None else yen * unit // MAN
+
+
+def parse_model_year(value) -> Optional[int]:
+    """"2019年(R1年)" / "2023" / 2023 から西暦の年式を取り出す（見つからなければ None）"""
+    if value is None or isinstance(value, bool):
+        return None
+    if isinstance(value, int):
+        return value
+    match = YEAR_PATTERN.search(str(value))
+    return int(match.group(0)) if match else None
+
+
+def parse_mileage_km(value) -> Optional[int]:
+    """
+    走行距離をkm単位の整数にする
+
+    "2,000"（km省略）/ "12,000km" / "3.2万km"、または走行距離を含む文章から最初の「〜km」を取り出す
+    """
+    if value is None or isinstance(value, bool):
+        return None
+    if isinstance(value, int):
+        return value
+
+    text = str(value).strip()
+    digits = text.replace(",", "")
+    if digits.isdigit():
+        return int(digits)
+
+    match = MILEAGE_PATTERN.search(text)
+    if not match:
+        return None
+    number = match.group(1).replace(",", "")
+    if match.group(2):
+        return _man_to_int(number)
+    whole = number.partition(".")[0]
+    return int(whole) if whole.isdigit() else None
+
+
+def detail_id_from_url(url: Optional[str]) -> Optional[str]:
+    """詳細ページのURLから掲載元の車両IDを取り出す（検索URL等は None）"""
+    if not url:
+        return None
+    for pattern in DETAIL_ID_PATTERNS:
+        match = pattern.search(url)
+        if match:
+            return match.group(1)
+    return None
+
+
+def is_legacy_id(vehicle_id: str) -> bool:
+    """以前の車両ID（車名＋価格）か（listing_key() のキーは ":" か "~" を含むので重ならない）"""
+    return LEGACY_ID_PATTERN.fullmatch(vehicle_id) is not None
+
+
+def format_price_man(yen: Optional[int]) -> str:
+    """円単位の価格を "143.8万円" 形式にする"""
+    if yen is None:
+        return "価格不明"
+    whole, rest = divmod(yen, MAN)
+    if not rest:
+        return f"{whole}万円"
+    return f"{whole}.{rest:04d}".rstrip("0") + "万円"
+
+
+class Vehicle:
+    __slots__ = ("name", "price", "year", "mileage", "dealer", "detail_id", "source",
+                 "is_new", "url", "detected_at")
+
+    def __init__(self, name: str, price: Optional[int] = None, year: Optional[int] = None,
+                 mileage: Optional[int] = None, dealer: Optional[str] = None,
+                 detail_id: Optional[str] = None, source: Optional[str] = None,
+                 is_new: bool = False, url: Optional[str] = None, detected_at: Optional[str] = None):
+        self.name = name
+        self.price = price            # 円
+        self.year = year              # 西暦
+        self.mileage = mileage        # km
+        self.dealer = dealer
+        self.detail_id = detail_id    # 掲載元の車両ID
+        self.source = source          # 掲載元（"toyota.jp" / "gazoo"）
+        self.is_new = is_new
+        self.url = url
+        self.detected_at = detected_at
+
+    @property
+    def price_text(self) -> str:
+        return format_price_man(self.price)
+
+    @classmethod
+    def from_dict(cls, record: Dict, source: Optional[str] = None) -> "Vehicle":
+        """
+        車両レコード（dict）から作成
+
+        parse_vehicles・一覧JSON・ページ内抽出・gazoo検索の表示用レコードと、
+        to_dict() で保存した数値のレコードのどちらも受け付ける
+        """
+        price = record.get("price")
+        return cls(
+            name=record.get("name", ""),
+            # 保存したレコードの価格は円単位の数値、表示用レコードは文字列（単位が無ければ万円）
+            price=parse_price_yen(price, unit=YEN if isinstance(price, (int, float)) else MAN),
+            year=parse_model_year(record.get("year")),
+            mileage=parse_mileage_km(record.get("mileage")),
+            dealer=record.get("dealer"),
+            detail_id=(record.get("detail_id") or record.get("listing_id")
+                       or detail_id_from_url(record.get("detail_url") or record.get("url"))),
+            source=record.get("source") or source,
+            is_new=bool(record.get("is_new")),
+            url=record.get("detail_url") or record.get("url") or record.get("search_url"),
+            detected_at=record.get("detected_at"),
+        )
+
+    def copy(self, **changes) -> "Vehicle":
+        """一部の項目だけを変えた複製"""
+        values = {key: getattr(self, key) for key in self.__slots__}
+        values.update(changes)
+        return Vehicle(**values)
+
+    def to_dict(self) -> Dict:
+        """JSON保存用（値の無い項目は省略）"""
+        record = {}
+        for key in self.__slots__:
+            value = getattr(self, key)
+            if value is not None:
+                record[key] = value
+        return record
+
+    def __eq__(self, other):
+        if not isinstance(other, Vehicle):
+            return NotImplemented
+        return all(getattr(self, key) == getattr(other, key) for key in self.__slots__)
+
+    # 属性を書き換えられるため、全項目で比べる __eq__ と一致するハッシュを作れない。
+    # 集合・辞書のキーには listing_key(vehicle) を使う
+    __hash__ = None
+
+    def __repr__(self):
+        return f"Vehicle({self.name!r}, {self.price_text}, year={self.year}, mileage={self.mileage})"
+
+
+def listing_key(vehicle: Vehicle) -> str:
+    """
+    保存・新着判定に使う車両のキー
+
+    掲載元の車両IDがあれば "掲載元:車両ID"（価格が変わっても同じキー）。
+    無い場合は車名・年式・走行距離・販売店から作る。走行距離も販売店も分からない場合だけ
+    同じグレードを区別するために価格も含める（この場合の値下げは別の車両になる）
+    """
+    if vehicle.detail_id:
+        return f"{vehicle.source or ''}:{vehicle.detail_id}"
+    parts = [vehicle.name, vehicle.year, vehicle.mileage, vehicle.dealer]
+    if vehicle.mileage is None and vehicle.dealer is None:
+        parts.append(vehicle.price)
+    composite = "|".join("" if part is None else str(part) for part in parts)
+    return "~" + hashlib.md5(composite.encode("utf-8")).hexdigest()[:12]
+
+
+def load_vehicle_map(data: Dict, source: Optional[str] = None) -> Dict[str, Vehicle]:
+    """{車両ID: レコード} を {車両ID: Vehicle} にする（旧形式の表示用レコードも変換）"""
+    return {vehicle_id: Vehicle.from_dict(record, source=source) for vehicle_id, record in data.items()}
+
+
+def dump_vehicle_map(vehicles: Dict[str, Vehicle]) -> Dict[str, Dict]:
+    """{車両ID: Vehicle} をJSON保存用の {車両ID: dict} にする"""
+    return {vehicle_id: vehicle.to_dict() for vehicle_id, vehicle in vehicles.items()}
@@ -0,0 +1,345 @@
+#!/usr/bin/env python3
+"""
+車両データの保存（SQLite）
+vehicles.json のように毎回全件を読み書きせず、車両IDの索引で1台ずつ調べ、
+チェック中の変更は溜めておいて commit() で1回のトランザクションにまとめて書き込む
+（書き込むのは追加・更新された車両だけ。見かけただけの車両の last_seen は track_last_seen のときだけ更新する）
+
+既存の vehicles.json / vehicles_backup.json は import_json() で取り込む:
+    python vehicle_store.py import data/vehicles.json vehicles_backup.json --db data/vehicles.db
+"""
+
+import argparse
+import json
+import sqlite3
+import uuid
+from datetime import datetime
+from pathlib import Path
+from vehicle import Vehicle
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS vehicles (
+    vehicle_id  TEXT PRIMARY KEY,
+    listing_id  TEXT,
+    model       TEXT,
+    name        TEXT NOT NULL,
+    price       INTEGER,
+    year        INTEGER,
+    mileage     INTEGER,
+    dealer      TEXT,
+    source      TEXT,
+    is_new      INTEGER NOT NULL DEFAULT 0,
+    url         TEXT,
+    detected_at TEXT,
+    first_seen  TEXT NOT NULL,
+    last_seen   TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_vehicles_listing_id ON vehicles (listing_id);
+CREATE INDEX IF NOT EXISTS idx_vehicles_model ON vehicles (model);
+CREATE INDEX IF NOT EXISTS idx_vehicles_price ON vehicles (price);
+CREATE INDEX IF NOT EXISTS idx_vehicles_first_seen ON vehicles (first_seen);
+-- last_seen で絞り込むのは track_last_seen（TRACK_LAST_SEEN=1）のときだけ意味がある
+-- （既定では追加・内容の変更の日時。掲載終了は snapshot_diff の差分で判定する）
+CREATE INDEX IF NOT EXISTS idx_vehicles_last_seen ON vehicles (last_seen);
+CREATE TABLE IF NOT EXISTS price_history (
+    vehicle_id  TEXT NOT NULL,
+    price       INTEGER,
+    changed_at  TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_price_history_vehicle ON price_history (vehicle_id, changed_at);
+CREATE TABLE IF NOT EXISTS store_meta (
+    key   TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+# Vehicle の項目と列の対応（detail_id は listing_id 列に入れる）
+VEHICLE_COLUMNS = ("name", "price", "year", "mileage", "dealer", "listing_id", "source",
+                   "is_new", "url", "detected_at")
+
+UPSERT = f"""
+INSERT INTO vehicles (vehicle_id, model, {", ".join(VEHICLE_COLUMNS)}, first_seen, last_seen)
+VALUES ({", ".join("?" * (len(VEHICLE_COLUMNS) + 4))})
+ON CONFLICT (vehicle_id) DO UPDATE SET
+    model = excluded.model,
+    {", ".join(f"{column} = excluded.{column}" for column in VEHICLE_COLUMNS)},
+    last_seen = excluded.last_seen
+"""
+
+# 取り込みでは既にある車両を上書きしない（先に読んだファイルを優先）
+IMPORT = UPSERT.split("ON CONFLICT")[0].replace("INSERT INTO", "INSERT OR IGNORE INTO")
+
+SELECT_VEHICLE = f"SELECT {', '.join(VEHICLE_COLUMNS)} FROM vehicles"
+
+# 直前の履歴と価格が違うときだけ価格履歴に追加（車両ごとの索引で直前の1件だけを調べる）
+APPEND_PRICE = """
+INSERT INTO price_history (vehicle_id, price, changed_at)
+SELECT :vehicle_id, :price, :changed_at
+WHERE :price IS NOT (SELECT price FROM price_history WHERE vehicle_id = :vehicle_id
+                     ORDER BY changed_at DESC, rowid DESC LIMIT 1)
+"""
+
+# 以前の車両ID（車名＋価格のMD5の先頭8桁）の車両数
+COUNT_LEGACY = """
+SELECT COUNT(*) FROM vehicles
+WHERE length(vehicle_id) = 8 AND vehicle_id NOT GLOB '*[^0-9a-f]*'
+"""
+
+# 以前の車両IDの行を新しい車両IDに付け替える（first_seen と価格履歴を引き継ぐ）
+REKEY_VEHICLE = "UPDATE OR IGNORE vehicles SET vehicle_id = :new_id WHERE vehicle_id = :old_id"
+REKEY_PRICE_HISTORY = "UPDATE price_history SET vehicle_id = :new_id WHERE vehicle_id = :old_id"
+DELETE_VEHICLE = "DELETE FROM vehicles WHERE vehicle_id = :old_id"
+
+# 車両を追加・更新した書き込みごとに変わる世代（既知の車両IDのフィルタが最新か確かめる）
+SET_GENERATION = "INSERT OR REPLACE INTO store_meta (key, value) VALUES ('generation', ?)"
+GET_GENERATION = "SELECT value FROM store_meta WHERE key = 'generation'"
+
+# 価格履歴の無い車両に現在の価格を1件目として入れる（取り込み時のみ）
+SEED_PRICE_HISTORY = """
+INSERT INTO price_history (vehicle_id, price, changed_at)
+SELECT vehicle_id, price, first_seen FROM vehicles AS v
+WHERE NOT EXISTS (SELECT 1 FROM price_history AS h WHERE h.vehicle_id = v.vehicle_id)
+"""
+
+
+def model_of(name):
+    """車名の先頭の語（"プリウス A ツーリング 4WD" → "プリウス"）"""
+    return name.split()[0] if name and name.split() else None
+
+
+def _vehicle_from_row(row):
+    name, price, year, mileage, dealer, listing_id, source, is_new, url, detected_at = row
+    return Vehicle(name, price=price, year=year, mileage=mileage, dealer=dealer,
+                   detail_id=listing_id, source=source, is_new=bool(is_new), url=url,
+                   detected_at=detected_at)
+
+
+def _row(vehicle_id, vehicle, first_seen, last_seen):
+    return (vehicle_id, model_of(vehicle.name), vehicle.name, vehicle.price, vehicle.year,
+            vehicle.mileage, vehicle.dealer, vehicle.detail_id, vehicle.source,
+            int(bool(vehicle.is_new)), vehicle.url, vehicle.detected_at, first_seen, last_seen)
+
+
+class VehicleStore:
+    """
+    {車両ID: Vehicle} と同じように使える車両ストア
+
+    store[vehicle_id] = vehicle は commit() まで書き込まない。価格が変わっていれば commit() で
+    価格履歴（price_history）に1行追加する。vehicle_id in store は主キーの索引で調べる（全件を読み込まない）
+
+    last_seen は追加・内容の変更（状態が変わったとき）に更新する。track_last_seen にすると
+    mark_seen() した車両もチェックごとに更新する（既知の台数分の UPDATE が毎回かかる）
+    """
+
+    def __init__(self, path, track_last_seen=False):
+        self.path = Path(path)
+        self.conn = sqlite3.connect(str(self.path))
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+        self.track_last_seen = track_last_seen
+        self.pending = {}  # 次の commit() で追加・更新する {車両ID: Vehicle}
+        self.added = set()  # pending のうち保存されていない車両ID
+        self.seen = set()  # 次の commit() で last_seen を更新する既知の車両ID（track_last_seen のみ）
+        self.rekeyed = {}  # 次の commit() で付け替える {以前の車両ID: 新しい車両ID}
+        # 保存済みの台数（開いたときに1回だけ数え、以後は追加した台数を足す）
+        self.count = self.conn.execute("SELECT COUNT(*) FROM vehicles").fetchone()[0]
+        # 付け替えの済んでいない以前の車両IDの数（0になれば照合は不要）
+        self.legacy_count = self.conn.execute(COUNT_LEGACY).fetchone()[0]
+        row = self.conn.execute(GET_GENERATION).fetchone()
+        self.generation = row[0] if row else None  # 最後に車両を追加・更新した書き込みの世代
+
+    def __contains__(self, vehicle_id):
+        if vehicle_id in self.pending:
+            return True
+        if vehicle_id in self.rekeyed:
+            return False
+        row = self.conn.execute("SELECT 1 FROM vehicles WHERE vehicle_id = ?", (vehicle_id,)).fetchone()
+        return row is not None
+
+    def __getitem__(self, vehicle_id):
+        vehicle = self.get(vehicle_id)
+        if vehicle is None:
+            raise KeyError(vehicle_id)
+        return vehicle
+
+    def __setitem__(self, vehicle_id, vehicle):
+        if vehicle_id not in self.pending and vehicle_id not in self:
+            self.added.add(vehicle_id)
+        self.pending[vehicle_id] = vehicle
+        self.seen.discard(vehicle_id)
+
+    def __len__(self):
+        """この接続で保存・追加した台数（COUNT(*) で数え直さない）"""
+        return self.count + len(self.added) - len(self.rekeyed)
+
+    def __iter__(self):
+        return (vehicle_id for vehicle_id, _ in self.items())
+
+    def ids(self):
+        """保存済みの車両ID（Vehicle を作らずに順に返す）"""
+        self.commit()
+        for (vehicle_id,) in self.conn.execute("SELECT vehicle_id FROM vehicles"):
+            yield vehicle_id
+
+    def get(self, vehicle_id, default=None):
+        if vehicle_id in self.pending:
+            return self.pending[vehicle_id]
+        if vehicle_id in self.rekeyed:
+            return default
+        row = self.conn.execute(f"{SELECT_VEHICLE} WHERE vehicle_id = ?", (vehicle_id,)).fetchone()
+        return _vehicle_from_row(row) if row else default
+
+    def items(self):
+        """保存済みの (車両ID, Vehicle)（初めて見た順。未書き込みの変更は先に書き込む）"""
+        self.commit()
+        for row in self.conn.execute(f"SELECT vehicle_id, {', '.join(VEHICLE_COLUMNS)} FROM vehicles "
+                                     "ORDER BY first_seen, vehicle_id"):
+            yield row[0], _vehicle_from_row(row[1:])
+
+    def price_history(self, vehicle_id):
+        """[(変更日時, 価格)]（古い順）"""
+        return self.conn.execute(
+            "SELECT changed_at, price FROM price_history WHERE vehicle_id = ? ORDER BY changed_at, rowid",
+            (vehicle_id,)
+        ).fetchall()
+
+    def mark_seen(self, vehicle_id):
+        """既知の車両を今回のチェックで見かけた（last_seen を commit() で更新）"""
+        if self.track_last_seen and vehicle_id not in self.pending:
+            self.seen.add(vehicle_id)
+
+    def rekey(self, old_id, vehicle_id):
+        """
+        以前の車両IDで保存した車両を vehicle_id に付け替える（commit() で書き込む）
+        first_seen と価格履歴は引き継ぐ。vehicle_id の内容は store[vehicle_id] = vehicle で入れておく
+        """
+        self.rekeyed[old_id] = vehicle_id
+        self.legacy_count -= 1
+
+    def commit(self, seen_at=None, complete=False):
+        """
+        溜めた変更を1回のトランザクションで書き込み、書き込んだ行数を返す
+
+        complete（全ページを確認したチェックか）は SightingLog と呼び出し方をそろえるためのもの。
+        SQLite では使わない（掲載終了は監視側で snapshot_diff の差分から判定する。
+        last_seen が最後に見かけた日時になるのは track_last_seen のときだけ）
+        """
+        if not self.pending and not self.seen and not self.rekeyed:
+            return 0
+        seen_at = seen_at or datetime.now().isoformat()
+        rekeyed = [{"old_id": old_id, "new_id": new_id} for old_id, new_id in self.rekeyed.items()]
+        with self.conn:
+            # 付け替えた行は以下の UPSERT で内容だけ更新される（新しい車両IDが既にあれば以前の行を消す）
+            self.conn.executemany(REKEY_VEHICLE, rekeyed)
+            self.conn.executemany(DELETE_VEHICLE, rekeyed)
+            self.conn.executemany(REKEY_PRICE_HISTORY, rekeyed)
+            if self.pending or rekeyed:
+                self._next_generation()
+            self.conn.executemany(UPSERT, [
+                _row(vehicle_id, vehicle, vehicle.detected_at or seen_at, seen_at)
+                for vehicle_id, vehicle in self.pending.items()
+            ])
+            self.conn.executemany(APPEND_PRICE, [
+                {"vehicle_id": vehicle_id, "price": vehicle.price, "changed_at": seen_at}
+                for vehicle_id, vehicle in self.pending.items()
+            ])
+            self.conn.executemany("UPDATE vehicles SET last_seen = ? WHERE vehicle_id = ?",
+                                  [(seen_at, vehicle_id) for vehicle_id in self.seen])
+        written = len(self.pending) + len(self.seen)
+        self.count += len(self.added) - len(self.rekeyed)
+        self.pending.clear()
+        self.added.clear()
+        self.seen.clear()
+        self.rekeyed.clear()
+        return written
+
+    def _next_generation(self):
+        """書き込みと同じトランザクションで世代を進める"""
+        self.generation = uuid.uuid4().hex
+        self.conn.execute(SET_GENERATION, (self.generation,))
+
+    def import_json(self, path, source=None):
+        """vehicles.json 形式（{車両ID: レコード}）のファイルを取り込み、追加した台数を返す"""
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        imported_at = datetime.now().isoformat()
+        rows = []
+        for vehicle_id, record in data.items():
+            vehicle = Vehicle.from_dict(record, source=source)
+            seen_at = vehicle.detected_at or imported_at
+            rows.append(_row(vehicle_id, vehicle, seen_at, seen_at))
+
+        with self.conn:
+            added = self.conn.execute("SELECT COUNT(*) FROM vehicles").fetchone()[0]
+            self.conn.executemany(IMPORT, rows)
+            added = self.conn.execute("SELECT COUNT(*) FROM vehicles").fetchone()[0] - added
+            self.count += added
+            self.legacy_count = self.conn.execute(COUNT_LEGACY).fetchone()[0]
+            # 取り込んだ車両の価格履歴は保存されていた価格から始める
+            self.conn.execute(SEED_PRICE_HISTORY)
+            self._next_generation()
+        return added
+
+    def export_json(self, path):
+        """vehicles.json 形式で書き出す（バックアップ用）"""
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({vehicle_id: vehicle.to_dict() for vehicle_id, vehicle in self.items()},
+                      f, ensure_ascii=False, indent=2)
+
+    def close(self):
+        self.commit()
+        self.conn.close()
+
+
+def import_legacy(store, legacy_files=(), source=None, log=print):
+    """
+    空のストアに既存の vehicles.json 等を1回だけ取り込む
+    （存在するファイルを順に取り込み、同じ車両IDは先のファイルを優先）
+    """
+    if len(store):
+        return
+    for path in legacy_files:
+        if not Path(path).exists():
+            continue
+        try:
+            imported = store.import_json(path, source=source)
+            log(f"{path} から{imported}台の車両データを取り込みました")
+        except Exception as e:
+            log(f"車両データ取り込みエラー（{path}）: {e}")
+
+
+def open_store(db_path, legacy_files=(), source=None, log=print, track_last_seen=False):
+    """車両ストアを開く（空なら legacy_files を取り込む）"""
+    store = VehicleStore(db_path, track_last_seen=track_last_seen)
+    import_legacy(store, legacy_files, source=source, log=log)
+    return store
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="車両データ（SQLite）の取り込み・書き出し")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    import_parser = subparsers.add_parser("import", help="vehicles.json 形式のファイルを取り込む")
+    import_parser.add_argument("files", nargs="+", help="取り込むファイル（同じ車両IDは先のファイルを優先）")
+    export_parser = subparsers.add_parser("export", help="vehicles.json 形式で書き出す")
+    export_parser.add_argument("file", help="書き出すファイル")
+    import_parser.add_argument("--source", default="toyota.jp", help="掲載元が無いレコードの掲載元")
+    for sub in (import_parser, export_parser):
+        sub.add_argument("--db", default="data/vehicles.db", help="車両ストアのパス")
+    args = parser.parse_args(argv)
+
+    store = VehicleStore(args.db)
+    try:
+        if args.command == "import":
+            for path in args.files:
+                print(f"{path}: {store.import_json(path, source=args.source)}台を追加")
+            print(f"保存済み: {len(store)}台（{args.db}）")
+        else:
+            store.export_json(args.file)
+            print(f"{len(store)}台を書き出しました: {args.file}")
+    finally:
+        store.close()
+
+
+if __name__ == "__main__":
+    main()